@@ -0,0 +1,213 @@
+import numpy as np
+from array import array
+from datetime import date
+from itertools import chain
+from typing import Iterable, Optional
+
+# datetime64[D] counts days from 1970-01-01, date.toordinal() counts from 0001-01-01
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# extra days reserved whenever the calendar has to grow, so bookings don't reallocate every time
+GROW_DAYS = 64
+# rows reserved at least when added properties need more; beyond that the row capacity doubles
+GROW_ROWS = 64
+
+
+def to_ordinals(days) -> np.ndarray:
+    """Convert a list of dates or ISO date strings, or an array('i') of day ordinals, to day ordinals."""
+    if len(days) == 0:
+        return np.zeros(0, dtype=np.int64)
+    if isinstance(days, array):
+        return np.array(days, dtype=np.int64)
+    return np.array(days, dtype="datetime64[D]").astype(np.int64) + EPOCH_ORDINAL
+
+
+class AvailabilityIndex:
+    """
+    Booked calendar of every property as a bitmap.
+    Each row is one property, bit i of a row is the day with ordinal base + i.
+    Days outside the covered range are free. The bitmap can have spare rows (all free) for
+    properties added later, and rows of removed properties are cleared and used again.
+    """
+
+    def __init__(self, properties: Optional[Iterable] = None):
+        self.rows = {}  # property id -> row
+        self.base = 0  # ordinal of the first covered day, always a multiple of 8
+        self.bits = np.zeros((0, 0), dtype=np.uint8)
+        self.version = 0  # bumped on every change, so callers can tell the calendar moved
+        self._used = 0  # rows handed out so far; the ones after it are spare
+        self._freed = []  # rows of removed properties, cleared
+        if properties is not None:
+            properties = list(properties)
+            self._load([p.id for p in properties], [p.booked_ordinals for p in properties])
+            self.attach(properties)
+
+    @classmethod
+    def from_booked(cls, ids, booked_lists):
+        """Build an index from parallel id / booked-dates columns (rows follow their order)."""
+        index = cls()
+        index._load(list(ids), list(booked_lists))
+        return index
+
+    @classmethod
+    def from_bits(cls, ids, base: int, bits: np.ndarray, copy: bool = True):
+        """
+        Build an index from a saved bitmap whose rows follow ids (e.g. a snapshot).
+        With copy=False it reads the bitmap in place (e.g. in shared memory) and must not be changed.
+        """
+        index = cls()
+        index.rows = {pid: row for row, pid in enumerate(ids)}
+        index.base = base
+        index.bits = np.array(bits, dtype=np.uint8) if copy else bits  # a copy is updated in place
+        index._used = index.bits.shape[0]
+        return index
+
+    def attach(self, properties):
+        """Let the properties update this index from add_dates/delete_dates."""
+        for prop in properties:
+            prop._availability = self
+
+    def _load(self, ids, booked_lists):
+        self.rows = {pid: row for row, pid in enumerate(ids)}
+        self.bits = np.zeros((len(ids), 0), dtype=np.uint8)
+        self._used = len(ids)
+        lengths = np.fromiter(map(len, booked_lists), dtype=np.int64, count=len(booked_lists))
+        if all(isinstance(days, array) for days in booked_lists):
+            # Property.booked_ordinals: join the arrays without going through Python ints
+            joined = array("i")
+            for days in booked_lists:
+                joined.extend(days)
+            days = to_ordinals(joined)
+        else:
+            days = to_ordinals(list(chain.from_iterable(booked_lists)))
+        if days.size:
+            rows = np.repeat(np.arange(len(ids)), lengths)
+            self._reserve(int(days.min()), int(days.max()) + 1)
+            self._set_days(rows, days)
+
+    # set the bits of (row, ordinal) pairs
+    def _set_days(self, rows, days):
+        offsets = days - self.base
+        np.bitwise_or.at(self.bits, (rows, offsets >> 3), (1 << (offsets & 7)).astype(np.uint8))
+
+    # make sure days [start, end) are covered by the bitmap
+    def _reserve(self, start: int, end: int):
+        covered_end = self.base + self.bits.shape[1] * 8
+        if self.bits.shape[1] and self.base <= start and end <= covered_end:
+            return
+        if self.bits.shape[1]:
+            new_base = min(self.base, start - GROW_DAYS)
+            new_end = max(covered_end, end + GROW_DAYS)
+        else:
+            new_base, new_end = start, end
+        new_base -= new_base % 8
+        grown = np.zeros((self.bits.shape[0], (new_end - new_base + 7) // 8), dtype=np.uint8)
+        offset = (self.base - new_base) // 8
+        grown[:, offset:offset + self.bits.shape[1]] = self.bits
+        self.base, self.bits = new_base, grown
+
+    # byte range and bit mask of days [start, end) within the covered range
+    def _span(self, start: int, end: int):
+        start = max(start, self.base)
+        end = min(end, self.base + self.bits.shape[1] * 8)
+        if end <= start:
+            return None
+        lo = (start - self.base) >> 3
+        hi = ((end - self.base - 1) >> 3) + 1
+        days = np.zeros((hi - lo) * 8, dtype=bool)
+        days[start - self.base - lo * 8:end - self.base - lo * 8] = True
+        return lo, hi, np.packbits(days, bitorder="little")
+
+    # a free row: one a removed property left, else the next spare one (doubling the rows when there is none)
+    def _take_row(self) -> int:
+        if self._freed:
+            return self._freed.pop()
+        row = self._used
+        if row == self.bits.shape[0]:
+            grown = np.zeros((max(GROW_ROWS, 2 * row), self.bits.shape[1]), dtype=np.uint8)
+            grown[:row] = self.bits
+            self.bits = grown
+        self._used += 1
+        return row
+
+    def add_property(self, prop):
+        """Give a row to a property that was not in the catalog yet."""
+        row = self._take_row()
+        self.rows[prop.id] = row
+        days = to_ordinals(prop.booked_ordinals)
+        if days.size:
+            self._reserve(int(days.min()), int(days.max()) + 1)
+            self._set_days(np.full(days.shape[0], row), days)
+        prop._availability = self
+        self.version += 1
+
+    def remove_property(self, property_id):
+        """Forget a property; its row is cleared for the next added one."""
+        row = self.rows.pop(property_id, None)
+        if row is not None:
+            self.bits[row] = 0
+            self._freed.append(row)
+            self.version += 1
+
+    def mark(self, property_id, start_date: date, end_date: date, booked: bool = True):
+        """Book (or free) days [start_date, end_date) of one property in place."""
+        start, end = start_date.toordinal(), end_date.toordinal()
+        row = self.rows.get(property_id)
+        if row is None or end <= start:
+            return
+        if booked:
+            self._reserve(start, end)
+        span = self._span(start, end)
+        if span is None:
+            return
+        lo, hi, mask = span
+        if booked:
+            self.bits[row, lo:hi] |= mask
+        else:
+            self.bits[row, lo:hi] &= ~mask
+        self.version += 1
+
+    def set_booked(self, property_id, days):
+        """Replace the booked days of one property (dates or day ordinals, as in to_ordinals)."""
+        row = self.rows.get(property_id)
+        if row is None:
+            return
+        days = to_ordinals(days)
+        self.bits[row] = 0
+        if days.size:
+            self._reserve(int(days.min()), int(days.max()) + 1)
+            self._set_days(np.full(days.shape[0], row), days)
+        self.version += 1
+
+    def is_free(self, property_id, start_date: date, end_date: date) -> bool:
+        """True if the property has no booked day in [start_date, end_date)."""
+        row = self.rows.get(property_id)
+        span = self._span(start_date.toordinal(), end_date.toordinal())
+        if row is None or span is None:
+            return True
+        lo, hi, mask = span
+        return not (self.bits[row, lo:hi] & mask).any()
+
+    def free_mask(self, start_date: date, end_date: date, rows=None) -> np.ndarray:
+        """Boolean array, True for every row (or the given rows) free in [start_date, end_date)."""
+        count = self.bits.shape[0] if rows is None else len(rows)
+        span = self._span(start_date.toordinal(), end_date.toordinal())
+        if span is None:
+            return np.ones(count, dtype=bool)
+        lo, hi, mask = span
+        window = self.bits[:, lo:hi]
+        if rows is not None:
+            window = window[rows]
+        return ~(window & mask).any(axis=1)
+
+    def rows_for(self, ids) -> np.ndarray:
+        """Row numbers of the given property ids."""
+        return np.fromiter((self.rows[pid] for pid in ids), dtype=np.int64, count=len(ids))
+
+
+def shared_index(properties) -> Optional[AvailabilityIndex]:
+    """The index all given properties are attached to, if they share one."""
+    index = getattr(properties[0], "_availability", None) if properties else None
+    if index is None or any(getattr(p, "_availability", None) is not index for p in properties):
+        return None
+    return index
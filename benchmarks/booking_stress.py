@@ -0,0 +1,156 @@
+"""
+Multi-process booking stress test: many workers race to book overlapping stays on a small
+set of properties through PropertiesController.book, then the run is checked for double
+bookings. Exits non-zero if any two accepted stays of a property overlap, or if the stored
+calendars differ from the accepted stays.
+
+    python -m benchmarks.booking_stress --workers 8 --attempts 300 --properties 20
+    python -m benchmarks.booking_stress --backend sqlite --workers 8
+    python -m benchmarks.booking_stress --compact-every 50   # compactions during the run
+
+With the JSON backend it also checks that a controller keeps booking after the journal it
+follows was deleted under it (it reloads the catalog, and later bookings are stored).
+
+With --properties equal to --workers and --spread every worker books its own properties,
+which shows how well bookings of different properties run in parallel.
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import storage
+from benchmarks.synthetic import generate_properties
+from properties import PropertiesController
+
+FIRST_DAY = date(2026, 1, 1)
+
+
+def open_store(backend: str, directory: str):
+    if backend == "sqlite":
+        return storage.SQLitePropertyStore(os.path.join(directory, "stress.sqlite3"))
+    return storage.JsonPropertyStore(os.path.join(directory, "properties.json"))
+
+
+def worker(args):
+    backend, directory, worker_id, attempts, properties, days, spread, compact_every, seed = args
+    storage.COMPACT_EVERY = compact_every
+    rng = random.Random(seed * 1000 + worker_id)
+    controller = PropertiesController(open_store(backend, directory))
+    accepted = []
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(attempts):
+            if spread:
+                property_id = rng.randrange(worker_id, properties, max(1, spread)) + 1
+            else:
+                property_id = rng.randint(1, properties)
+            first = FIRST_DAY + timedelta(days=rng.randrange(days))
+            last = first + timedelta(days=rng.randint(1, 5))
+            if controller.book(property_id, first, last) is not None:
+                accepted.append((property_id, first.isoformat(), last.isoformat()))
+    return accepted, time.perf_counter() - start
+
+
+# every accepted stay must be on days no other accepted stay of the property covers
+def double_bookings(accepted) -> list:
+    taken = {}
+    clashes = []
+    for property_id, first, last in accepted:
+        day = date.fromisoformat(first)
+        while day < date.fromisoformat(last):
+            other = taken.setdefault((property_id, day), (first, last))
+            if other != (first, last):
+                clashes.append({"id": property_id, "day": day.isoformat(), "stays": [other, (first, last)]})
+            day += timedelta(days=1)
+    return clashes
+
+
+# a loaded controller whose journal disappears must reload and go on booking, not crash
+def lost_journal_ok(seed: int = 0) -> bool:
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "properties.json"), "w", encoding="utf-8") as f:
+            json.dump(generate_properties(3, seed, booked_fraction=0.0), f)
+        controller = PropertiesController(open_store("json", directory))
+        stay = (FIRST_DAY, FIRST_DAY + timedelta(days=2))
+        with contextlib.redirect_stdout(io.StringIO()):
+            controller.book(1, *stay)
+            os.remove(controller.store.journal.path)
+            booked = controller.book(2, *stay) is not None
+        stored = {p.id: p.booked for p in PropertiesController(open_store("json", directory)).get_all()}
+    return booked and stored.get(2) == [FIRST_DAY, FIRST_DAY + timedelta(days=1)]
+
+
+def run(backend: str = "json", workers: int = 8, attempts: int = 200, properties: int = 20, days: int = 60,
+        spread: bool = False, compact_every: int = storage.COMPACT_EVERY, seed: int = 0) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        catalog = generate_properties(properties, seed, booked_fraction=0.0)
+        with open(os.path.join(directory, "properties.json"), "w", encoding="utf-8") as f:
+            json.dump(catalog, f)
+        if backend == "sqlite":
+            storage.import_json(os.path.join(directory, "stress.sqlite3"), os.path.join(directory, "properties.json"),
+                                os.path.join(directory, "users.json"))
+
+        jobs = [(backend, directory, i, attempts, properties, days, workers if spread else 0, compact_every, seed)
+                for i in range(workers)]
+        start = time.perf_counter()
+        with multiprocessing.get_context("spawn").Pool(workers) as pool:
+            results = pool.map(worker, jobs)
+        elapsed = time.perf_counter() - start
+
+        accepted = [stay for stays, _ in results for stay in stays]
+        stored = {p.id: set(p.booked) for p in PropertiesController(open_store(backend, directory)).get_all()}
+
+    expected = {}
+    for property_id, first, last in accepted:
+        day = date.fromisoformat(first)
+        while day < date.fromisoformat(last):
+            expected.setdefault(property_id, set()).add(day)
+            day += timedelta(days=1)
+    mismatched = sorted(pid for pid in stored if stored[pid] != expected.get(pid, set()))
+
+    report = {
+        "backend": backend,
+        "workers": workers,
+        "attempts": workers * attempts,
+        "accepted": len(accepted),
+        "double_bookings": double_bookings(accepted),
+        "calendar_mismatches": mismatched,
+        "elapsed_s": elapsed,
+        "worker_s": max(seconds for _, seconds in results),
+        "bookings_per_s": workers * attempts / max(seconds for _, seconds in results),
+    }
+    if backend == "json":
+        report["lost_journal_ok"] = lost_journal_ok(seed)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Race many processes booking the same properties")
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--attempts", type=int, default=200, help="booking attempts per worker")
+    parser.add_argument("--properties", type=int, default=20)
+    parser.add_argument("--days", type=int, default=60, help="days stays are drawn from")
+    parser.add_argument("--spread", action="store_true", help="give each worker its own properties")
+    parser.add_argument("--compact-every", type=int, default=storage.COMPACT_EVERY)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    report = run(args.backend, args.workers, args.attempts, args.properties, args.days, args.spread,
+                 args.compact_every, args.seed)
+    print(json.dumps({**report, "double_bookings": report["double_bookings"][:10]}, indent=2))
+    if report.get("lost_journal_ok") is False:
+        print("booking failed after the journal was deleted", file=sys.stderr)
+        sys.exit(1)
+    if report["double_bookings"] or report["calendar_mismatches"]:
+        print(f"{len(report['double_bookings'])} double-booked days, "
+              f"{len(report['calendar_mismatches'])} properties with wrong calendars", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,58 @@
+"""
+Runs the date corpus through the local date parser and reports how many inputs are
+resolved without an LLM call (hit rate), whether those answers are right, and parse time.
+
+    python -m benchmarks.date_hit_rate [corpus.json]
+
+Exits with status 1 if any input is resolved to the wrong date.
+"""
+import json
+import os
+import sys
+import time
+from datetime import date
+
+from dateparse import parse_date, parse_date_range
+
+CORPUS = os.path.join(os.path.dirname(__file__), "date_corpus.json")
+
+
+def run(path: str = CORPUS) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        corpus = json.load(f)
+    today = date.fromisoformat(corpus["today"])
+    default_year = corpus.get("default_year")
+
+    hits = wrong = 0
+    failures = []
+    start = time.perf_counter()
+    for case in corpus["cases"]:
+        if case.get("range"):
+            result = parse_date_range(case["text"], today=today, default_year=default_year)
+            got = [d.isoformat() for d in result] if result else None
+        else:
+            result = parse_date(case["text"], today=today, default_year=default_year)
+            got = result.isoformat() if result else None
+        if got is not None:
+            hits += 1
+        if got != case["expected"]:
+            wrong += 1
+            failures.append({"text": case["text"], "expected": case["expected"], "got": got})
+    elapsed = time.perf_counter() - start
+
+    total = len(corpus["cases"])
+    return {
+        "cases": total,
+        "resolved_locally": hits,
+        "sent_to_llm": total - hits,
+        "hit_rate": hits / total if total else 0.0,
+        "wrong": wrong,
+        "failures": failures,
+        "us_per_parse": elapsed / total * 1e6 if total else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    report = run(sys.argv[1] if len(sys.argv) > 1 else CORPUS)
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if report["wrong"] else 0)
@@ -0,0 +1,66 @@
+"""
+Compares typo lookups through the trigram index with difflib.get_close_matches,
+which compares the query against the whole vocabulary.
+
+    python -m benchmarks.fuzzy_lookup [vocabulary size] [queries]
+"""
+import json
+import random
+import string
+import sys
+import time
+from difflib import get_close_matches
+
+from fuzzy import TrigramIndex
+
+
+# one random edit: drop, double, swap or replace a letter
+def typo(word: str, rng: random.Random) -> str:
+    i = rng.randrange(1, len(word) - 1)
+    edit = rng.choice(("drop", "double", "swap", "replace"))
+    if edit == "drop":
+        return word[:i] + word[i + 1:]
+    if edit == "double":
+        return word[:i] + word[i] + word[i:]
+    if edit == "swap":
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    return word[:i] + rng.choice(string.ascii_lowercase) + word[i + 1:]
+
+
+def run(size: int = 20000, queries: int = 200, seed: int = 7) -> dict:
+    rng = random.Random(seed)
+    vocabulary = list({"".join(rng.choices(string.ascii_lowercase, k=rng.randint(6, 12))) for _ in range(size)})
+    targets = rng.sample(vocabulary, queries)
+    typos = [typo(word, rng) for word in targets]
+
+    start = time.perf_counter()
+    index = TrigramIndex(vocabulary)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    answers = [index.best(q) for q in typos]
+    trigram = time.perf_counter() - start
+    trigram_hits = sum(a == t for a, t in zip(answers, targets))
+    trigram_wrong = sum(a is not None and a != t for a, t in zip(answers, targets))
+
+    start = time.perf_counter()
+    difflib_hits = sum(get_close_matches(q, vocabulary, n=1, cutoff=0.65) == [t] for q, t in zip(typos, targets))
+    scan = time.perf_counter() - start
+
+    return {
+        "vocabulary": len(vocabulary),
+        "queries": queries,
+        "index_build_s": build,
+        "trigram_ms_per_query": trigram / queries * 1e3,
+        "trigram_correct": trigram_hits / queries,
+        # below the threshold these would go on to the LLM; wrong answers are the costly case
+        "trigram_deferred": (queries - trigram_hits - trigram_wrong) / queries,
+        "trigram_wrong": trigram_wrong / queries,
+        "difflib_ms_per_query": scan / queries * 1e3,
+        "difflib_correct": difflib_hits / queries,
+    }
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    print(json.dumps(run(*args), indent=2))
@@ -0,0 +1,179 @@
+"""
+Local OpenAI-compatible stand-in for the chat completions endpoint.
+
+Replays recorded responses with an injected latency, and in record mode forwards unknown
+requests to a real endpoint and stores their answers. Recordings are matched on the last
+user message of the request, so they survive changes to the model name or system prompt.
+
+    python -m benchmarks.llm_stub --port 8765 --latency 0.4 --jitter 0.25
+    python -m benchmarks.llm_stub --record https://openrouter.ai/api/v1/chat/completions
+
+Point the app at it with llm.CLIENT.url = "http://127.0.0.1:8765/v1/chat/completions".
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+import requests
+
+RECORDINGS = os.path.join(os.path.dirname(__file__), "llm_recordings.json")
+
+
+def prompt_of(payload: dict) -> str:
+    """The text a request is matched on: its last user message."""
+    messages = payload.get("messages") or []
+    return next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+
+
+def completion(content: str, model: str = "") -> dict:
+    return {
+        "id": "stub",
+        "object": "chat.completion",
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+    }
+
+
+class StubServer:
+    """
+    The stand-in server, run in a background thread. `stats` counts replayed, recorded and
+    missed requests; a miss is answered with empty content, as a model with nothing useful to say.
+    """
+
+    def __init__(self, recordings: str = RECORDINGS, latency: float = 0.0, jitter: float = 0.0,
+                 upstream: Optional[str] = None, host: str = "127.0.0.1", port: int = 0, seed: Optional[int] = None):
+        self.path = recordings
+        self.latency = latency
+        self.jitter = jitter
+        self.upstream = upstream
+        self.random = random.Random(seed)
+        self.responses = {}
+        if os.path.exists(recordings):
+            with open(recordings, "r", encoding="utf-8") as f:
+                self.responses = {r["prompt"]: r["content"] for r in json.load(f)}
+        self.stats = {"requests": 0, "replayed": 0, "recorded": 0, "missed": 0}
+        self.missed_prompts = []  # prompts to record next time
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1/chat/completions"
+
+    def start(self) -> "StubServer":
+        self.thread.start()
+        return self
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+    def _delay(self) -> float:
+        if not self.latency:
+            return 0.0
+        return max(0.0, self.latency * self.random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    def _record(self, prompt: str, content: str):
+        self.responses[prompt] = content
+        records = [{"prompt": p, "content": c} for p, c in self.responses.items()]
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(records, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    # forward to the real endpoint with the caller's key, None if that fails
+    def _forward(self, payload: dict, authorization: str) -> Optional[str]:
+        try:
+            r = requests.post(self.upstream, json=payload, timeout=60,
+                              headers={"Authorization": authorization, "Content-Type": "application/json"})
+        except requests.RequestException:
+            return None
+        if r.status_code != 200:
+            return None
+        return (r.json().get("choices") or [{}])[0].get("message", {}).get("content", "")
+
+    def respond(self, payload: dict, authorization: str = "") -> str:
+        prompt = prompt_of(payload)
+        with self._lock:
+            self.stats["requests"] += 1
+            content = self.responses.get(prompt)
+            if content is not None:
+                self.stats["replayed"] += 1
+                return content
+        if self.upstream:
+            content = self._forward(payload, authorization)
+            if content is not None:
+                with self._lock:
+                    self._record(prompt, content)
+                    self.stats["recorded"] += 1
+                return content
+        with self._lock:
+            self.stats["missed"] += 1
+            if prompt not in self.missed_prompts:
+                self.missed_prompts.append(prompt)
+        return ""
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real endpoint
+            disable_nagle_algorithm = True  # headers and body go out separately, don't wait on delayed ACKs
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    payload = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    payload = None
+                if not isinstance(payload, dict):
+                    self._send(400, {"error": {"message": "invalid JSON body"}})
+                    return
+                time.sleep(stub._delay())
+                content = stub.respond(payload, self.headers.get("Authorization", ""))
+                self._send(200, completion(content, payload.get("model", "")))
+
+            def _send(self, status: int, body: dict):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OpenAI-compatible record/replay stand-in")
+    parser.add_argument("--recordings", default=RECORDINGS)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="latency varies by +/- this fraction")
+    parser.add_argument("--record", metavar="URL", help="forward unknown requests here and record the answers")
+    args = parser.parse_args()
+
+    stub = StubServer(args.recordings, args.latency, args.jitter, args.record, args.host, args.port).start()
+    print(f"Serving {len(stub.responses)} recorded responses at {stub.url}")
+    try:
+        stub.thread.join()
+    except KeyboardInterrupt:
+        stub.shutdown()
+        print(json.dumps(stub.stats))
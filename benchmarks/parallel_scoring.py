@@ -0,0 +1,92 @@
+"""
+Sharded parallel scoring (parallel.ShardedCatalog) against scoring in one process, on one
+synthetic catalog: latency of single large queries (one at a time, split across every shard)
+and throughput of a batch of queries sent in one call, at each worker count. Also checks
+that every worker count returns the same top N as the single-process path.
+
+    python -m benchmarks.parallel_scoring --properties 200000 --workers 1 2 4 8
+    python -m benchmarks.parallel_scoring --partition location --mix city
+
+Speedups are bounded by the cores available (reported as "cpus").
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import generate_properties, generate_requests
+from catalog import Catalog
+from parallel import PARTITIONS, ShardedCatalog
+from properties import Property
+from recommender import RECOMMEND_TOP_N, parse_request, recommend, recommend_many
+
+
+def latency_ms(search, requests) -> dict:
+    times = []
+    for request in requests:
+        start = time.perf_counter()
+        search(request)
+        times.append((time.perf_counter() - start) * 1e3)
+    return {"p50": float(np.median(times)), "p95": float(np.percentile(times, 95))}
+
+
+def throughput(search_many, requests) -> float:
+    start = time.perf_counter()
+    search_many(requests)
+    return len(requests) / (time.perf_counter() - start)
+
+
+def run(properties: int = 200000, workers=(1, 2, 4, 8), partition: str = "range", mix: str = "region",
+        queries: int = 20, batch: int = 500, seed: int = 0) -> dict:
+    catalog = Catalog.from_properties([Property.from_dict(p) for p in generate_properties(properties, seed)])
+    single = generate_requests(queries, mix, seed + 1)
+    many = generate_requests(batch, mix, seed + 2)
+    expected = [[p.id for p in found] for found in recommend_many(catalog, many)]
+
+    report = {
+        "properties": properties,
+        "partition": partition,
+        "mix": mix,
+        "cpus": os.cpu_count(),
+        "in_process": {
+            "query_ms": latency_ms(lambda req: recommend(catalog, req).page(1), single),
+            "batch_per_s": throughput(lambda reqs: recommend_many(catalog, reqs), many),
+        },
+        "sharded": {},
+    }
+    for count in workers:
+        start = time.perf_counter()
+        with ShardedCatalog(catalog, count, partition) as sharded:
+            startup = time.perf_counter() - start
+            parsed = [parse_request(req) for req in many]
+            result = {
+                "startup_s": startup,
+                "query_ms": latency_ms(lambda req: sharded.top(parse_request(req), RECOMMEND_TOP_N), single),
+                "batch_per_s": throughput(lambda reqs: sharded.top_many(parsed, RECOMMEND_TOP_N), many),
+                "same_results": [[p.id for p in found] for found in sharded.recommend_many(many)] == expected,
+            }
+        report["sharded"][count] = result
+
+    base = report["sharded"][workers[0]]
+    for result in report["sharded"].values():
+        result["query_speedup"] = base["query_ms"]["p50"] / result["query_ms"]["p50"]
+        result["batch_speedup"] = result["batch_per_s"] / base["batch_per_s"]
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latency and throughput of sharded scoring by worker count")
+    parser.add_argument("--properties", type=int, default=200000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--partition", choices=PARTITIONS, default="range")
+    parser.add_argument("--mix", default="region", help="query mix of benchmarks.synthetic.MIXES")
+    parser.add_argument("--queries", type=int, default=20, help="single queries timed one by one")
+    parser.add_argument("--batch", type=int, default=500, help="queries sent in one batch")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    report = run(args.properties, args.workers, args.partition, args.mix, args.queries, args.batch, args.seed)
+    print(json.dumps(report, indent=2))
+    if not all(result["same_results"] for result in report["sharded"].values()):
+        raise SystemExit("sharded results differ from the single-process ones")
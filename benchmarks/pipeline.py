@@ -0,0 +1,187 @@
+"""
+End-to-end latency benchmark of the search path (User.get_recommendations -> llm_parse ->
+recommendation_logic), run offline against the record/replay stand-in with scripted answers
+to every input() prompt.
+
+    python -m benchmarks.pipeline --latency 0.4 --jitter 0.25 --repeat 3
+    python -m benchmarks.pipeline --budget total=1.5 --budget api_calls=2   # regression gate
+
+Reports p50/p95/p99 seconds per stage and LLM API calls per query. Stages nest: "api" is
+the time spent in HTTP calls wherever they happen, "llm_parse" includes location, dates and
+synonyms, "recommend" includes "catalog_load", "total" is the whole get_recommendations call.
+"""
+import argparse
+import builtins
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+
+import numpy as np
+
+import llm
+import users
+from llm_cache import ResponseCache
+from benchmarks.llm_stub import RECORDINGS, StubServer
+
+QUERIES = os.path.join(os.path.dirname(__file__), "queries.json")
+STAGES = ("total", "llm_parse", "api", "location", "dates", "synonyms", "catalog_load", "recommend")
+
+
+class ScriptExhausted(Exception):
+    """The pipeline asked for more input than the query's script has."""
+
+
+class ScriptedInput:
+    """Stands in for input(): API key, query, then the scripted answers; declines to reserve."""
+
+    def __init__(self, query: str, answers):
+        self.queue = ["offline-key", query, *answers]
+
+    def __call__(self, prompt=""):
+        if "make a reservation" in prompt:
+            return "n"
+        if not self.queue:
+            raise ScriptExhausted(prompt)
+        return self.queue.pop(0)
+
+
+class StageTimer:
+    """Wraps module functions so each call adds its duration to the current query's stage totals."""
+
+    def __init__(self):
+        self.current = defaultdict(float)
+        self.calls = 0
+        self._patched = []
+
+    def wrap(self, owner, name: str, stage: str, count_calls: bool = False):
+        original = getattr(owner, name)
+
+        def timed(*args, **kwargs):
+            if count_calls:
+                self.calls += 1
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.current[stage] += time.perf_counter() - start
+
+        setattr(owner, name, timed)
+        self._patched.append((owner, name, original))
+
+    def restore(self):
+        for owner, name, original in reversed(self._patched):
+            setattr(owner, name, original)
+        self._patched.clear()
+
+    def take(self) -> dict:
+        stages, calls = dict(self.current), self.calls
+        self.current, self.calls = defaultdict(float), 0
+        return {**stages, "api_calls": calls}
+
+
+class Session:
+    """Stands in for UserManager, whose catalog is all get_recommendations uses; a new one per query keeps it cold."""
+
+    def __init__(self):
+        self.properties = users.PropertiesController()
+
+
+def percentiles(values) -> dict:
+    p50, p95, p99 = np.percentile(values, [50, 95, 99]) if len(values) else (0.0, 0.0, 0.0)
+    return {"p50": float(p50), "p95": float(p95), "p99": float(p99)}
+
+
+def run(corpus: str = QUERIES, url: str = None, recordings: str = RECORDINGS, latency: float = 0.0,
+        jitter: float = 0.0, repeat: int = 1, keep_cache: bool = False) -> dict:
+    with open(corpus, "r", encoding="utf-8") as f:
+        spec = json.load(f)
+    stub = None if url else StubServer(recordings, latency, jitter, seed=0).start()
+    llm.CLIENT.url = url or stub.url
+    llm.RESPONSE_CACHE = ResponseCache(path=":memory:")
+
+    timer = StageTimer()
+    timer.wrap(llm.CLIENT, "post", "api", count_calls=True)
+    timer.wrap(llm, "map_location_to_db", "location")
+    timer.wrap(llm, "resolve_date", "dates")
+    timer.wrap(llm, "parse_date_range", "dates")
+    timer.wrap(llm, "normalize_synonyms", "synonyms")
+    timer.wrap(users, "llm_parse", "llm_parse")
+    timer.wrap(users.PropertiesController, "catalog", "catalog_load")  # inside "recommend"
+    timer.wrap(users, "recommendation_logic", "recommend")
+
+    samples, failures = [], []
+    user = users.User("bench", "", "Bench", "bench@example.com", preferences=spec.get("preferences"))
+    real_input = builtins.input
+    try:
+        for _ in range(repeat):
+            for case in spec["queries"]:
+                if not keep_cache:
+                    llm.RESPONSE_CACHE.clear()
+                builtins.input = ScriptedInput(case["query"], case.get("answers", []))
+                start = time.perf_counter()
+                try:
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        user.get_recommendations(Session())
+                except Exception as e:
+                    failures.append({"query": case["query"], "error": f"{type(e).__name__}: {e}"})
+                    timer.take()
+                    continue
+                sample = timer.take()
+                sample["total"] = time.perf_counter() - start
+                samples.append(sample)
+    finally:
+        builtins.input = real_input
+        timer.restore()
+        if stub:
+            stub.shutdown()
+
+    calls = [s["api_calls"] for s in samples]
+    return {
+        "queries": len(spec["queries"]) * repeat,
+        "completed": len(samples),
+        "failures": failures,
+        "latency_injected": latency,
+        "stages": {stage: percentiles([s.get(stage, 0.0) for s in samples]) for stage in STAGES},
+        "api_calls_per_query": {"mean": float(np.mean(calls)) if calls else 0.0, "max": max(calls, default=0)},
+        "stub": stub.stats if stub else None,
+        "unrecorded_prompts": stub.missed_prompts if stub else [],
+    }
+
+
+# "--budget total=1.5" fails the run if p95 of total exceeds 1.5s; "api_calls" checks the mean
+def over_budget(report: dict, budgets) -> list:
+    exceeded = []
+    for budget in budgets:
+        name, limit = budget.split("=")
+        value = report["api_calls_per_query"]["mean"] if name == "api_calls" else report["stages"][name]["p95"]
+        if value > float(limit):
+            exceeded.append(f"{name}: {value:.3f} > {limit}")
+    return exceeded
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline end-to-end latency of the search path")
+    parser.add_argument("--corpus", default=QUERIES)
+    parser.add_argument("--recordings", default=RECORDINGS)
+    parser.add_argument("--url", help="use an already running stand-in (or any compatible endpoint)")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--keep-cache", action="store_true", help="keep LLM responses cached across queries")
+    parser.add_argument("--budget", action="append", default=[], metavar="STAGE=LIMIT")
+    parser.add_argument("--json", metavar="PATH", help="also write the report to a file")
+    args = parser.parse_args()
+
+    report = run(args.corpus, args.url, args.recordings, args.latency, args.jitter, args.repeat, args.keep_cache)
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    exceeded = over_budget(report, args.budget)
+    if exceeded:
+        print("Over budget: " + "; ".join(exceeded), file=sys.stderr)
+        sys.exit(1)
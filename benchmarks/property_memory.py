@@ -0,0 +1,78 @@
+"""
+Memory of Property objects: the compact representation (slots, interned strings, ordinal
+arrays) against the plain one it replaced (instance __dict__, a list of date objects per
+calendar), on the same synthetic catalog. Sizes are traced allocations per property.
+
+    python -m benchmarks.property_memory --properties 100000 --occupancy 0.3
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from datetime import datetime
+
+from benchmarks.synthetic import generate_properties
+from properties import Property
+
+
+class PlainProperty:
+    """The previous layout of Property, kept here as the baseline."""
+
+    def __init__(self, id, location, type, price, capacity, environment, features, tags, booked=None):
+        self.id = id
+        self.location = location
+        self.type = type
+        self.price = price
+        self.capacity = capacity
+        self.environment = environment
+        self.features = features
+        self.tags = tags
+        self.booked = booked or []
+        self._availability = None
+
+    @classmethod
+    def from_dict(cls, data):
+        booked_dates = [datetime.fromisoformat(d).date() for d in data.get("booked", [])]
+        return cls(data["id"], data["location"], data["type"], data["price"], data["capacity"], data["environment"],
+                   data.get("features", []), data.get("tags", []), booked_dates)
+
+
+# traced bytes left after parsing the JSON into objects of `cls` (the parsed records are dropped,
+# so the plain layout is charged for the lists and strings it keeps from them), and seconds to build them
+def measure(cls, text: str) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    records = json.loads(text)
+    start = time.perf_counter()
+    objects = [cls.from_dict(record) for record in records]
+    seconds = time.perf_counter() - start
+    del records
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return {"bytes_per_property": size / len(objects), "total_mb": size / 2 ** 20, "build_s": seconds}
+
+
+def run(n: int = 100000, occupancy: float = 0.3, booked_fraction: float = 1.0, seed: int = 0) -> dict:
+    text = json.dumps(generate_properties(n, seed, booked_fraction=booked_fraction, occupancy=occupancy))
+    plain = measure(PlainProperty, text)
+    compact = measure(Property, text)
+    return {
+        "properties": n,
+        "occupancy": occupancy,
+        "booked_fraction": booked_fraction,
+        "plain": plain,
+        "compact": compact,
+        "reduction": plain["bytes_per_property"] / compact["bytes_per_property"],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory of compact vs plain Property objects")
+    parser.add_argument("--properties", type=int, default=100000)
+    parser.add_argument("--occupancy", type=float, default=0.3)
+    parser.add_argument("--booked-fraction", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(run(args.properties, args.occupancy, args.booked_fraction, args.seed), indent=2))
@@ -0,0 +1,84 @@
+"""
+Recommendation result cache on a session-like workload: a pool of distinct searches replayed
+in random order (users going back through the menus and searching again), with a booking from
+the results every --book-every searches, which moves the catalog version. Reports the hit rate
+and the latency of recommendation_logic with and without the cache.
+
+    python -m benchmarks.result_cache --properties 20000 --searches 500 --distinct 40
+    python -m benchmarks.result_cache --backend sqlite
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import date
+
+import numpy as np
+
+import storage
+from benchmarks.synthetic import generate_properties, generate_requests
+from properties import PropertiesController
+from recommender import recommendation_logic
+from result_cache import ResultCache
+
+
+def replay(controller, searches, cache, book_every: int) -> dict:
+    latencies = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i, request in enumerate(searches, 1):
+            start = time.perf_counter()
+            found = recommendation_logic(controller, request, cache)
+            latencies.append(time.perf_counter() - start)
+            if book_every and i % book_every == 0 and found:
+                controller.book(found[0].id, date.fromisoformat(request["start_date"]),
+                                date.fromisoformat(request["end_date"]))
+    latencies = np.array(latencies) * 1000
+    return {"mean_ms": float(latencies.mean()), "p50_ms": float(np.percentile(latencies, 50)),
+            "p95_ms": float(np.percentile(latencies, 95))}
+
+
+def run(backend: str = "json", properties: int = 20000, searches: int = 500, distinct: int = 40,
+        book_every: int = 50, entries: int = 256, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    pool = generate_requests(distinct, "city", seed)
+    searches = [rng.choice(pool) for _ in range(searches)]
+    report = {"backend": backend, "properties": properties, "searches": len(searches), "distinct": distinct,
+              "book_every": book_every}
+
+    for mode in ("uncached", "cached"):
+        # a fresh copy of the catalog for each mode, so both see the same bookings
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "properties.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(generate_properties(properties, seed), f)
+            if backend == "sqlite":
+                db = os.path.join(directory, "arik.sqlite3")
+                storage.import_json(db, path, os.path.join(directory, "users.json"))
+                store = storage.SQLitePropertyStore(db)
+            else:
+                store = storage.JsonPropertyStore(path)
+            cache = ResultCache(entries) if mode == "cached" else None
+            report[mode] = replay(PropertiesController(store), searches, cache, book_every)
+            if cache is not None:
+                report["cache"] = cache.stats()
+
+    report["speedup_mean"] = report["uncached"]["mean_ms"] / report["cached"]["mean_ms"]
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hit rate and latency of the recommendation result cache")
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json")
+    parser.add_argument("--properties", type=int, default=20000)
+    parser.add_argument("--searches", type=int, default=500)
+    parser.add_argument("--distinct", type=int, default=40, help="distinct searches the workload draws from")
+    parser.add_argument("--book-every", type=int, default=50, help="book a result every N searches (0: never)")
+    parser.add_argument("--entries", type=int, default=256, help="cache size")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(run(args.backend, args.properties, args.searches, args.distinct, args.book_every,
+                         args.entries, args.seed), indent=2))
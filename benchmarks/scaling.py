@@ -0,0 +1,139 @@
+"""
+Scaling benchmark of the recommendation pipeline on synthetic catalogs.
+
+For each catalog size it measures loading (JSON -> Property objects), catalog preprocessing,
+and per query filter (location, capacity, availability), scoring and top-N selection, for
+each query mix in benchmarks.synthetic.MIXES, plus peak traced memory of a load-and-query pass.
+
+    python -m benchmarks.scaling --sizes 1000 10000 100000 --out scaling.json
+    python -m benchmarks.scaling --sizes 1000 10000 --compare scaling.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.synthetic import MIXES, Profile, generate_properties, generate_requests
+from catalog import Catalog
+from properties import Property
+from recommender import RECOMMEND_TOP_N, candidate_rows, parse_request, score_candidates, select_top
+
+
+def load(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        return [Property.from_dict(p) for p in json.load(f)]
+
+
+def run_queries(catalog: Catalog, requests) -> dict:
+    stages = {"parse": [], "filter": [], "score": [], "topn": []}
+    candidates = []
+    for user_req in requests:
+        t0 = time.perf_counter()
+        request = parse_request(user_req)
+        t1 = time.perf_counter()
+        rows = candidate_rows(catalog, request)
+        t2 = time.perf_counter()
+        scores = score_candidates(catalog, rows, request)
+        t3 = time.perf_counter()
+        select_top(scores, catalog.ids[rows], RECOMMEND_TOP_N)
+        t4 = time.perf_counter()
+        for stage, seconds in zip(stages, (t1 - t0, t2 - t1, t3 - t2, t4 - t3)):
+            stages[stage].append(seconds * 1e3)
+        candidates.append(len(rows))
+    result = {f"{stage}_ms": {"p50": float(np.median(ms)), "p95": float(np.percentile(ms, 95))} for stage, ms in stages.items()}
+    total = np.sum([stages[stage] for stage in stages], axis=0)
+    result["query_ms"] = {"p50": float(np.median(total)), "p95": float(np.percentile(total, 95))}
+    result["candidates_mean"] = float(np.mean(candidates))
+    return result
+
+
+# peak Python + numpy allocations while loading the catalog and answering a few queries
+def peak_memory_mb(path: str, requests) -> float:
+    tracemalloc.start()
+    try:
+        catalog = Catalog.from_properties(load(path))
+        run_queries(catalog, requests)
+        return tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
+
+
+def run(sizes, queries: int = 50, seed: int = 0, booked_fraction: float = 0.5, occupancy: float = 0.3) -> dict:
+    profile = Profile()
+    mixes = {mix: generate_requests(queries, mix, seed, profile) for mix in MIXES}
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            path = os.path.join(tmp, f"properties_{size}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(generate_properties(size, seed, profile, booked_fraction, occupancy), f)
+
+            start = time.perf_counter()
+            properties = load(path)
+            loaded = time.perf_counter()
+            catalog = Catalog.from_properties(properties)
+            built = time.perf_counter()
+
+            results.append({
+                "size": size,
+                "file_mb": os.path.getsize(path) / 2 ** 20,
+                "load_s": loaded - start,
+                "catalog_s": built - loaded,
+                "mixes": {mix: run_queries(catalog, requests) for mix, requests in mixes.items()},
+                "peak_mb": peak_memory_mb(path, mixes["city"][:5]),
+            })
+            del properties, catalog
+    return {
+        "meta": {
+            "seed": seed, "queries": queries, "booked_fraction": booked_fraction, "occupancy": occupancy,
+            "python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine(),
+            "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        },
+        "results": results,
+    }
+
+
+# flatten a report into {"size/metric": value} for comparisons
+def _flatten(report: dict) -> dict:
+    flat = {}
+    for result in report["results"]:
+        prefix = str(result["size"])
+        for key in ("load_s", "catalog_s", "peak_mb"):
+            flat[f"{prefix}/{key}"] = result[key]
+        for mix, stats in result["mixes"].items():
+            for key in ("filter_ms", "score_ms", "topn_ms", "query_ms"):
+                flat[f"{prefix}/{mix}/{key}/p50"] = stats[key]["p50"]
+    return flat
+
+
+def compare(report: dict, baseline: dict) -> dict:
+    """Ratio new / baseline of every metric present in both (below 1.0 is faster or smaller)."""
+    new, old = _flatten(report), _flatten(baseline)
+    return {key: new[key] / old[key] for key in new if key in old and old[key]}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scaling benchmark of the recommendation pipeline")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=50, help="requests per query mix")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--booked-fraction", type=float, default=0.5)
+    parser.add_argument("--occupancy", type=float, default=0.3)
+    parser.add_argument("--out", help="write the report as JSON")
+    parser.add_argument("--compare", metavar="BASELINE", help="print ratios against an earlier report")
+    args = parser.parse_args()
+
+    report = run(args.sizes, args.queries, args.seed, args.booked_fraction, args.occupancy)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            report["ratios"] = compare(report, json.load(f))
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,123 @@
+"""
+Per-search latency of the CLI's old shape, a fresh process per session (interpreter start, imports,
+catalog load, then the search), against the warm local service (service.py) answering over HTTP
+through the client the CLI uses. Searches are structured requests (no LLM), drawn from a pool so
+some repeat, with a reservation of a result every --book-every searches.
+
+    python -m benchmarks.service_latency --properties 20000 --searches 200 --distinct 40
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import generate_properties, generate_requests
+from client import ServiceClient, ServiceError
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = "Bench!mark1"
+
+# what one search cost when every CLI session was its own process
+COLD_SEARCH = (
+    "import json, sys\n"
+    "from properties import PropertiesController\n"
+    "from recommender import recommendation_logic\n"
+    "recommendation_logic(PropertiesController(), json.loads(sys.argv[1]))\n"
+)
+
+
+def percentiles(times) -> dict:
+    times = np.array(times) * 1000
+    return {"mean_ms": float(times.mean()), "p50_ms": float(np.percentile(times, 50)),
+            "p95_ms": float(np.percentile(times, 95))}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def run(properties: int = 20000, searches: int = 200, distinct: int = 40, book_every: int = 20,
+        cold: int = 5, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    pool = generate_requests(distinct, "city", seed)
+    replay = [rng.choice(pool) for _ in range(searches)]
+    env = {**os.environ, "PYTHONPATH": REPO, "ARIK_STORAGE": "json"}
+    report = {"properties": properties, "searches": searches, "distinct": distinct, "book_every": book_every}
+
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "properties.json"), "w", encoding="utf-8") as f:
+            json.dump(generate_properties(properties, seed), f)
+        with open(os.path.join(directory, "users.json"), "w", encoding="utf-8") as f:
+            json.dump([{"username": "bench", "password": hashlib.sha256(PASSWORD.encode()).hexdigest(),
+                        "name": "Bench", "email": "bench@example.com", "reservations": [], "preferences": {}}], f)
+
+        times = []
+        for request in replay[:cold]:
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "-c", COLD_SEARCH, json.dumps(request)], cwd=directory, env=env,
+                           stdout=subprocess.DEVNULL, check=True)
+            times.append(time.perf_counter() - start)
+        report["process_per_search"] = percentiles(times)
+
+        port = free_port()
+        start = time.perf_counter()
+        server = subprocess.Popen([sys.executable, os.path.join(REPO, "service.py"), "--port", str(port)],
+                                  cwd=directory, env=env, stdout=subprocess.DEVNULL)
+        try:
+            client = ServiceClient(f"http://127.0.0.1:{port}")
+            while True:
+                try:
+                    client.get("/health")
+                    break
+                except OSError:
+                    if server.poll() is not None:
+                        raise SystemExit("the service exited during startup")
+                    time.sleep(0.05)
+            report["service_startup_s"] = time.perf_counter() - start
+            client.token = client.post("/login", {"username": "bench", "password": PASSWORD})["token"]
+
+            times, reserve_times = [], []
+            for i, request in enumerate(replay, 1):
+                start = time.perf_counter()
+                found = client.post("/search", {"request": request})
+                times.append(time.perf_counter() - start)
+                if book_every and i % book_every == 0 and found["results"]:
+                    start = time.perf_counter()
+                    try:
+                        client.post("/reserve", {"property_id": found["results"][0]["id"]})
+                    except ServiceError:
+                        pass  # taken by an earlier reservation of the same search
+                    reserve_times.append(time.perf_counter() - start)
+            report["service_search"] = percentiles(times)
+            if reserve_times:
+                report["service_reserve"] = percentiles(reserve_times)
+            report["result_cache"] = client.get("/health")["result_cache"]
+            client.close()
+        finally:
+            server.terminate()
+            server.wait()
+
+    report["speedup_p50"] = report["process_per_search"]["p50_ms"] / report["service_search"]["p50_ms"]
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search latency of a process per session against the warm service")
+    parser.add_argument("--properties", type=int, default=20000)
+    parser.add_argument("--searches", type=int, default=200, help="searches sent to the service")
+    parser.add_argument("--distinct", type=int, default=40, help="distinct searches the workload draws from")
+    parser.add_argument("--book-every", type=int, default=20, help="reserve a result every N searches (0: never)")
+    parser.add_argument("--cold", type=int, default=5, help="searches run in a fresh process each")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(run(args.properties, args.searches, args.distinct, args.book_every, args.cold, args.seed), indent=2))
@@ -0,0 +1,199 @@
+"""
+Seeded synthetic catalogs, users and search requests, drawn from the distributions of the
+shipped properties.json (locations, environments per location, types, feature and tag
+frequencies, prices, capacities), with optional dense booking calendars.
+
+    python -m benchmarks.synthetic --properties 100000 --users 1000 --occupancy 0.4 --out /tmp/synthetic
+"""
+import argparse
+import hashlib
+import json
+import os
+from collections import Counter
+from datetime import date, timedelta
+from typing import List
+
+import numpy as np
+
+PROFILE_SOURCE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "properties.json")
+NAMES = ["Alex", "Sam", "Jordan", "Taylor", "Morgan", "Casey", "Riley", "Jamie", "Avery", "Quinn"]
+
+
+def _weights(counter: Counter):
+    values = sorted(counter)
+    counts = np.array([counter[v] for v in values], dtype=float)
+    return values, counts / counts.sum()
+
+
+class Profile:
+    """Empirical distributions of a properties file."""
+
+    def __init__(self, path: str = PROFILE_SOURCE):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.locations, self.location_p = _weights(Counter(p["location"] for p in data))
+        self.location_environments = {
+            loc: _weights(Counter(p["environment"] for p in data if p["location"] == loc)) for loc in self.locations
+        }
+        self.environments, self.environment_p = _weights(Counter(p["environment"] for p in data))
+        self.types, self.type_p = _weights(Counter(p["type"] for p in data))
+        self.features, self.feature_p = _weights(Counter(f for p in data for f in p["features"]))
+        self.tags, self.tag_p = _weights(Counter(t for p in data for t in p["tags"]))
+        self.feature_counts, self.feature_count_p = _weights(Counter(len(p["features"]) for p in data))
+        self.tag_counts, self.tag_count_p = _weights(Counter(len(p["tags"]) for p in data))
+        self.capacities, self.capacity_p = _weights(Counter(p["capacity"] for p in data))
+        self.prices = np.array([p["price"] for p in data], dtype=float)
+
+
+CHUNK = 100_000  # properties generated per vectorized batch
+
+
+def _pick_many(rng, values, p, count: int) -> List[str]:
+    return [values[i] for i in rng.choice(len(values), size=min(count, len(values)), replace=False, p=p)]
+
+
+# weighted sampling without replacement for many rows at once (Gumbel top-k): row i gets counts[i] values
+def _pick_rows(rng, values, p, counts) -> List[List[str]]:
+    keys = np.log(p) - np.log(-np.log(rng.random((len(counts), len(values)))))
+    order = np.argsort(-keys, axis=1)
+    return [[values[j] for j in row[:k]] for row, k in zip(order, counts)]
+
+
+# random stays of 2-7 nights per row, enough of them to book about `occupancy` of the horizon
+def _calendars(rng, rows: int, horizon_days: int, occupancy: float) -> np.ndarray:
+    if rows == 0 or occupancy <= 0:
+        return np.zeros((rows, horizon_days), dtype=bool)
+    stays = max(1, int(np.ceil(-horizon_days * np.log(1 - min(occupancy, 0.99)) / 4.5)))
+    starts = rng.integers(0, horizon_days, size=(rows, stays))
+    ends = np.minimum(starts + rng.integers(2, 8, size=(rows, stays)), horizon_days)
+    change = np.zeros((rows, horizon_days + 1), dtype=np.int32)
+    row_index = np.repeat(np.arange(rows), stays)
+    np.add.at(change, (row_index, starts.ravel()), 1)
+    np.add.at(change, (row_index, ends.ravel()), -1)
+    return np.cumsum(change[:, :horizon_days], axis=1) > 0
+
+
+def _environments(rng, profile, locations) -> List[str]:
+    environments = np.empty(len(locations), dtype=object)
+    for i, location in enumerate(profile.locations):
+        at = np.flatnonzero(locations == i)
+        values, p = profile.location_environments[location]
+        environments[at] = np.array(values, dtype=object)[rng.choice(len(values), size=len(at), p=p)]
+    return environments
+
+
+def generate_properties(n: int, seed: int = 0, profile: Profile = None, booked_fraction: float = 0.5,
+                        occupancy: float = 0.3, horizon_start: date = date(2025, 6, 1), horizon_days: int = 365) -> List[dict]:
+    """
+    n property dicts in the properties.json format. A `booked_fraction` of them get a booking
+    calendar covering about `occupancy` of the `horizon_days` from `horizon_start`.
+    """
+    profile = profile or Profile()
+    rng = np.random.default_rng(seed)
+    days = np.array([(horizon_start + timedelta(days=i)).isoformat() for i in range(horizon_days)], dtype=object)
+
+    properties = []
+    for first in range(0, n, CHUNK):
+        size = min(CHUNK, n - first)
+        locations = rng.choice(len(profile.locations), size=size, p=profile.location_p)
+        environments = _environments(rng, profile, locations)
+        types = rng.choice(len(profile.types), size=size, p=profile.type_p)
+        capacities = rng.choice(profile.capacities, size=size, p=profile.capacity_p)
+        prices = np.round(np.clip(rng.choice(profile.prices, size=size) * rng.normal(1.0, 0.1, size=size), 20, None), 2)
+        features = _pick_rows(rng, profile.features, profile.feature_p, rng.choice(profile.feature_counts, size=size, p=profile.feature_count_p))
+        tags = _pick_rows(rng, profile.tags, profile.tag_p, rng.choice(profile.tag_counts, size=size, p=profile.tag_count_p))
+        booked_rows = np.flatnonzero(rng.random(size) < booked_fraction)
+        booked = [[] for _ in range(size)]
+        for row, calendar in zip(booked_rows, _calendars(rng, len(booked_rows), horizon_days, occupancy)):
+            booked[row] = days[calendar].tolist()
+
+        for i in range(size):
+            properties.append({
+                "id": first + i + 1,
+                "location": profile.locations[locations[i]],
+                "type": profile.types[types[i]],
+                "price": float(prices[i]),
+                "capacity": int(capacities[i]),
+                "environment": environments[i],
+                "features": features[i],
+                "tags": tags[i],
+                "booked": booked[i],
+            })
+    return properties
+
+
+def generate_users(n: int, seed: int = 0) -> List[dict]:
+    """n user dicts in the users.json format, all with the password "Password1!"."""
+    rng = np.random.default_rng(seed)
+    password = hashlib.sha256("Password1!".encode()).hexdigest()
+    users = []
+    for i in range(n):
+        budget_wt, enviro_wt, feature_wt, tags_wt = rng.dirichlet(np.ones(4))
+        users.append({
+            "username": f"user{i}",
+            "password": password,
+            "name": NAMES[i % len(NAMES)],
+            "email": f"user{i}@example.com",
+            "reservations": [],
+            "preferences": {"budget_wt": budget_wt, "enviro_wt": enviro_wt, "feature_wt": feature_wt, "tags_wt": tags_wt},
+            "attempts": 0,
+        })
+    return users
+
+
+# query mixes: how the location is asked for, how many features/tags, how long the stay is
+MIXES = {
+    "city": {"location": "city", "features": (0, 2), "tags": (0, 1), "nights": (2, 5)},
+    "region": {"location": "region", "features": (0, 2), "tags": (0, 1), "nights": (2, 5)},
+    "picky": {"location": "city", "features": (3, 5), "tags": (2, 3), "nights": (2, 5)},
+    "long_stay": {"location": "region", "features": (1, 3), "tags": (1, 2), "nights": (14, 30)},
+}
+
+
+def generate_requests(n: int, mix: str = "city", seed: int = 0, profile: Profile = None,
+                      horizon_start: date = date(2025, 6, 1), horizon_days: int = 365) -> List[dict]:
+    """n user requirement dicts for recommendation_logic, shaped by one of MIXES."""
+    profile = profile or Profile()
+    spec = MIXES[mix]
+    rng = np.random.default_rng(seed)
+    regions = sorted({loc.split(", ")[-1] for loc in profile.locations})
+    requests = []
+    for _ in range(n):
+        if spec["location"] == "city":
+            location = profile.locations[rng.choice(len(profile.locations), p=profile.location_p)]
+        else:
+            location = regions[rng.integers(len(regions))]
+        nights = int(rng.integers(spec["nights"][0], spec["nights"][1] + 1))
+        start = horizon_start + timedelta(days=int(rng.integers(0, horizon_days - nights)))
+        budget_wt, enviro_wt, feature_wt, tags_wt = rng.dirichlet(np.ones(4))
+        requests.append({
+            "location": location,
+            "group_size": int(rng.choice(profile.capacities, p=profile.capacity_p)),
+            "start_date": start.isoformat(),
+            "end_date": (start + timedelta(days=nights)).isoformat(),
+            "budget": float(np.round(rng.choice(profile.prices), 0)),
+            "environment": profile.environments[rng.choice(len(profile.environments), p=profile.environment_p)] if rng.random() < 0.3 else None,
+            "features": _pick_many(rng, profile.features, profile.feature_p, int(rng.integers(spec["features"][0], spec["features"][1] + 1))),
+            "tags": _pick_many(rng, profile.tags, profile.tag_p, int(rng.integers(spec["tags"][0], spec["tags"][1] + 1))),
+            "budget_wt": budget_wt, "enviro_wt": enviro_wt, "feature_wt": feature_wt, "tags_wt": tags_wt,
+        })
+    return requests
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a seeded synthetic properties.json and users.json")
+    parser.add_argument("--properties", type=int, default=10000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--booked-fraction", type=float, default=0.5)
+    parser.add_argument("--occupancy", type=float, default=0.3)
+    parser.add_argument("--out", default=".")
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    properties = generate_properties(args.properties, args.seed, booked_fraction=args.booked_fraction, occupancy=args.occupancy)
+    with open(os.path.join(args.out, "properties.json"), "w", encoding="utf-8") as f:
+        json.dump(properties, f)
+    with open(os.path.join(args.out, "users.json"), "w", encoding="utf-8") as f:
+        json.dump(generate_users(args.users, args.seed), f, indent=4)
+    print(f"Wrote {args.properties} properties and {args.users} users to {args.out}")
@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+from typing import List, Optional
+from properties import Property
+from availability import AvailabilityIndex, shared_index
+from multihot import MultiHotIndex
+from locations import LocationIndex
+from snapshot import SnapshotProperties, source_snapshot
+
+
+# an interned string column as an object array, one Python string per distinct value
+def _decoded(codes: np.ndarray, table: List[str]) -> np.ndarray:
+    return np.array(table, dtype=object)[codes]
+
+
+class Catalog:
+    """
+    Columnar view of the property catalog, preprocessed once and reused across requests.
+    Numeric columns are NumPy arrays, features/tags are multi-hot indexes and
+    booked dates are checked through an AvailabilityIndex.
+    """
+
+    def __init__(self, ids, location, price, capacity, environment, features, tags,
+                 availability: AvailabilityIndex, properties: Optional[List[Property]] = None,
+                 frame: Optional[pd.DataFrame] = None, locations: Optional[LocationIndex] = None):
+        self.ids = np.asarray(ids)
+        self.location = np.asarray(location, dtype=object)
+        self.locations = locations if locations is not None else LocationIndex(self.location)
+        self.price = np.asarray(price, dtype=float)
+        self.capacity = np.asarray(capacity)
+        self.environment = np.asarray(environment, dtype=object)
+        self.features = features if isinstance(features, MultiHotIndex) else MultiHotIndex(features)
+        self.tags = tags if isinstance(tags, MultiHotIndex) else MultiHotIndex(tags)
+        self.availability = availability
+        self.availability_rows = availability.rows_for(self.ids.tolist())
+        self.properties = properties  # source Property objects, when built from a list
+        self.frame = frame  # source DataFrame, when built from a frame or JSON file
+
+    @classmethod
+    def from_properties(cls, properties: List[Property]):
+        """Build from Property objects, sharing their AvailabilityIndex if they have one."""
+        if source_snapshot(properties) is not None:
+            return cls.from_snapshot(properties)
+        availability = shared_index(properties)
+        if availability is None:
+            availability = AvailabilityIndex.from_booked([p.id for p in properties], [p.booked_ordinals for p in properties])
+        return cls(
+            ids=[p.id for p in properties],
+            location=[p.location for p in properties],
+            price=[p.price for p in properties],
+            capacity=[p.capacity for p in properties],
+            environment=[p.environment for p in properties],
+            features=[p.features for p in properties],
+            tags=[p.tags for p in properties],
+            availability=availability,
+            properties=properties,
+        )
+
+    @classmethod
+    def from_snapshot(cls, properties: SnapshotProperties):
+        """Build from the columns of the snapshot the properties were read from, without creating them."""
+        snapshot = properties.snapshot
+        columns, tables = snapshot.columns, snapshot.tables
+        return cls(
+            ids=columns["id"],
+            location=_decoded(columns["location"], tables["location"]),
+            price=columns["price"],
+            capacity=columns["capacity"],
+            environment=_decoded(columns["environment"], tables["environment"]),
+            features=MultiHotIndex.from_codes(columns["features_offsets"], columns["features"], tables["features"]),
+            tags=MultiHotIndex.from_codes(columns["tags_offsets"], columns["tags"], tables["tags"]),
+            availability=properties.availability,
+            properties=properties,
+            locations=LocationIndex.from_codes(columns["location"], tables["location"]),
+        )
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame):
+        """Build from a DataFrame shaped like properties.json."""
+        df = df.reset_index(drop=True)
+        return cls(
+            ids=df["id"].to_numpy(),
+            location=df["location"].to_numpy(),
+            price=df["price"].to_numpy(),
+            capacity=df["capacity"].to_numpy(),
+            environment=df["environment"].to_numpy(),
+            features=df["features"].tolist(),
+            tags=df["tags"].tolist(),
+            availability=AvailabilityIndex.from_booked(df["id"], df["booked"]),
+            frame=df,
+        )
+
+    @property
+    def size(self) -> int:
+        return self.ids.shape[0]
+
+    def location_rows(self, locations: List[str]) -> np.ndarray:
+        """Sorted rows in any of the requested locations (city/region key, token or prefix)."""
+        return self.locations.rows(locations)
+
+    def free_mask(self, start_date, end_date, rows=None) -> np.ndarray:
+        """Rows (or the given rows) with no booked day in [start_date, end_date)."""
+        index_rows = self.availability_rows if rows is None else self.availability_rows[rows]
+        return self.availability.free_mask(start_date, end_date, index_rows)
+
+    def property_at(self, row: int) -> Property:
+        """The Property behind a row."""
+        if self.properties is not None:
+            return self.properties[row]
+        return Property.from_dict(self.frame.iloc[row].to_dict())
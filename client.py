@@ -0,0 +1,135 @@
+import http.client
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Optional
+from urllib.parse import urlsplit
+
+# the service the CLI talks to; a local one is started in the background when nothing answers (see service.py)
+SERVICE_URL = os.environ.get("ARIK_SERVICE", "http://127.0.0.1:" + os.environ.get("ARIK_PORT", "8642"))
+START_TIMEOUT = 120  # seconds a service started by the client gets to load its catalog and answer
+REQUEST_TIMEOUT = 600  # seconds per request; one search step can wait on several LLM calls
+LOG_FILE = "arik-service.log"  # output of a service started by the client, in the working directory
+
+
+class ServiceError(Exception):
+    """An error answer from the service; `payload` is its JSON body ({"error": ..., ...})."""
+
+    def __init__(self, status: int, payload: dict):
+        super().__init__(payload.get("error", f"HTTP {status}"))
+        self.status = status
+        self.payload = payload
+
+
+class ServiceClient:
+    """
+    JSON client of the ARIK service over one keep-alive connection. After a login, set `token`
+    and it is sent with every request.
+    """
+
+    def __init__(self, url: str = SERVICE_URL, timeout: float = REQUEST_TIMEOUT):
+        parts = urlsplit(url)
+        self.url = url
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.token = None
+        self._connection = None
+
+    def request(self, method: str, path: str, payload: Optional[dict] = None) -> dict:
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        for attempt in range(2):
+            reused = self._connection is not None
+            if not reused:
+                self._connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            sent = False
+            try:
+                self._connection.request(method, path, body=body, headers=headers)
+                sent = True
+                response = self._connection.getresponse()
+                body = response.read()
+                break
+            except (ConnectionError, http.client.HTTPException) as e:
+                self.close()
+                # a kept-alive connection the service closed (e.g. it restarted) since the last request fails
+                # before any answer: once more on a new connection. Otherwise the request may have been
+                # carried out, and sending it again could repeat a reservation or an account creation.
+                unanswered = not sent or isinstance(e, http.client.RemoteDisconnected)
+                if attempt or not (method == "GET" or (reused and unanswered)):
+                    raise
+        try:
+            data = json.loads(body or b"{}")
+        except ValueError:  # something other than the service answers there
+            raise ServiceError(response.status, {"error": f"Not an answer of the ARIK service (HTTP {response.status})."})
+        if response.status >= 400:
+            raise ServiceError(response.status, data)
+        return data
+
+    def get(self, path: str) -> dict:
+        return self.request("GET", path)
+
+    def post(self, path: str, payload: Optional[dict] = None) -> dict:
+        return self.request("POST", path, payload or {})
+
+    def delete(self, path: str, payload: Optional[dict] = None) -> dict:
+        return self.request("DELETE", path, payload or {})
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+# run service.py detached in the background, from the working directory (where the data files are)
+def start_service(port: int):
+    log = open(LOG_FILE, "a", encoding="utf-8")
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "service.py")
+    if os.name == "nt":
+        detach = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP | subprocess.DETACHED_PROCESS}
+    else:
+        detach = {"start_new_session": True}
+    subprocess.Popen([sys.executable, script, "--port", str(port)], stdin=subprocess.DEVNULL,
+                     stdout=log, stderr=subprocess.STDOUT, **detach)
+    log.close()
+
+
+# the service's /health answer; ServiceError if another program answers at the client's address
+def health(client: ServiceClient) -> dict:
+    try:
+        answer = client.get("/health")
+    except http.client.HTTPException as e:
+        raise ServiceError(0, {"error": f"Not an HTTP answer ({e!r})."})
+    if answer.get("status") != "ok":
+        raise ServiceError(200, {"error": "Not an answer of the ARIK service."})
+    return answer
+
+
+def connect(url: str = SERVICE_URL, start: bool = True) -> ServiceClient:
+    """
+    A client of the service at `url`. If nothing answers there and it is a local address,
+    the service is started in the background first (it keeps running for later sessions).
+    Raises ServiceError if something else answers there, OSError if nothing does.
+    """
+    client = ServiceClient(url)
+    try:
+        health(client)
+        return client
+    except OSError:
+        if not start or client.host not in ("127.0.0.1", "localhost"):
+            raise
+    print("Starting the ARIK service (the first start loads the catalog)...")
+    start_service(client.port)
+    deadline = time.monotonic() + START_TIMEOUT
+    while True:
+        try:
+            health(client)
+            return client
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.2)
@@ -0,0 +1,199 @@
+import calendar
+import re
+from datetime import date, timedelta
+from typing import Optional, Tuple
+
+# month and weekday names in English, full and abbreviated
+MONTHS = {name.lower(): i for i, name in enumerate(calendar.month_name) if name}
+MONTHS.update({name.lower(): i for i, name in enumerate(calendar.month_abbr) if name})
+MONTHS["sept"] = 9
+WEEKDAYS = {name.lower(): i for i, name in enumerate(calendar.day_name)}
+WEEKDAYS.update({name.lower(): i for i, name in enumerate(calendar.day_abbr)})
+WEEKDAYS.update({"tues": 1, "weds": 2, "thur": 3, "thurs": 3})
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12,
+}
+
+MONTH = r"(?P<month>[a-z]+)\.?"
+YEAR = r"(?P<year>\d{4})"
+RANGE_SEPARATOR = r"\s*(?:-|–|—|\bto\b|\buntil\b|\btill\b|\bthrough\b|\bthru\b|\band\b)\s*"
+
+ISO_DATE = re.compile(r"^(?P<year>\d{4})[-/.](?P<month>\d{1,2})[-/.](?P<day>\d{1,2})$")
+NUMERIC_DATE = re.compile(r"^(?P<a>\d{1,2})[/.](?P<b>\d{1,2})(?:[/.](?P<year>\d{2}|\d{4}))?$")
+MONTH_DAY = re.compile(rf"^(?:{YEAR} )?{MONTH} (?P<day>\d{{1,2}})(?: (?P<year2>\d{{4}}))?$")
+DAY_MONTH = re.compile(rf"^(?P<day>\d{{1,2}}) {MONTH}(?: {YEAR})?$")
+MONTH_DAY_RANGE = re.compile(
+    rf"^(?:{YEAR} )?{MONTH} (?P<day>\d{{1,2}}){RANGE_SEPARATOR}(?P<day2>\d{{1,2}})(?: (?P<year2>\d{{4}}))?$"
+)
+DAY_RANGE_MONTH = re.compile(rf"^(?P<day>\d{{1,2}}){RANGE_SEPARATOR}(?P<day2>\d{{1,2}}) {MONTH}(?: {YEAR})?$")
+IN_PERIOD = re.compile(r"^in (?P<count>\d+|[a-z]+) (?P<unit>day|week|month)s?$")
+PERIOD_FROM_NOW = re.compile(r"^(?P<count>\d+|[a-z]+) (?P<unit>day|week|month)s? from (?:now|today)$")
+WEEKDAY = re.compile(r"^(?:(?P<which>this|next|coming) )?(?P<weekday>[a-z]+)$")
+
+
+# lowercase, drop ordinal suffixes ("25th"), "of", "the", commas and extra spaces
+def _normalize(text: str) -> str:
+    text = str(text).strip().lower()
+    text = re.sub(r"(\d+)(?:st|nd|rd|th)\b", r"\1", text)
+    text = re.sub(r"\b(?:of|the|on)\b", " ", text)
+    text = text.replace(",", " ")
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _make(year, month, day) -> Optional[date]:
+    try:
+        return date(int(year), int(month), int(day))
+    except (TypeError, ValueError):
+        return None
+
+
+# a month/day without a year: default_year if given, otherwise the next time that day comes around
+def _with_year(month: int, day: int, year, today: date, default_year) -> Optional[date]:
+    if year:
+        return _make(year, month, day)
+    if default_year:
+        return _make(default_year, month, day)
+    candidate = _make(today.year, month, day)
+    if candidate is not None and candidate < today:
+        candidate = _make(today.year + 1, month, day)
+    return candidate
+
+
+def _add_months(day: date, months: int) -> date:
+    month_index = day.month - 1 + months
+    year, month = day.year + month_index // 12, month_index % 12 + 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def _count(word: str) -> Optional[int]:
+    return int(word) if word.isdigit() else NUMBER_WORDS.get(word)
+
+
+# weekends start on Friday; "this weekend" is the current week's (today if already in it), "next weekend" the following week's
+def _weekend(which: str, today: date) -> date:
+    friday = today - timedelta(days=today.weekday()) + timedelta(days=4)
+    if which == "next":
+        return friday + timedelta(days=7)
+    return max(friday, today)
+
+
+def _relative(text: str, today: date) -> Optional[date]:
+    if text in ("today", "tonight", "now"):
+        return today
+    if text == "tomorrow":
+        return today + timedelta(days=1)
+    if text == "day after tomorrow":
+        return today + timedelta(days=2)
+    if text in ("weekend", "this weekend", "next weekend", "coming weekend"):
+        return _weekend("next" if text == "next weekend" else "this", today)
+    if text == "next week":
+        return today - timedelta(days=today.weekday()) + timedelta(days=7)
+    if text == "next month":
+        return _add_months(today.replace(day=1), 1)
+    if text in ("a week from today", "a week from now"):
+        return today + timedelta(days=7)
+
+    match = IN_PERIOD.match(text) or PERIOD_FROM_NOW.match(text)
+    if match:
+        count = _count(match.group("count"))
+        if count is None:
+            return None
+        unit = match.group("unit")
+        if unit == "month":
+            return _add_months(today, count)
+        return today + timedelta(days=count * (7 if unit == "week" else 1))
+
+    match = WEEKDAY.match(text)
+    if match and match.group("weekday") in WEEKDAYS:
+        weekday = WEEKDAYS[match.group("weekday")]
+        if match.group("which") == "next":
+            # the named day of next week
+            return today - timedelta(days=today.weekday()) + timedelta(days=7 + weekday)
+        # the next time that day comes around, never today
+        return today + timedelta(days=(weekday - today.weekday() - 1) % 7 + 1)
+    return None
+
+
+def parse_date(text, today: Optional[date] = None, default_year: Optional[int] = None) -> Optional[date]:
+    """
+    Parse a single date without any network call: ISO ("2025-08-25"), month names
+    ("Aug 25", "25 August 2025", "2025 Aug 25"), unambiguous numeric dates ("8/25/2025")
+    and relative expressions ("tomorrow", "next Friday", "in 3 weeks", "next weekend").
+    Returns None when the input is not understood or is ambiguous (e.g. "04/05").
+    """
+    today = today or date.today()
+    text = _normalize(text)
+    if not text:
+        return None
+
+    match = ISO_DATE.match(text)
+    if match:
+        return _make(match.group("year"), match.group("month"), match.group("day"))
+
+    match = NUMERIC_DATE.match(text)
+    if match:
+        a, b = int(match.group("a")), int(match.group("b"))
+        year = match.group("year")
+        if year and len(year) == 2:
+            year = 2000 + int(year)
+        if a > 12 and b <= 12:  # day/month
+            a, b = b, a
+        elif a <= 12 and b <= 12 and a != b:  # could be either
+            return None
+        return _with_year(a, b, year, today, default_year)
+
+    for pattern in (MONTH_DAY, DAY_MONTH):
+        match = pattern.match(text)
+        if match and match.group("month") in MONTHS:
+            year = match.group("year") or match.groupdict().get("year2")
+            return _with_year(MONTHS[match.group("month")], int(match.group("day")), year, today, default_year)
+
+    return _relative(text, today)
+
+
+def parse_date_range(text, today: Optional[date] = None, default_year: Optional[int] = None) -> Optional[Tuple[date, date]]:
+    """
+    Parse a date range ("Aug 25-30", "25-30 August", "Aug 25 to Sep 2, 2025",
+    "2025-08-25 - 2025-08-30", "next weekend") into (start, end).
+    Returns None if the text is not a range this parser understands.
+    """
+    today = today or date.today()
+    text = re.sub(r"^(?:from|between) ", "", _normalize(text))
+    if not text:
+        return None
+
+    if text in ("weekend", "this weekend", "next weekend", "coming weekend"):
+        start = _relative(text, today)
+        return start, start + timedelta(days=2)
+
+    # one month, two days
+    for pattern in (MONTH_DAY_RANGE, DAY_RANGE_MONTH):
+        match = pattern.match(text)
+        if match and match.group("month") in MONTHS:
+            month = MONTHS[match.group("month")]
+            year = match.group("year") or match.groupdict().get("year2")
+            start = _with_year(month, int(match.group("day")), year, today, default_year)
+            end = _make(start.year, month, match.group("day2")) if start else None
+            return (start, end) if start and end and end > start else None
+
+    # two full dates; numeric dates contain dashes, so then only split on a dash with spaces around it
+    separator = RANGE_SEPARATOR
+    if re.search(r"\d[-/.]\d", text):
+        separator = RANGE_SEPARATOR.replace(r"(?:-|–|—|", r"(?:\s-\s|–|—|")
+    parts = re.split(separator, text, maxsplit=1)
+    if len(parts) != 2:
+        return None
+    end = parse_date(parts[1], today, default_year)
+    if end is None:
+        return None
+    # a year given only on the end date applies to the start date too
+    end_year = re.search(r"\b\d{4}\b", parts[1])
+    start_year = re.search(r"\b\d{4}\b", parts[0])
+    start = parse_date(parts[0], today, int(end_year.group(0)) if end_year and not start_year else default_year)
+    if start is None:
+        return None
+    if end <= start and not end_year:
+        # "Dec 28 - Jan 3" wraps into the next year
+        end = _make(end.year + 1, end.month, end.day)
+    return (start, end) if end and end > start else None
@@ -0,0 +1,85 @@
+import heapq
+import re
+from collections import Counter
+from typing import Callable, Iterable, List, Optional, Tuple
+
+FUZZY_THRESHOLD = 0.5  # similarity a fuzzy match needs to be used without asking the LLM
+
+
+def normalize_term(term) -> str:
+    """Lowercase words of a term, punctuation dropped ("Pet-Friendly" -> "pet friendly")."""
+    return " ".join(re.findall(r"[a-z0-9]+", str(term).lower()))
+
+
+# character trigrams of each word, padded like "  word " so word starts weigh more
+def trigrams(term) -> set:
+    grams = set()
+    for word in normalize_term(term).split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramIndex:
+    """
+    Fuzzy lookup of vocabulary terms. Each term (and optional aliases of it, e.g. the words of
+    a location) is split into character trigrams with an inverted index trigram -> aliases, so a
+    query only scores the aliases it shares a trigram with. Similarity is the Jaccard index of
+    the trigram sets (1.0 for the same words, ignoring case and punctuation).
+    """
+
+    def __init__(self, terms: Iterable[str], aliases: Optional[Callable[[str], Iterable[str]]] = None):
+        self.terms = list(dict.fromkeys(terms))
+        self.alias_ids = {}  # normalized alias -> alias id
+        self.compact_ids = {}  # alias without spaces -> alias id, so "wi fi" and "hottub" still match exactly
+        self.alias_terms = []  # alias id -> ids of the terms it stands for
+        self.alias_sizes = []  # alias id -> number of trigrams
+        self.postings = {}  # trigram -> alias ids
+        for term_id, term in enumerate(self.terms):
+            for name in [term, *(aliases(term) if aliases else [])]:
+                key = normalize_term(name)
+                if not key:
+                    continue
+                if key not in self.alias_ids:
+                    alias = self.alias_ids[key] = len(self.alias_terms)
+                    self.compact_ids.setdefault(key.replace(" ", ""), alias)
+                    grams = trigrams(key)
+                    self.alias_terms.append([])
+                    self.alias_sizes.append(len(grams))
+                    for gram in grams:
+                        self.postings.setdefault(gram, []).append(alias)
+                ids = self.alias_terms[self.alias_ids[key]]
+                if term_id not in ids:
+                    ids.append(term_id)
+
+    def exact(self, query) -> List[str]:
+        """Terms the query names exactly (ignoring case and punctuation), through the term or an alias."""
+        key = normalize_term(query)
+        alias = self.alias_ids.get(key, self.compact_ids.get(key.replace(" ", "")))
+        return [] if alias is None else [self.terms[i] for i in self.alias_terms[alias]]
+
+    def search(self, query, limit: int = 5, threshold: float = 0.0) -> List[Tuple[str, float]]:
+        """Up to `limit` terms ranked by similarity to the query (best alias per term), as (term, score)."""
+        grams = trigrams(query)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.postings.get(gram, ()))
+
+        scores = {}
+        for alias, common in shared.items():
+            score = common / (len(grams) + self.alias_sizes[alias] - common)
+            for term_id in self.alias_terms[alias]:
+                if score > scores.get(term_id, 0.0):
+                    scores[term_id] = score
+        ranked = heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], self.terms[item[0]]))
+        return [(self.terms[term_id], score) for term_id, score in ranked if score >= threshold]
+
+    def best(self, query, threshold: float = FUZZY_THRESHOLD) -> Optional[str]:
+        """The closest term if it reaches the threshold and is not tied with another term, else None."""
+        exact = self.exact(query)
+        if exact:
+            return exact[0] if len(exact) == 1 else None
+        candidates = self.search(query, limit=2, threshold=threshold)
+        if not candidates or (len(candidates) == 2 and candidates[0][1] == candidates[1][1]):
+            return None
+        return candidates[0][0]
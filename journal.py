@@ -0,0 +1,120 @@
+import json
+import os
+import tempfile
+import uuid
+from datetime import date
+from typing import Iterator, List, Optional
+
+
+def journal_path(json_file: str) -> str:
+    """Booking journal written next to a JSON catalog (properties.json -> properties.journal)."""
+    return os.path.splitext(json_file)[0] + ".journal"
+
+
+class BookingJournal:
+    """
+    Append-only log of bookings and cancellations, one JSON line per change.
+    Every append is fsync'd, so a change is durable once append() returns. Several
+    processes can append to the same journal; each follows it with read_new().
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.offset = 0  # bytes already read by read_new
+        self.count = 0  # entries read so far, i.e. not yet folded into the catalog
+        self.generation = None  # first line of the file being followed; compaction replaces the file and its header
+
+    # first line of a new journal, unique so that a replaced journal is never mistaken for the old one
+    @staticmethod
+    def _header() -> bytes:
+        return (json.dumps({"generation": uuid.uuid4().hex}) + "\n").encode("utf-8")
+
+    def create(self):
+        """Start the journal file with its header if it does not exist or is empty."""
+        with open(self.path, "ab") as f:
+            if f.tell() == 0:
+                f.write(self._header())
+                f.flush()
+                os.fsync(f.fileno())
+
+    def append(self, op: str, property_id: int, start_date: date, end_date: date):
+        """Record a "book" or "cancel" of a property's dates (one O_APPEND write, so appends from several processes do not interleave)."""
+        record = {"op": op, "id": property_id, "start": start_date.isoformat(), "end": end_date.isoformat()}
+        line = (json.dumps(record) + "\n").encode("utf-8")
+        with open(self.path, "ab") as f:
+            if f.tell() == 0:  # the first write to a missing journal gives it its header
+                line = self._header() + line
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def read_new(self) -> Optional[List[dict]]:
+        """
+        Complete entries appended (by any process) since the last call. None if the journal
+        was compacted away in the meantime, in which case the catalog must be reloaded.
+        """
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            if self.generation is not None:
+                return None
+            return []
+        with f:
+            generation = f.readline()
+            if self.generation is None:
+                self.generation = generation
+            elif generation != self.generation:
+                return None
+            f.seek(self.offset)
+            data = f.read()
+        # an unfinished last line belongs to an append still in progress
+        data = data[:data.rfind(b"\n") + 1]
+        self.offset += len(data)
+        records = []
+        for line in data.splitlines():
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if "op" not in record:
+                continue
+            record["start"] = date.fromisoformat(record["start"])
+            record["end"] = date.fromisoformat(record["end"])
+            records.append(record)
+        self.count += len(records)
+        return records
+
+    def rewind(self):
+        """Follow the journal from its start again (after reloading the catalog)."""
+        self.offset, self.count, self.generation = 0, 0, None
+
+    def entries(self) -> Iterator[dict]:
+        """Recorded changes in order. A torn last line from a crash mid-write is skipped."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if "op" not in record:  # the generation header
+                        continue
+                    record["start"] = date.fromisoformat(record["start"])
+                    record["end"] = date.fromisoformat(record["end"])
+                    yield record
+        except FileNotFoundError:
+            return
+
+    def truncate(self):
+        """
+        Drop every entry, once they have been folded into the catalog files. The journal is
+        replaced by a new file with a new header, so other processes following it notice and reload.
+        """
+        header = self._header()
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), suffix=".tmp")
+        os.write(fd, header)
+        os.fsync(fd)
+        os.close(fd)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, self.path)
+        self.offset, self.count, self.generation = len(header), 0, header
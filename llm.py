@@ -1,25 +1,50 @@
-import requests
+import json
 from datetime import datetime, timedelta
 import re
-from difflib import SequenceMatcher, get_close_matches
-from properties import PropertiesController
-
-# Load properties database
-pc = PropertiesController()
-properties = pc.load_properties()
-
-# Extract unique vocab from database
-ALL_LOCATIONS = sorted(set(p.location for p in properties))
-ALL_ENVIRONMENTS = sorted(set(p.environment for p in properties))
-ALL_TYPES = sorted(set(p.type for p in properties))
-ALL_FEATURES = sorted(set(f for p in properties for f in p.features))
-ALL_TAGS = sorted(set(t for p in properties for t in p.tags))
+from difflib import SequenceMatcher
+from vocabulary import LazyVocabulary
+from llm_cache import ResponseCache, cache_key
+from llm_client import LLMClient
+from dateparse import parse_date, parse_date_range
+from fuzzy import TrigramIndex
+from locations import location_tokens
+
+# Unique vocab and statistics of the properties database, loaded on first use and rebuilt when the catalog changes
+VOCAB = LazyVocabulary()
+
+# old module-level names, still readable as llm.ALL_LOCATIONS etc.
+_VOCAB_ATTRIBUTES = {
+    "ALL_LOCATIONS": "locations",
+    "ALL_ENVIRONMENTS": "environments",
+    "ALL_TYPES": "types",
+    "ALL_FEATURES": "features",
+    "ALL_TAGS": "tags",
+}
+
+def __getattr__(name):
+    if name in _VOCAB_ATTRIBUTES:
+        return getattr(VOCAB.get(), _VOCAB_ATTRIBUTES[name])
+    if name == "pc":
+        return VOCAB.controller
+    if name == "properties":
+        return VOCAB.controller.get_all()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # API endpoint
 API_ENDPOINT_URL = "https://openrouter.ai/api/v1/chat/completions" # OpenRouter
 #API_ENDPOINT_URL = "https://api.openai.com/v1/chat/completions" # OpenAI
 MODEL = "gpt-4o-mini"
 
+# seconds per attempt: the main parse has no local fallback, helper lookups (synonyms, dates, locations) do
+PARSE_TIMEOUT = 60
+HELPER_TIMEOUT = 20
+# seconds per call, retries and their waits included
+PARSE_DEADLINE = 90
+HELPER_DEADLINE = 30
+
+# shared keep-alive client with retries and a circuit breaker; swap it to point at a local stub server
+CLIENT = LLMClient(API_ENDPOINT_URL, timeout=PARSE_TIMEOUT, deadline=PARSE_DEADLINE)
+
 SYSTEM_PROMPT = (
     "You are an assistant for an Airbnb-like vacation property search. "
     "Parse a USER REQUEST into Python dict fields: "
@@ -37,72 +62,164 @@ SYSTEM_PROMPT = (
     "Return ONLY a Python dictionary, not a JSON string."
 )
 
+# responses of llm_call, keyed on model, system prompt and prompt (temperature is 0.0, so answers repeat)
+RESPONSE_CACHE = ResponseCache()
+
 # ---------- LLM Helpers ----------
-def llm_call(prompt, role="user", model=MODEL, api_key=None, sys_prompt=None):
+def llm_call(prompt, role="user", model=MODEL, api_key=None, sys_prompt=None, cache_scope="", timeout=HELPER_TIMEOUT,
+             deadline=HELPER_DEADLINE):
     if not api_key:
         return None
-    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+    key = cache_key(model, sys_prompt, role, prompt, cache_scope)
+    cached = RESPONSE_CACHE.get(key)
+    if cached is not None:
+        return cached
     messages = []
     if sys_prompt:
         messages.append({"role": "system", "content": sys_prompt})
     messages.append({"role": role, "content": prompt})
     payload = {"model": model, "messages": messages, "temperature": 0.0}
-    r = requests.post(API_ENDPOINT_URL, headers=headers, json=payload, timeout=60)
-    if r.status_code != 200:
+    r = CLIENT.post(payload, api_key, timeout=timeout, deadline=deadline)
+    if r is None or r.status_code != 200:
         return None
     data = r.json()
-    return (data.get("choices") or [{}])[0].get("message", {}).get("content", "").strip()
+    content = ((data.get("choices") or [{}])[0].get("message", {}).get("content") or "").strip()
+    if content:  # an empty answer (e.g. a filtered or truncated one) is asked again next time
+        RESPONSE_CACHE.put(key, content)
+    return content
 
 # ---------- Synonym Normalization ----------
+# parsed request fields that hold vocabulary terms: parsed key -> (field name used in prompts, is a list)
+SYNONYM_FIELDS = {
+    "features": ("feature", True),
+    "tags": ("tag", True),
+    "environment": ("environment", False),
+    "type": ("property type", False),
+}
+
+def match_locally(term, valid_list):
+    """Exact or case-insensitive match of a term in valid_list, without asking the LLM."""
+    if term in valid_list:
+        return term
+    lowered = str(term).lower()
+    return next((v for v in valid_list if v.lower() == lowered), None)
+
+def _parse_json_object(content):
+    try:
+        match = re.search(r"\{.*\}", content or "", re.DOTALL)
+        parsed = json.loads(match.group(0)) if match else {}
+    except Exception:
+        parsed = {}
+    return parsed if isinstance(parsed, dict) else {}
+
+def resolve_terms(fields, api_key=None, matchers=None):
+    """
+    Map user terms to valid DB entries (synonym resolution) for several fields at once.
+    fields is {field_name: (terms, valid_list)}; exact, case-insensitive and confident fuzzy
+    matches (typos) are resolved locally and everything else is sent to the LLM in one
+    structured prompt. matchers optionally gives a prebuilt TrigramIndex per field.
+    Returns {field_name: {term: valid entry or None}}.
+    """
+    resolved = {name: {} for name in fields}
+    pending = {}
+    for name, (terms, valid_list) in fields.items():
+        matcher = (matchers or {}).get(name)
+        for term in terms:
+            if not term or term in resolved[name]:
+                continue
+            resolved[name][term] = match_locally(term, valid_list)
+            if resolved[name][term] is None:
+                if matcher is None:
+                    matcher = TrigramIndex(valid_list)
+                resolved[name][term] = matcher.best(term)
+            if resolved[name][term] is None:
+                pending.setdefault(name, []).append(term)
+    if not pending:
+        return resolved
+
+    prompt = (
+        "For each field below, map every user term to the closest synonym or best match "
+        "among that field's valid options, or null if none fits.\n"
+        + "\n".join(f"- {name}: terms {terms}; valid options {fields[name][1]}" for name, terms in pending.items())
+        + '\nReturn ONLY a JSON object like {"<field>": {"<term>": "<option or null>"}}.'
+    )
+    answer = _parse_json_object(llm_call(prompt, api_key=api_key, sys_prompt="You are a synonym resolver for vacation property search fields."))
+    for name, terms in pending.items():
+        mapped = answer.get(name)
+        if not isinstance(mapped, dict):
+            continue
+        for term in terms:
+            if isinstance(mapped.get(term), str):
+                resolved[name][term] = match_locally(mapped[term], fields[name][1])
+    return resolved
+
 def normalize_with_llm(user_term, valid_list, field_name, api_key=None):
     """Ask LLM to map a user term to a valid DB entry (synonym resolution)."""
     if not user_term:
         return None
-    if user_term in valid_list:
-        return user_term
-    prompt = (
-        f"The user asked for '{user_term}' as a {field_name}. "
-        f"Valid {field_name}s in the database are: {valid_list}. "
-        "Which one is the closest synonym or best match? "
-        "Return ONLY one option."
-    )
-    alt = llm_call(prompt, api_key=api_key, sys_prompt=f"You are a synonym resolver for {field_name}.")
-    if alt and alt in valid_list:
-        return alt
-    return None
+    return resolve_terms({field_name: ([user_term], valid_list)}, api_key=api_key)[field_name][user_term]
+
+def normalize_synonyms(parsed, api_key, keys=tuple(SYNONYM_FIELDS)):
+    """Normalize features, tags, environment and type of a parsed request in one LLM round trip."""
+    current = VOCAB.get()
+    vocab_fields = {"features": "features", "tags": "tags", "environment": "environments", "type": "types"}
+    fields, matchers = {}, {}
+    for key in keys:
+        name, is_list = SYNONYM_FIELDS[key]
+        terms = (parsed.get(key) or []) if is_list else ([parsed[key]] if parsed.get(key) else [])
+        fields[name] = (terms, getattr(current, vocab_fields[key]))
+        matchers[name] = current.matcher(vocab_fields[key])
+    resolved = resolve_terms(fields, api_key=api_key, matchers=matchers)
+
+    for key in keys:
+        name, is_list = SYNONYM_FIELDS[key]
+        if is_list:
+            # unknown features/tags are dropped
+            parsed[key] = [resolved[name][t] for t in fields[name][0] if resolved[name].get(t)]
+        elif parsed.get(key) and resolved[name].get(parsed[key]):
+            # unknown environment/type is kept as the user said it
+            parsed[key] = resolved[name][parsed[key]]
+    return parsed
 
 def normalize_features_and_tags(parsed, api_key):
-    def process_list(user_list, valid_list, field_name):
-        result = []
-        for item in user_list:
-            mapped = normalize_with_llm(item, valid_list, field_name, api_key=api_key)
-            if mapped:
-                result.append(mapped)
-        return result
-
-    parsed["features"] = process_list(parsed.get("features", []), ALL_FEATURES, "feature")
-    parsed["tags"] = process_list(parsed.get("tags", []), ALL_TAGS, "tag")
-    return parsed
+    return normalize_synonyms(parsed, api_key, keys=("features", "tags"))
 
 def normalize_env_and_type(parsed, api_key):
-    if parsed.get("environment") and parsed["environment"] not in ALL_ENVIRONMENTS:
-        alt = normalize_with_llm(parsed["environment"], ALL_ENVIRONMENTS, "environment", api_key=api_key)
-        if alt:
-            parsed["environment"] = alt
-    if parsed.get("type") and parsed["type"] not in ALL_TYPES:
-        alt = normalize_with_llm(parsed["type"], ALL_TYPES, "property type", api_key=api_key)
-        if alt:
-            parsed["type"] = alt
-    return parsed
+    return normalize_synonyms(parsed, api_key, keys=("environment", "type"))
 
 # ---------- Location & Environment ----------
+def _location_matcher(all_locations):
+    current = VOCAB.get()
+    if all_locations is current.locations or list(all_locations) == current.locations:
+        return current.matcher("locations")
+    return TrigramIndex(all_locations, aliases=location_tokens)
+
+def resolve_location_locally(location, all_locations):
+    """
+    Resolve a location without the LLM: an exact name, a part or word naming one location
+    ("toronto" -> "Toronto, Canada"), or a confident fuzzy match ("Torronto").
+    A part shared by several locations ("Canada") is kept as given, the recommender matches them all.
+    Returns None if the location can't be resolved locally.
+    """
+    if location in all_locations:
+        return location
+    matcher = _location_matcher(all_locations)
+    exact = matcher.exact(location)
+    if exact:
+        return exact[0] if len(exact) == 1 else location
+    match = matcher.best(location)
+    if match:
+        print(f"Bot: Approximated '{location}' as '{match}'.")
+    return match
+
 def map_location_to_db(location, all_locations, requested_env=None, api_key=None):
     """Map location + environment to DB, rerouting to the nearest valid option with LLM help."""
 
     # CASE 1: Location only
     if location and not requested_env:
-        if location in all_locations:
-            return location, None
+        local = resolve_location_locally(location, all_locations)
+        if local:
+            return local, None
         prompt = (
             f"The user asked for '{location}' as a vacation location. "
             f"My database contains these valid cities/regions: {all_locations}. "
@@ -112,16 +229,16 @@ def map_location_to_db(location, all_locations, requested_env=None, api_key=None
         if alt and alt in all_locations:
             print(f"Bot: Using closest location '{alt}' instead of '{location}'.")
             return alt, None
-        match = get_close_matches(location, all_locations, n=1, cutoff=0.65)
+        match = _location_matcher(all_locations).search(location, limit=1, threshold=0.3)
         if match:
-            print(f"Bot: Approximated '{location}' as '{match[0]}'.")
-            return match[0], None
+            print(f"Bot: Approximated '{location}' as '{match[0][0]}'.")
+            return match[0][0], None
         print(f"Bot: Could not resolve location '{location}'.")
         return location, None
 
     # CASE 2: Environment only
     elif requested_env and not location:
-        candidate_locs = sorted({p.location for p in properties if p.environment.lower() == requested_env.lower()})
+        candidate_locs = VOCAB.get().locations_with_environment(requested_env)
         if not candidate_locs:
             print(f"Bot: No cities found with environment '{requested_env}'.")
             return None, requested_env
@@ -140,9 +257,11 @@ def map_location_to_db(location, all_locations, requested_env=None, api_key=None
 
     # CASE 3: Both location + environment
     elif location and requested_env:
-        loc_envs = {p.environment for p in properties if p.location == location}
+        location = resolve_location_locally(location, all_locations) or location
+        requested_env = VOCAB.get().matcher("environments").best(requested_env) or requested_env
+        loc_envs = VOCAB.get().environments_at(location)
         if requested_env not in loc_envs:
-            candidate_locs = sorted({p.location for p in properties if p.environment.lower() == requested_env.lower()})
+            candidate_locs = VOCAB.get().locations_with_environment(requested_env)
             if candidate_locs:
                 prompt = (
                     f"The user asked for '{location}' with a '{requested_env}' environment. "
@@ -168,18 +287,26 @@ def llm_parse_date(user_input, api_key, model=MODEL, default_year=None):
         f"If the year is missing, assume it is {default_year}. Only return the date. "
         f"User input: '{user_input}'"
     )
-    result = llm_call(prompt, api_key=api_key, model=model)
+    # relative dates ("next Friday") depend on today, so cached answers only hold for the day
+    result = llm_call(prompt, api_key=api_key, model=model, cache_scope=datetime.today().date().isoformat())
     try:
         dt = datetime.strptime(result.strip(), "%Y-%m-%d").date()
         return dt
     except Exception:
         return None
 
+# Local parse first, the LLM only for input the local parser can't read or finds ambiguous
+def resolve_date(user_input, api_key, model=MODEL, default_year=None):
+    dt = parse_date(user_input, default_year=default_year)
+    if dt is None:
+        dt = llm_parse_date(user_input, api_key, model=model, default_year=default_year)
+    return dt
+
 # ---------- Validation ----------
 def validate_and_reprompt(parsed):
-    max_capacity = max(p.capacity for p in properties)
-    all_prices = [p.price for p in properties]
-    min_price, max_price = min(all_prices), max(all_prices)
+    stats = VOCAB.get()
+    max_capacity = stats.max_capacity
+    min_price, max_price = stats.min_price, stats.max_price
 
     if parsed.get("group_size") and parsed["group_size"] > max_capacity:
         print(f"Bot: Group size {parsed['group_size']} exceeds max capacity {max_capacity}.")
@@ -191,11 +318,11 @@ def validate_and_reprompt(parsed):
     return parsed
 
 # ---------- Main Parser ----------
-def llm_parse(model=MODEL, temperature=0.7):
-    import json
-
-    api_key = input("Enter API key(not a free model! will return error if no balance): ").strip()
-    user_prompt = input("Bot: What kind of property are you looking for? ").strip()
+# `ask` reads each answer from the user (input() by default; the service asks the remote client, see service.py)
+def llm_parse(model=MODEL, temperature=0.7, ask=None):
+    ask = ask or input
+    api_key = ask("Enter API key(not a free model! will return error if no balance): ").strip()
+    user_prompt = ask("Bot: What kind of property are you looking for? ").strip()
     if not user_prompt:
         return {"error": "No input provided"}
 
@@ -208,12 +335,9 @@ def llm_parse(model=MODEL, temperature=0.7):
         ],
         "temperature": temperature
     }
-    r = requests.post(
-        API_ENDPOINT_URL,
-        headers={"Authorization": f"Bearer {api_key}"},
-        json=payload,
-        timeout=60
-    )
+    r = CLIENT.post(payload, api_key, timeout=PARSE_TIMEOUT, deadline=PARSE_DEADLINE)
+    if r is None:
+        return {"error": "LLM endpoint unavailable", "details": f"circuit {CLIENT.breaker.state}"}
     if r.status_code != 200:
         return {"error": f"HTTP {r.status_code}", "details": r.text}
 
@@ -228,12 +352,14 @@ def llm_parse(model=MODEL, temperature=0.7):
         parsed = {}
 
     # Location resolution
+    all_locations = VOCAB.get().locations
     mapped_loc, mapped_env = map_location_to_db(
-        parsed.get("location"), ALL_LOCATIONS, parsed.get("environment"), api_key=api_key
+        parsed.get("location"), all_locations, parsed.get("environment"), api_key=api_key
     )
-    if not mapped_loc or mapped_loc not in ALL_LOCATIONS:
+    # a part shared by several locations ("Canada") is a valid search too
+    if not mapped_loc or (mapped_loc not in all_locations and not VOCAB.get().matcher("locations").exact(mapped_loc)):
         print("Bot: Sorry, I couldn't resolve that location. Let's try again.\n")
-        return llm_parse(model=model, temperature=temperature)
+        return llm_parse(model=model, temperature=temperature, ask=ask)
 
     parsed["location"] = mapped_loc
     if mapped_env is not None:
@@ -242,13 +368,13 @@ def llm_parse(model=MODEL, temperature=0.7):
     # Group size fallback
     if not parsed.get("group_size"):
         try:
-            parsed["group_size"] = int(input("Bot: How many people? ").strip())
+            parsed["group_size"] = int(ask("Bot: How many people? ").strip())
         except:
             parsed["group_size"] = 1
 
     # Budget fallback
     if parsed.get("budget") is None and parsed.get("price_max") is None:
-        budget_input = input("Bot: What is your budget? (e.g. 1000 or 100-2500): ").strip()
+        budget_input = ask("Bot: What is your budget? (e.g. 1000 or 100-2500): ").strip()
         if "-" in budget_input:
             try:
                 low, high = map(int, budget_input.split("-"))
@@ -263,10 +389,14 @@ def llm_parse(model=MODEL, temperature=0.7):
                 pass
 
     # Dates
-    start_input = parsed.get("start_date") or input("Bot: Start date? (e.g. 2025 Aug 25): ").strip()
-    end_input = parsed.get("end_date") or input("Bot: End date? (e.g. 2025 Aug 30): ").strip()
-    start_dt = llm_parse_date(start_input, api_key, default_year=2025)
-    end_dt = llm_parse_date(end_input, api_key, default_year=2025)
+    start_input = parsed.get("start_date") or ask("Bot: Start date? (e.g. 2025 Aug 25, or Aug 25-30): ").strip()
+    date_range = None if parsed.get("end_date") else parse_date_range(start_input, default_year=2025)
+    if date_range:
+        start_dt, end_dt = date_range
+    else:
+        end_input = parsed.get("end_date") or ask("Bot: End date? (e.g. 2025 Aug 30): ").strip()
+        start_dt = resolve_date(start_input, api_key, default_year=2025)
+        end_dt = resolve_date(end_input, api_key, default_year=2025)
 
     if not start_dt:
         start_dt = datetime.today().date() + timedelta(days=1)
@@ -276,9 +406,8 @@ def llm_parse(model=MODEL, temperature=0.7):
     parsed["start_date"], parsed["end_date"] = start_dt.isoformat(), end_dt.isoformat()
     parsed["dates"] = [(start_dt + timedelta(days=i)).isoformat() for i in range((end_dt - start_dt).days + 1)]
 
-    # Normalize synonyms
-    parsed = normalize_features_and_tags(parsed, api_key)
-    parsed = normalize_env_and_type(parsed, api_key)
+    # Normalize synonyms, all fields in one round trip
+    parsed = normalize_synonyms(parsed, api_key)
     parsed = validate_and_reprompt(parsed)
 
     # Ensure required keys exist
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+CACHE_FILE = "llm_cache.sqlite3"
+MEMORY_ENTRIES = 1024  # responses kept in the in-memory LRU tier
+DISK_ENTRIES = 100_000  # responses kept on disk before the least recently used are evicted
+TTL_SECONDS = 30 * 24 * 3600
+EVICT_EVERY = 100  # disk writes between eviction passes
+
+
+def cache_key(model: str, sys_prompt: Optional[str], role: str, prompt: str, scope: str = "") -> str:
+    """Stable key of one LLM call. `scope` separates answers that depend on outside state (e.g. today's date)."""
+    raw = json.dumps([model, sys_prompt, role, prompt, scope], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier cache of LLM responses: an in-memory LRU in front of a SQLite table
+    with TTL and size-based eviction. Counts memory hits, disk hits and misses.
+    """
+
+    def __init__(self, path: str = CACHE_FILE, memory_entries: int = MEMORY_ENTRIES,
+                 disk_entries: int = DISK_ENTRIES, ttl: float = TTL_SECONDS):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.ttl = ttl
+        self.memory = OrderedDict()  # key -> (value, expires_at)
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self._db = None  # opened on first use, so importing costs nothing
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        return self._db
+
+    def _remember(self, key: str, value: str, expires_at: float):
+        self.memory[key] = (value, expires_at)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached response, or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self.memory.get(key)
+            if entry is not None and entry[1] > now:
+                self.memory.move_to_end(key)
+                self.hits_memory += 1
+                return entry[0]
+
+            try:
+                db = self._conn()
+                row = db.execute("SELECT value, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None and row[1] > now:
+                    db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                    db.commit()
+                    self._remember(key, row[0], row[1])
+                    self.hits_disk += 1
+                    return row[0]
+            except sqlite3.Error:
+                pass
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: str, ttl: Optional[float] = None):
+        """Store a response in both tiers."""
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._remember(key, value, expires_at)
+            try:
+                db = self._conn()
+                db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, value, expires_at, now),
+                )
+                db.commit()
+                self._writes += 1
+                if self._writes % EVICT_EVERY == 0:
+                    self._evict(now)
+            except sqlite3.Error:
+                pass  # the disk tier is best effort, the memory tier still works
+
+    # drop expired rows, then the least recently used ones beyond disk_entries
+    def _evict(self, now: float):
+        db = self._conn()
+        db.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        db.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.disk_entries,),
+        )
+        db.commit()
+
+    def clear(self):
+        """Empty both tiers and reset the counters."""
+        with self._lock:
+            self.memory.clear()
+            self.hits_memory = self.hits_disk = self.misses = 0
+            try:
+                self._conn().execute("DELETE FROM responses")
+                self._conn().commit()
+            except sqlite3.Error:
+                pass
+
+    def stats(self) -> dict:
+        lookups = self.hits_memory + self.hits_disk + self.misses
+        return {
+            "hits_memory": self.hits_memory,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+            "hit_rate": (self.hits_memory + self.hits_disk) / lookups if lookups else 0.0,
+            "memory_entries": len(self.memory),
+        }
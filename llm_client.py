@@ -0,0 +1,144 @@
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def retry_after_seconds(value) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), None if absent or invalid."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures and rejects calls for `cooldown` seconds,
+    then lets one trial call through (half-open) to decide whether to close again.
+    """
+
+    def __init__(self, threshold: int = 5, cooldown: float = 30.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.cooldown:
+            return "open"
+        return "half-open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+
+
+class LLMClient:
+    """
+    Shared HTTP client for the chat completions endpoint.
+    Keeps connections alive in a pool, retries 429/5xx and connection errors with jittered
+    exponential backoff (honoring Retry-After), and stops calling a degraded endpoint through
+    a circuit breaker so callers fall back to local resolution. A read timeout is not retried
+    (the endpoint got the request and is slow), and one call never takes longer than its deadline.
+    """
+
+    def __init__(self, url: str, timeout: float = 60, max_retries: int = 3, backoff_base: float = 0.5,
+                 backoff_cap: float = 8.0, max_retry_after: float = 30.0, pool_size: int = 10,
+                 breaker: Optional[CircuitBreaker] = None, deadline: float = 90.0):
+        self.url = url
+        self.timeout = timeout
+        self.deadline = deadline  # seconds one post() may take, retries and waits included
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.max_retry_after = max_retry_after
+        self.breaker = breaker or CircuitBreaker()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    # full jitter: anywhere between 0 and the capped exponential delay
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    def post(self, payload: dict, api_key: str, timeout: Optional[float] = None,
+             deadline: Optional[float] = None) -> Optional[requests.Response]:
+        """
+        POST a chat completion request. Returns the final response (which may still be an error
+        status once retries or the deadline run out), or None if the endpoint is unreachable or
+        too slow, or the circuit is open. `timeout` is per attempt, `deadline` for the whole call.
+        """
+        headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+        ends = time.monotonic() + (deadline or self.deadline)
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                return None
+            delay = None
+            left = ends - time.monotonic()
+            try:
+                response = self.session.post(self.url, headers=headers, json=payload,
+                                             timeout=min(timeout or self.timeout, left))
+            except requests.exceptions.ReadTimeout:
+                # the request was sent and the answer did not come in time: asking again would wait as long
+                self.breaker.record_failure()
+                return None
+            except requests.RequestException:
+                response = None
+            if response is not None and response.status_code not in RETRY_STATUSES:
+                self.breaker.record_success()
+                return response
+
+            self.breaker.record_failure()
+            if attempt == self.max_retries:
+                return response
+            if response is not None:
+                delay = retry_after_seconds(response.headers.get("Retry-After"))
+            if delay is None:
+                delay = self._backoff(attempt)
+            delay = min(delay, self.max_retry_after)
+            if time.monotonic() + delay >= ends:  # no time left for another attempt
+                return response
+            time.sleep(delay)
+        return None
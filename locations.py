@@ -0,0 +1,88 @@
+import re
+import numpy as np
+from bisect import bisect_left
+from typing import Iterable, List
+
+
+def normalize_location(location) -> str:
+    """Canonical form of a location: lowercase, single spaces, trimmed around commas."""
+    return ", ".join(re.sub(r"\s+", " ", part).strip() for part in str(location).lower().split(","))
+
+
+# tokens a location can be found by: each comma-separated part and each word ("Lake Tahoe, CA" -> lake tahoe, ca, lake, tahoe)
+def location_tokens(location) -> List[str]:
+    parts = [part for part in normalize_location(location).split(", ") if part]
+    words = [word for part in parts for word in part.split(" ")]
+    return list(dict.fromkeys(parts + words))
+
+
+# sorted rows of several locations that share a key or token
+def _joined(parts) -> np.ndarray:
+    rows = parts[0] if len(parts) == 1 else np.sort(np.concatenate(parts))
+    return rows.astype(np.int64, copy=False)
+
+
+class LocationIndex:
+    """
+    Maps canonical location keys ("new york, ny") and their tokens ("new york", "ny")
+    to the sorted rows of the properties there. Lookups are dictionary hits, with
+    prefix matching as a fallback ("tor" -> Toronto).
+    """
+
+    def __init__(self, locations: Iterable[str]):
+        table = {}
+        codes = np.fromiter((table.setdefault(location, len(table)) for location in locations), dtype=np.int64)
+        self._build(codes, list(table))
+
+    @classmethod
+    def from_codes(cls, codes: np.ndarray, names: List[str]):
+        """Same index from codes into a table of distinct locations (e.g. a snapshot column)."""
+        index = cls.__new__(cls)
+        index._build(np.asarray(codes), names)
+        return index
+
+    # each distinct location is normalized once, its rows are found by sorting the codes
+    def _build(self, codes: np.ndarray, names: List[str]):
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(len(names) + 1))
+        keys = {}
+        tokens = {}
+        for code, location in enumerate(names):
+            rows = order[bounds[code]:bounds[code + 1]]
+            keys.setdefault(normalize_location(location), []).append(rows)
+            for token in location_tokens(location):
+                tokens.setdefault(token, []).append(rows)
+        self.keys = {key: _joined(parts) for key, parts in keys.items()}
+        self.tokens = {token: _joined(parts) for token, parts in tokens.items()}
+        self._sorted_terms = sorted(set(self.keys) | set(self.tokens))
+
+    # a comma-free key is also a token, and the token covers at least the same rows
+    def _postings(self, term: str) -> np.ndarray:
+        rows = self.tokens.get(term)
+        return rows if rows is not None else self.keys[term]
+
+    def prefix(self, prefix: str) -> np.ndarray:
+        """Rows whose canonical key or one of its tokens starts with the prefix."""
+        prefix = normalize_location(prefix)
+        found = []
+        i = bisect_left(self._sorted_terms, prefix)
+        while i < len(self._sorted_terms) and self._sorted_terms[i].startswith(prefix):
+            found.append(self._postings(self._sorted_terms[i]))
+            i += 1
+        return np.unique(np.concatenate(found)) if found else np.zeros(0, dtype=np.int64)
+
+    def lookup(self, location) -> np.ndarray:
+        """Rows matching one requested location: exact key or token, then prefix."""
+        term = normalize_location(location)
+        if not term:
+            return np.zeros(0, dtype=np.int64)
+        if term in self.tokens or term in self.keys:
+            return self._postings(term)
+        return self.prefix(term)
+
+    def rows(self, locations: List[str]) -> np.ndarray:
+        """Sorted rows matching any of the requested locations."""
+        found = [self.lookup(location) for location in locations]
+        if len(found) == 1:
+            return found[0]
+        return np.unique(np.concatenate(found)) if found else np.zeros(0, dtype=np.int64)
@@ -0,0 +1,59 @@
+import os
+import zlib
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: shared locks are taken as exclusive ones
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def file_lock(path: str, shared: bool = False):
+    """
+    Hold an advisory lock on `path` (created if missing) for the duration of the block.
+    Every call opens its own descriptor, so the lock also excludes other threads of
+    this process, not only other processes. Shared locks only exclude exclusive ones.
+    A thread must not lock a file again while it holds a lock on it, unless both locks are
+    shared and not on Windows (where every lock is exclusive): it would wait for itself.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            yield
+            return
+        while True:
+            try:
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                break
+            except OSError:
+                pass  # LK_LOCK gives up after 10 seconds, keep waiting
+        try:
+            yield
+        finally:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    finally:
+        # closing the descriptor releases a flock
+        os.close(fd)
+
+
+class LockStripes:
+    """
+    A fixed set of lock files keys are hashed onto, so writers of different keys rarely
+    wait for each other while the number of lock files stays bounded.
+    """
+
+    def __init__(self, directory: str, stripes: int = 16):
+        self.directory = directory
+        self.stripes = stripes
+
+    def path(self, key) -> str:
+        stripe = zlib.crc32(str(key).encode("utf-8")) % self.stripes
+        return os.path.join(self.directory, f"stripe-{stripe:02d}.lock")
+
+    def lock(self, key):
+        os.makedirs(self.directory, exist_ok=True)
+        return file_lock(self.path(key))
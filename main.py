@@ -1,10 +1,229 @@
-from users import UserManager
-from properties import PropertiesController
+import pwinput
+import prompts
+from client import LOG_FILE, SERVICE_URL, ServiceError, connect
 #comments
 
+# The CLI is a thin client of the ARIK service (service.py), which keeps the catalog, users and caches
+# loaded between sessions; connect() starts it in the background the first time.
+
+
+# print what the service answered for the user: what it printed, then its message
+def show(answer: dict):
+    if answer.get("output"):
+        print(answer["output"], end="")
+    if answer.get("message"):
+        print(answer["message"])
+
+
+def show_error(error: ServiceError):
+    if error.payload.get("output"):
+        print(error.payload["output"], end="")
+    print(error)
+
+
+def ask_username(service, prompt, taken_message):
+    while True:
+        username = input(prompt).strip()
+        if not username:
+            print("Username cannot be empty.")
+            continue
+        if service.post("/check", {"username": username})["username_taken"]:
+            print(taken_message)
+            continue
+        return username
+
+
+def ask_email(service, prompt, taken_message):
+    while True:
+        email = input(prompt)
+        check = service.post("/check", {"email": email})
+        if not check["email_valid"]:
+            print("Invalid email format.")
+            continue
+        if check.get("email_taken"):  # only told when logged in
+            print(taken_message)
+            continue
+        return email
+
+
+def create_user(service):
+    name = input("Enter your name: ")
+    username = ask_username(service, "Enter your desired username: ", "Username already taken. Try another.")
+    email = ask_email(service, "Enter your email: ", "Email already in use. Try another.")
+    password = prompts.ask_password()
+    preferences = prompts.ask_preferences()
+    while True:
+        try:
+            show(service.post("/users", {"name": name, "username": username, "email": email,
+                                         "password": password, "preferences": preferences}))
+            return
+        except ServiceError as e:
+            show_error(e)
+            # taken by someone else: ask for another one and send it again
+            if e.payload.get("field") == "email":
+                email = ask_email(service, "Enter your email: ", "Email already in use. Try another.")
+            elif e.payload.get("field") == "username":
+                username = ask_username(service, "Enter your desired username: ", "Username already taken. Try another.")
+            else:
+                return
+
+
+# reset a locked account's password by its email; True once done
+def reset_password(service, username):
+    print("Exceeded password attempts.")
+    while True:
+        email = input("Enter your email to reset password or 1 to return: ").strip()
+        if email == "1":
+            return False
+        try:
+            service.post("/reset", {"username": username, "email": email})
+        except ServiceError as e:
+            show_error(e)
+            continue
+        show(service.post("/reset", {"username": username, "email": email, "password": prompts.ask_password()}))
+        return True
+
+
+def login(service):
+    print("Welcome to All Rentals In Kind (ARIK)!")
+
+    while True:
+        username = input("Enter your username: ").strip()
+        if not service.post("/check", {"username": username})["username_taken"]:
+            choice = input("Username not found. Create account? (Y/N): ").lower()
+            if choice in ("y", "yes"):
+                create_user(service)
+            else:
+                print("Returning to login screen.")
+            continue
+
+        while True:
+            password = pwinput.pwinput("Enter your password or 1 to go back: ", mask="*").strip()
+            if password == "1":
+                break
+            try:
+                answer = service.post("/login", {"username": username, "password": password})
+            except ServiceError as e:
+                if e.status != 403:  # 403: locked already, the reset prompt says so
+                    show_error(e)
+                if e.payload.get("locked"):  # if incorrect pwd input more than 5, preventing further trying
+                    reset_password(service, username)
+                    break
+                continue
+            service.token = answer["token"]
+            show(answer)
+            return answer["account"]
+
+
+def view_reservations(account):
+    if not account["reservations"]:
+        print("No reservations made yet.")
+    for reservation in account["reservations"]:
+        print(reservation)
+
+
+def view_account_details(account):
+    print(f"Name: {account['name']}")
+    print(f"Username: {account['username']}")
+    print(f"Email: {account['email']}")
+    print(f"Reservations: {account['reservations']}")
+    print(f"Preferences: {account['preferences']}")
+
+
+# search through the service (its questions are asked here), then offer to reserve one of the results
+def get_recommendations(service):
+    try:
+        step = service.post("/search")
+        while "ask" in step:
+            show(step)
+            step = service.post("/answer", {"dialogue": step["dialogue"], "answer": input(step["ask"])})
+    except ServiceError as e:
+        show_error(e)
+        return
+    show(step)
+
+    while True:
+        reserve = input("Bot: Would you like to make a reservation for any of these? (Y/N): ").strip().lower()
+        if reserve in {"y", "n", "yes", "no"}:
+            break
+        print("Bot: Please enter Y, N, Yes, or No.")
+
+    if reserve in {"y", "yes"}:
+        decision = input("Please enter the ID of the property you would like to reserve: ").strip()
+        try:
+            show(service.post("/reserve", {"property_id": decision}))
+        except ServiceError as e:
+            show_error(e)
+
+
+def delete_reservation(service):
+    account = service.get("/account")
+    if not account["reservations"]:
+        print("No reservations were made.")
+        return
+
+    print("You have made the following reservations:")
+    view_reservations(account)
+
+    try:
+        id_to_cancel = int(input("Enter the ID of the property you would like to cancel: ").strip())
+    except ValueError:
+        print("Invalid ID (must be an integer).")
+        return
+
+    if not any(r.get("id") == id_to_cancel for r in account["reservations"]):
+        print("No reservation with that ID.")
+        return
+
+    confirm = input(
+        f"Are you sure you want to cancel the reservation with Property ID {id_to_cancel}? (Y/N): "
+    ).strip().lower()
+
+    if confirm != 'y':
+        print("Cancellation aborted.")
+        return
+
+    try:
+        show(service.post("/cancel", {"property_id": id_to_cancel}))
+    except ServiceError as e:
+        show_error(e)
+
+
+def update_account(service, **changes):
+    try:
+        show(service.post("/account", changes))
+    except ServiceError as e:
+        show_error(e)
+
+
+def delete_user(service, account):
+    password = pwinput.pwinput("Enter your password to confirm: ", mask="*").strip()
+    if not service.post("/check", {"password": password}).get("password_correct"):
+        print("Incorrect password. Account deletion aborted.")
+        return False
+
+    confirm = input(f"Are you sure you want to delete the account '{account['username']}'? (Y/N): ").strip().lower()
+    if confirm != "y":
+        print("Account deletion cancelled.")
+        return False
+    try:
+        show(service.delete("/account", {"password": password}))
+    except ServiceError as e:
+        show_error(e)
+        return False
+    return True
+
+
 def main():
-    manager = UserManager()
-    logged_in_user = manager.login()
+    try:
+        service = connect()
+    except OSError as e:
+        print(f"Could not reach the ARIK service at {SERVICE_URL} ({e}). See {LOG_FILE} for why it did not start.")
+        return
+    except ServiceError as e:
+        print(f"Another program answers at {SERVICE_URL} ({e}). Set ARIK_PORT to run the ARIK service on another port.")
+        return
+    logged_in_user = login(service)
 
     # If login failed, exit the program
     if not logged_in_user:
@@ -13,19 +232,19 @@ def main():
 
     while True:
         logout = False
-        print(f"\nWelcome, {logged_in_user.name}!")
+        print(f"\nWelcome, {logged_in_user['name']}!")
         while True:
             print("Select an option from the following:")
             print("1. Reservation Manager")
             print("2. Account Manager")
             print("3. Logout")
             choice1 = input("Choose an option: ").strip()
-            
+
             # ---------------- Reservation Manager ----------------
             if choice1 == "1":
                 print('*'*100)
                 print("Here is a list of your current reservations:")
-                logged_in_user.view_reservations()
+                view_reservations(service.get("/account"))
 
                 # Reservation management submenu
                 print("Please choose from the following options:")
@@ -37,16 +256,16 @@ def main():
                 choice2 = input("Choose an option: ").strip()
                 if choice2 == "1":
                     print('*'*100)
-                    logged_in_user.get_recommendations(manager)
+                    get_recommendations(service)
                 elif choice2 == "2":
                     print('*'*100)
-                    logged_in_user.delete_reservation(manager)
+                    delete_reservation(service)
                 elif choice2 == "3":
                     print('*'*100)
                     break
                 elif choice2 == "4":
                     print('*'*100)
-                    print("Logging out...")
+                    show(service.post("/logout"))
                     logout = True
                     break
                 else:
@@ -68,26 +287,24 @@ def main():
                 choice3 = input("Choose an option: ").strip()
                 if choice3 == "1":
                     print('*'*100)
-                    logged_in_user.view_account_details()
+                    view_account_details(service.get("/account"))
                 elif choice3 == "2":
                     print('*'*100)
-                    logged_in_user.set_username(manager.userdb)
-                    manager.save_users()
+                    update_account(service, username=ask_username(service, "Enter your new username: ",
+                                                                  "Username already in use by another user."))
                 elif choice3 == "3":
                     print('*'*100)
-                    logged_in_user.set_email(manager.userdb)
-                    manager.save_users()
+                    update_account(service, email=ask_email(service, "Enter your new email: ",
+                                                            "Email already in use by another user."))
                 elif choice3 == "4":
                     print('*'*100)
-                    logged_in_user.set_password()
-                    manager.save_users()
+                    update_account(service, password=prompts.ask_password())
                 elif choice3 == "5":
                     print('*'*100)
-                    logged_in_user.set_preferences()
-                    manager.save_users
+                    update_account(service, preferences=prompts.ask_preferences())
                 elif choice3 == "6":
                     print('*'*100)
-                    deleted = logged_in_user.delete_user(manager)
+                    deleted = delete_user(service, service.get("/account"))
                     if deleted:
                         logout = True
                         break
@@ -96,7 +313,7 @@ def main():
                     break
                 elif choice3 == "8":
                     print('*'*100)
-                    print("Logging out...")
+                    show(service.post("/logout"))
                     logout = True
                     break
                 else:
@@ -105,13 +322,14 @@ def main():
             # ---------------- Logout (from main menu) ----------------
             elif choice1 == "3":
                 print('*'*100)
+                service.post("/logout")
                 logout = True
                 break
             else:
                 print("Invalid choice. Try again.")
         if logout:
             break
-    
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,180 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import sys
+import time
+from typing import Callable, Optional
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class NullMetrics:
+    """Records nothing. The default, so instrumented code costs next to nothing when metrics are off."""
+
+    enabled = False
+
+    def span(self, name: str):
+        return NULL_SPAN
+
+    def count(self, name: str, value):
+        pass
+
+    def record(self, event: str):
+        return NULL_SPAN
+
+
+class JsonLinesSink:
+    """Writes each record as one JSON line to a file path (appending) or an open stream."""
+
+    def __init__(self, target=sys.stderr):
+        self.target = target
+
+    def __call__(self, record: dict):
+        line = json.dumps(record, default=str) + "\n"
+        if isinstance(self.target, str):
+            with open(self.target, "a", encoding="utf-8") as f:
+                f.write(line)
+        else:
+            self.target.write(line)
+            self.target.flush()
+
+
+class LogSink:
+    """Sends each record as a JSON message to a logger."""
+
+    def __init__(self, logger: Optional[logging.Logger] = None, level: int = logging.INFO):
+        self.logger = logger or logging.getLogger("recommender.metrics")
+        self.level = level
+
+    def __call__(self, record: dict):
+        self.logger.log(self.level, json.dumps(record, default=str))
+
+
+class MemorySink(list):
+    """Keeps records in a list, for benchmarks and interactive inspection."""
+
+    def __call__(self, record: dict):
+        self.append(record)
+
+
+class _Span:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        spans = self.metrics.spans
+        spans[self.name] = spans.get(self.name, 0.0) + time.perf_counter() - self.start
+        return False
+
+
+class _Record:
+    __slots__ = ("metrics", "event", "start", "profiler")
+
+    def __init__(self, metrics, event):
+        self.metrics = metrics
+        self.event = event
+        self.profiler = None
+
+    def __enter__(self):
+        self.metrics.spans, self.metrics.counts = {}, {}
+        if self.metrics.profile:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        record = {
+            "event": self.event,
+            "timestamp": time.time(),
+            "duration_s": duration,
+            "spans": self.metrics.spans,
+            "counts": self.metrics.counts,
+        }
+        if exc_type is not None:
+            record["error"] = exc_type.__name__
+        if self.profiler is not None:
+            self.profiler.disable()
+            record["profile"] = self.metrics.profile_summary(self.profiler)
+        self.metrics.spans, self.metrics.counts = {}, {}
+        self.metrics.sink(record)
+        return False
+
+
+class Metrics:
+    """
+    Collects timed spans (seconds, summed per name) and counters for one event at a time,
+    e.g. one call of recommendation_logic, and hands each finished record to the sink.
+    With profile=True every record also carries the top functions of a cProfile run.
+    """
+
+    enabled = True
+
+    def __init__(self, sink: Callable[[dict], None] = None, profile: bool = False, profile_top: int = 25):
+        self.sink = sink if sink is not None else JsonLinesSink()
+        self.profile = profile
+        self.profile_top = profile_top
+        self.spans = {}
+        self.counts = {}
+
+    def span(self, name: str) -> _Span:
+        """Context manager timing a stage."""
+        return _Span(self, name)
+
+    def count(self, name: str, value):
+        self.counts[name] = value
+
+    def record(self, event: str) -> _Record:
+        """Context manager around one event: starts fresh spans and counters, emits them on exit."""
+        return _Record(self, event)
+
+    def profile_summary(self, profiler: cProfile.Profile) -> str:
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(self.profile_top)
+        return out.getvalue()
+
+
+# RECOMMENDER_METRICS=<path> writes records to that file ("-" for stderr), RECOMMENDER_PROFILE=1 adds cProfile output
+def _from_environment():
+    target = os.environ.get("RECOMMENDER_METRICS")
+    if not target:
+        return NullMetrics()
+    sink = JsonLinesSink(sys.stderr if target == "-" else target)
+    return Metrics(sink, profile=os.environ.get("RECOMMENDER_PROFILE") == "1")
+
+
+_active = _from_environment()
+
+
+def get_metrics():
+    """The metrics instrumented code reports to."""
+    return _active
+
+
+def set_metrics(metrics=None):
+    """Install metrics (None turns them off) and return the previous ones."""
+    global _active
+    previous, _active = _active, metrics or NullMetrics()
+    return previous
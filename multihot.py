@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+from itertools import chain
+from typing import Iterable, List
+
+
+class MultiHotIndex:
+    """
+    Case-normalized vocabulary and sparse multi-hot matrix of a list column (features or tags).
+    The matrix is stored row-wise (CSR) for match counting and column-wise (posting lists)
+    for "must have" lookups.
+    """
+
+    def __init__(self, lists: Iterable[List[str]]):
+        lists = list(lists)
+        lengths = np.fromiter(map(len, lists), dtype=np.int64, count=len(lists))
+        flat = list(chain.from_iterable(lists))
+        codes, uniques = pd.factorize(np.array(flat, dtype=object)) if flat else (np.zeros(0, dtype=np.int64), [])
+        self._build(lengths, codes, uniques)
+
+    @classmethod
+    def from_codes(cls, offsets: np.ndarray, codes: np.ndarray, table: List[str]):
+        """
+        Same index from a CSR list column of codes into a table of distinct terms in first-seen
+        order (e.g. a snapshot column), without decoding the lists.
+        """
+        index = cls.__new__(cls)
+        index._build(np.diff(offsets), np.asarray(codes, dtype=np.int64), table)
+        return index
+
+    # rows of `lengths` entries, flattened as codes into the distinct spellings `uniques`
+    def _build(self, lengths: np.ndarray, codes: np.ndarray, uniques):
+        self.size = lengths.shape[0]
+        self.vocab = {}  # lowercase term -> column
+        self.labels = []  # first spelling seen for each column
+
+        # lowercase each distinct spelling once and give it a column
+        columns = np.empty(len(uniques), dtype=np.int64)
+        for i, term in enumerate(uniques):
+            key = str(term).lower()
+            if key not in self.vocab:
+                self.vocab[key] = len(self.labels)
+                self.labels.append(term)
+            columns[i] = self.vocab[key]
+
+        # one entry per (row, column), so "Pool" and "pool" on one property count once
+        width = max(len(self.labels), 1)
+        rows = np.repeat(np.arange(self.size), lengths)
+        pairs = np.unique(rows * width + columns[codes])
+        self.row_of = pairs // width
+        self.indices = pairs % width
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(self.row_of, minlength=self.size))])
+
+        # posting lists: rows of each column, sorted
+        order = np.argsort(self.indices, kind="stable")
+        self.postings_rows = self.row_of[order]
+        self.postings_ptr = np.concatenate([[0], np.cumsum(np.bincount(self.indices, minlength=len(self.labels)))])
+
+    @classmethod
+    def view(cls, vocab: dict, labels: List[str], indptr: np.ndarray, indices: np.ndarray):
+        """
+        Match counting over existing CSR arrays (e.g. a shard's rows in shared memory), without copying them.
+        `indptr` may be a slice of a larger matrix's, with `indices` the whole matrix's. No posting lists.
+        """
+        index = cls.__new__(cls)
+        index.size = indptr.shape[0] - 1
+        index.vocab = vocab
+        index.labels = labels
+        index.indptr = indptr
+        index.indices = indices
+        return index
+
+    def encode(self, terms: Iterable[str]) -> np.ndarray:
+        """Multi-hot vector of the requested terms, unknown terms are ignored."""
+        vector = np.zeros(len(self.labels), dtype=np.int64)
+        for term in terms:
+            column = self.vocab.get(term.lower())
+            if column is not None:
+                vector[column] = 1
+        return vector
+
+    # positions in indices of the entries of the given rows, with per-row entry counts and offsets
+    def _gather(self, rows):
+        starts = self.indptr[rows]
+        lengths = self.indptr[np.asarray(rows) + 1] - starts
+        offsets = np.cumsum(lengths) - lengths
+        positions = np.repeat(starts - offsets, lengths) + np.arange(lengths.sum())
+        return positions, lengths, offsets
+
+    def match_counts(self, terms: Iterable[str], rows=None) -> np.ndarray:
+        """Number of distinct requested terms each row (or each given row) has."""
+        if rows is None:
+            vector = self.encode(terms)
+            return np.bincount(self.row_of, weights=vector[self.indices], minlength=self.size).astype(np.int64)
+        return self.match_counts_many([terms], rows)[:, 0]
+
+    def match_counts_many(self, term_lists: List[Iterable[str]], rows) -> np.ndarray:
+        """Match counts of several requests over the given rows, shape (len(rows), len(term_lists))."""
+        counts = np.zeros((len(rows), len(term_lists)), dtype=np.int64)
+        positions, lengths, offsets = self._gather(rows)
+        if positions.size == 0 or not term_lists:
+            return counts
+        query = np.stack([self.encode(terms) for terms in term_lists], axis=1)
+        hits = query[self.indices[positions]]
+        nonempty = lengths > 0
+        counts[nonempty] = np.add.reduceat(hits, offsets[nonempty], axis=0)
+        return counts
+
+    def postings(self, term: str) -> np.ndarray:
+        """Rows that have the term."""
+        column = self.vocab.get(term.lower())
+        if column is None:
+            return np.zeros(0, dtype=np.int64)
+        return self.postings_rows[self.postings_ptr[column]:self.postings_ptr[column + 1]]
+
+    def rows_with_all(self, terms: Iterable[str]) -> np.ndarray:
+        """Rows that have every one of the terms ("must have Hot Tub and Pool")."""
+        rows = None
+        for term in terms:
+            posting = self.postings(term)
+            rows = posting if rows is None else np.intersect1d(rows, posting, assume_unique=True)
+        return np.arange(self.size) if rows is None else rows
+
+    def terms(self) -> List[str]:
+        """Sorted vocabulary, one spelling per case-insensitive term."""
+        return sorted(self.labels)
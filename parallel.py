@@ -0,0 +1,315 @@
+import multiprocessing
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from availability import AvailabilityIndex
+from catalog import Catalog
+from locations import LocationIndex
+from multihot import MultiHotIndex
+from properties import Property
+from recommender import BATCH_SIZE, RECOMMEND_TOP_N, parse_request, score_requests, select_top
+
+# how catalog rows are split between shards: contiguous id ranges, or whole locations by hash
+PARTITIONS = ("range", "location")
+
+# columns every shard reads from shared memory, all in shard order (each shard's rows are contiguous)
+COLUMNS = ("rows", "ids", "location", "price", "capacity", "environment",
+           "features_indptr", "features", "tags_indptr", "tags", "bits")
+
+
+# copy an array into a new shared memory block; returns the block and what a worker needs to attach it
+def _share(array: np.ndarray):
+    array = np.ascontiguousarray(array)
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+
+# an array's copy in the block it was shared into, written in place
+def _view(block: shared_memory.SharedMemory, array: np.ndarray) -> np.ndarray:
+    return np.ndarray(array.shape, array.dtype, buffer=block.buf)
+
+
+def _attach(spec) -> Tuple[shared_memory.SharedMemory, np.ndarray]:
+    name, shape, dtype = spec
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray(shape, dtype, buffer=block.buf)
+
+
+# a multi-hot column in shard order: CSR of the given rows only
+def _reorder(index: MultiHotIndex, order: np.ndarray):
+    positions, lengths, _ = index._gather(order)
+    return np.concatenate([[0], np.cumsum(lengths)]), index.indices[positions]
+
+
+class _Shard:
+    """
+    One shard's rows, read in place from shared memory by the worker process that scores them,
+    as a catalog score_requests can work on (environments are codes, requests carry codes too).
+    """
+
+    def __init__(self, spec: dict):
+        self.blocks = {}
+        columns = {}
+        for name in COLUMNS:
+            self.blocks[name], columns[name] = _attach(spec["columns"][name])
+        self.bounds = lo, hi = spec["bounds"]
+        self.rows = columns["rows"][lo:hi]
+        self.ids = columns["ids"][lo:hi]
+        self.location = columns["location"][lo:hi]
+        self.price = columns["price"][lo:hi]
+        self.capacity = columns["capacity"][lo:hi]
+        self.environment = columns["environment"][lo:hi]
+        self.features = MultiHotIndex.view(*spec["features_vocab"], columns["features_indptr"][lo:hi + 1], columns["features"])
+        self.tags = MultiHotIndex.view(*spec["tags_vocab"], columns["tags_indptr"][lo:hi + 1], columns["tags"])
+        self.availability = AvailabilityIndex.from_bits([], spec["base"], columns["bits"][lo:hi], copy=False)
+        # shard rows of each location code: by_location[starts[code]:starts[code + 1]]
+        self.by_location = np.argsort(self.location, kind="stable")
+        self.starts = np.searchsorted(self.location[self.by_location], np.arange(spec["locations"] + 1))
+
+    # read booking bits from a new shared block (the calendar grew), letting go of the old one
+    def use_bits(self, spec, base: int):
+        block, bits = _attach(spec)
+        lo, hi = self.bounds
+        self.availability = AvailabilityIndex.from_bits([], base, bits[lo:hi], copy=False)
+        self.blocks["bits"], old = block, self.blocks["bits"]
+        old.close()
+
+    def close(self):
+        # drop the views before the blocks they point into
+        blocks = self.blocks
+        self.__dict__.clear()
+        for block in blocks.values():
+            block.close()
+
+    def location_rows(self, codes) -> np.ndarray:
+        if len(codes) == 0:
+            return np.zeros(0, dtype=np.int64)
+        return np.sort(np.concatenate([self.by_location[self.starts[code]:self.starts[code + 1]] for code in codes]))
+
+    # (matches, catalog rows, scores) of the local top n of each request, sharing filtering like recommend_many
+    def top_many(self, requests: List[dict], n: int) -> list:
+        groups = {}
+        for i, request in enumerate(requests):
+            key = (tuple(request["location"]), request["start_date"], request["end_date"])
+            groups.setdefault(key, []).append(i)
+
+        results = [None] * len(requests)
+        for (codes, start_date, end_date), members in groups.items():
+            rows = self.location_rows(codes)
+            rows = rows[self.availability.free_mask(start_date, end_date, rows)]
+            capacity = self.capacity[rows]
+            for chunk_start in range(0, len(members), BATCH_SIZE):
+                chunk = members[chunk_start:chunk_start + BATCH_SIZE]
+                scores = score_requests(self, rows, [requests[i] for i in chunk])
+                for column, i in enumerate(chunk):
+                    fits = np.flatnonzero(capacity >= requests[i]["group_size"])
+                    best = fits[select_top(scores[fits, column], self.ids[rows[fits]], n)]
+                    results[i] = (fits.shape[0], self.rows[rows[best]], scores[best, column])
+        return results
+
+
+_shard = None  # the shard this worker process serves
+
+
+def _load_shard(spec: dict):
+    global _shard
+    if _shard is not None:
+        _shard.close()
+    _shard = _Shard(spec)
+    return spec["bounds"][1] - spec["bounds"][0]
+
+
+def _use_bits(spec, base: int):
+    _shard.use_bits(spec, base)
+
+
+def _top_many(requests: List[dict], n: int) -> list:
+    return _shard.top_many(requests, n)
+
+
+class ShardedCatalog:
+    """
+    A catalog split into shards, each scored by its own worker process. The columns are copied
+    once into shared memory, where every worker reads its shard in place. A request goes to the
+    shards that can have matches, each returns its local top N, and the parent merges them.
+    Results (and tie-breaking) are the same as scoring the whole catalog in one process.
+    After bookings, update_availability() writes the new booking bits into the shared bitmap
+    instead of sharing the whole catalog again.
+
+    With partition="range" shards are contiguous runs of the catalog, so every request is split
+    across all workers (lower latency for one large query). With partition="location" each
+    location lives in one shard, so a city search only wakes one worker (more throughput for
+    batches of small queries). Call close(), or use it as a context manager, to stop the workers
+    and free the shared memory.
+    """
+
+    def __init__(self, catalog: Catalog, workers: int, partition: str = "range"):
+        if partition not in PARTITIONS:
+            raise ValueError(f"Unknown partition '{partition}', expected one of {PARTITIONS}.")
+        self.workers = max(1, workers)
+        self.partition = partition
+        self._blocks = {}
+        self._bits = None  # the shared booking bits, in shard order
+        context = multiprocessing.get_context("spawn")
+        self._pools = [ProcessPoolExecutor(max_workers=1, mp_context=context) for _ in range(self.workers)]
+        self.load(catalog)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def load(self, catalog: Catalog):
+        """Share a (new version of the) catalog with the workers, which stay running."""
+        codes, names = pd.factorize(catalog.location)
+        codes, names = codes.astype(np.int64), list(names)
+        location_shard = self._shard_of_location(names)
+        if location_shard is not None:
+            shard_of = location_shard[codes]
+        else:
+            # contiguous runs of about equal size
+            shard_of = np.arange(catalog.size) * self.workers // max(catalog.size, 1)
+        order = np.argsort(shard_of, kind="stable")
+        bounds = np.concatenate([[0], np.cumsum(np.bincount(shard_of, minlength=self.workers))])
+
+        environment_codes, environments = pd.factorize(catalog.environment)
+        features_indptr, features = _reorder(catalog.features, order)
+        tags_indptr, tags = _reorder(catalog.tags, order)
+        arrays = {
+            "rows": order,
+            "ids": catalog.ids[order],
+            "location": codes[order],
+            "price": catalog.price[order],
+            "capacity": catalog.capacity[order],
+            "environment": environment_codes[order],
+            "features_indptr": features_indptr,
+            "features": features,
+            "tags_indptr": tags_indptr,
+            "tags": tags,
+            "bits": catalog.availability.bits[catalog.availability_rows[order]],
+        }
+        blocks, specs = {}, {}
+        for name, array in arrays.items():
+            blocks[name], specs[name] = _share(array)
+
+        shared = {
+            "columns": specs,
+            "locations": len(names),
+            "base": catalog.availability.base,
+            "features_vocab": (catalog.features.vocab, catalog.features.labels),
+            "tags_vocab": (catalog.tags.vocab, catalog.tags.labels),
+        }
+        futures = [pool.submit(_load_shard, {**shared, "bounds": (int(bounds[i]), int(bounds[i + 1]))})
+                   for i, pool in enumerate(self._pools)]
+        for future in futures:
+            future.result()
+
+        # the workers have moved to the new blocks, the old ones can go
+        self._free()
+        self._blocks = blocks
+        self._bits = _view(blocks["bits"], arrays["bits"])
+        self._order = order
+        self._base = catalog.availability.base
+        self.catalog = catalog
+        self.locations = LocationIndex(names)
+        self.location_shard = location_shard
+        self.environment_codes = {env: code for code, env in enumerate(environments)}
+
+    def update_availability(self):
+        """
+        Bring the workers up to date with bookings and cancellations made in the shared catalog's
+        availability index since load(). The bits are written into the shared bitmap the workers
+        read in place; only when the calendar grew to cover new days is a new bitmap shared.
+        """
+        availability = self.catalog.availability
+        bits = availability.bits[self.catalog.availability_rows[self._order]]
+        if bits.shape == self._bits.shape and availability.base == self._base:
+            self._bits[...] = bits
+            return
+        block, spec = _share(bits)
+        for future in [pool.submit(_use_bits, spec, availability.base) for pool in self._pools]:
+            future.result()
+        self._bits = None
+        old = self._blocks["bits"]
+        old.close()
+        old.unlink()
+        self._blocks["bits"] = block
+        self._bits = _view(block, bits)
+        self._base = availability.base
+
+    # shard of every location code, for partition="location" (None: every shard has every location)
+    def _shard_of_location(self, names: List[str]):
+        if self.partition != "location":
+            return None
+        return np.array([zlib.crc32(str(name).encode("utf-8")) % self.workers for name in names], dtype=np.int64)
+
+    # a parsed request as shards take it: location codes (matched against the whole catalog) and an environment code
+    def _shard_request(self, request: dict) -> dict:
+        environment = request["environment"]
+        return {
+            **request,
+            "location": self.locations.rows(request["location"]).tolist(),
+            "environment": None if environment is None else self.environment_codes.get(environment, -1),
+        }
+
+    def top_many(self, requests: List[dict], n: int = RECOMMEND_TOP_N) -> List[Tuple[int, np.ndarray, np.ndarray]]:
+        """
+        (number of matches, catalog rows, scores) of the top n of each parsed request, best first.
+        All requests go to each shard in one message.
+        """
+        shard_requests = [self._shard_request(request) for request in requests]
+        # which requests each shard can have matches for
+        wanted = [[] for _ in self._pools]
+        for i, request in enumerate(shard_requests):
+            if self.location_shard is None:
+                shards = range(self.workers)
+            else:
+                shards = set(self.location_shard[request["location"]].tolist())
+            for shard in shards:
+                wanted[shard].append(i)
+        futures = [(members, pool.submit(_top_many, [shard_requests[i] for i in members], n))
+                   for members, pool in zip(wanted, self._pools) if members]
+
+        parts = [[] for _ in requests]
+        for members, future in futures:
+            for i, part in zip(members, future.result()):
+                parts[i].append(part)
+        return [self._merge(found, n) for found in parts]
+
+    def top(self, request: dict, n: int = RECOMMEND_TOP_N) -> Tuple[int, np.ndarray, np.ndarray]:
+        """(number of matches, catalog rows, scores) of the top n of one parsed request."""
+        return self.top_many([request], n)[0]
+
+    def _merge(self, parts, n: int):
+        if not parts:
+            return 0, np.zeros(0, dtype=np.int64), np.zeros(0)
+        rows = np.concatenate([part[1] for part in parts])
+        scores = np.concatenate([part[2] for part in parts])
+        best = select_top(scores, self.catalog.ids[rows], n)
+        return sum(part[0] for part in parts), rows[best], scores[best]
+
+    def recommend_many(self, requests: List[dict], top_n: int = RECOMMEND_TOP_N) -> List[List[Property]]:
+        """Like recommender.recommend_many, with the shards scoring in parallel."""
+        found = self.top_many([parse_request(req) for req in requests], top_n)
+        return [[self.catalog.property_at(row) for row in rows] for _, rows, _ in found]
+
+    def _free(self):
+        self._bits = None  # the view goes before its block
+        for block in self._blocks.values():
+            block.close()
+            block.unlink()
+        self._blocks = {}
+
+    def close(self):
+        """Stop the workers and free the shared memory."""
+        for pool in self._pools:
+            pool.shutdown()
+        self._pools = []
+        self._free()
@@ -0,0 +1,69 @@
+import re
+import pwinput
+
+# Password and preference rules and prompts, shared by users.py, the service and its client (main.py),
+# which must not import users.py (it loads the recommender and the LLM client).
+
+PREFERENCE_KEYS = ("budget_wt", "enviro_wt", "feature_wt", "tags_wt")
+
+
+# verify if user set a strong pwd
+def is_strong_password(password):
+    if len(password) < 8:
+        return False
+    has_upper = re.search(r"[A-Z]", password)
+    has_number = re.search(r"\d", password)
+    has_special = re.search(r"[!@#$%^&*(),.?\":{}|<>]", password)
+    return all([has_upper, has_number, has_special])
+
+
+def is_valid_email(email):
+    pattern = r'^[\w\.-]+@[\w\.-]+\.\w+$'
+    return re.match(pattern, email) is not None
+
+
+# all weights zero means no preference: equal importance to each category
+def equal_if_all_zero(weights: dict) -> dict:
+    if sum(weights.values()) == 0:
+        print("All preferences were zero, setting equal importance to each category.")
+        return dict.fromkeys(PREFERENCE_KEYS, 1)
+    return weights
+
+
+def ask_password():
+    while True:
+        password = pwinput.pwinput(
+            "Create a password (8 chars, 1 capital, 1 number, 1 special): ", mask="*"
+        )
+        if not is_strong_password(password):  # check if is strong pwd
+            print("Password does not meet requirements.")
+            continue
+        confirm = pwinput.pwinput("Confirm your password: ", mask="*")
+        if password != confirm:  # check if two times input are the same
+            print("Passwords do not match.")
+            continue
+        return password
+
+
+def ask_preferences() -> dict:
+    def get_weight(prompt):
+        while True:
+            try:
+                value = float(input(prompt))
+                if 0 <= value <= 10:
+                    return value
+                else:
+                    print("Please enter a number between 0 and 10.")
+            except ValueError:
+                print("Invalid input. Please enter a number between 0 and 10.")
+
+    print("We're just going to ask a few questions to get to know you better.")
+    print("Please enter a number, 0-10, for how important each feature is.")
+    print("0 means not important at all and 10 means this preference is a very good-to-have.")
+
+    return equal_if_all_zero({
+        "budget_wt": get_weight("How important is budget to you? "),
+        "enviro_wt": get_weight("How important is environment to you? "),
+        "feature_wt": get_weight("How important is it that you get your desired features? "),
+        "tags_wt": get_weight("How important is it that the property has the tags you've requested? "),
+    })
@@ -1,9 +1,53 @@
-from typing import List, Optional
-import json
+import itertools
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from typing import Iterable, List, Optional, Union
 from datetime import date, timedelta, datetime
+from snapshot import index_by_id
+from storage import open_property_store
+
+
+# day ordinal of an ISO date string; catalogs repeat the same few hundred days many times
+@lru_cache(maxsize=4096)
+def _iso_ordinal(day: str) -> int:
+    return datetime.fromisoformat(day).date().toordinal()
+
+
+# sorted distinct day ordinals of some dates; an array('i') is taken to be that already
+def _ordinals(days: Union[Iterable[date], array]) -> array:
+    if isinstance(days, array):
+        return days
+    if not days:
+        return array("i")
+    return array("i", sorted({d.toordinal() for d in days}))
+
+
+def _interned(values) -> tuple:
+    return tuple(map(sys.intern, values))
+
+
+# what the interactive flows print once dates are booked or freed
+def booked_message(start_date: date, end_date: date) -> str:
+    return f"Booked dates added: {[start_date + timedelta(days=i) for i in range((end_date - start_date).days)]}"
+
+
+def freed_message(removed_dates: List[date]) -> str:
+    return f"Booked dates removed: {removed_dates}" if removed_dates else "No matching booked dates to remove."
 
 
 class Property:
+    """
+    One rental. Kept compact so that large catalogs fit in memory: no per-instance __dict__,
+    interned strings (one copy of each location, type, environment, feature and tag),
+    features and tags as tuples, and booked days as a sorted array('i') of day ordinals.
+    `features`, `tags` and `booked` still read as lists (new lists on each access).
+    """
+
+    __slots__ = ("id", "location", "type", "price", "capacity", "environment",
+                 "_features", "_tags", "_days", "_availability")
+
     def __init__(self,
                  id: int,
                  location: str,
@@ -15,14 +59,47 @@ class Property:
                  tags: List[str],
                  booked: List[date] = None):
         self.id = id
-        self.location = location
-        self.type = type
+        self.location = sys.intern(location)
+        self.type = sys.intern(type)
         self.price = price
         self.capacity = capacity
-        self.environment = environment
-        self.features = features
-        self.tags = tags
-        self.booked = booked or []
+        self.environment = sys.intern(environment)
+        self._features = _interned(features)
+        self._tags = _interned(tags)
+        self._days = _ordinals(booked if booked is not None else ())
+        self._availability = None  # set when the property joins a catalog AvailabilityIndex
+
+    @property
+    def features(self) -> List[str]:
+        return list(self._features)
+
+    @features.setter
+    def features(self, values: List[str]):
+        self._features = _interned(values)
+
+    @property
+    def tags(self) -> List[str]:
+        return list(self._tags)
+
+    @tags.setter
+    def tags(self, values: List[str]):
+        self._tags = _interned(values)
+
+    @property
+    def booked(self) -> List[date]:
+        """Booked days in order, as dates."""
+        return [date.fromordinal(day) for day in self._days]
+
+    @booked.setter
+    def booked(self, days: List[date]):
+        self._days = _ordinals(days)
+        if self._availability is not None:
+            self._availability.set_booked(self.id, self._days)
+
+    @property
+    def booked_ordinals(self) -> array:
+        """Booked days as the sorted array of day ordinals itself (do not modify)."""
+        return self._days
 
     # easy for printing, and debugging
     def __repr__(self):
@@ -43,13 +120,13 @@ class Property:
             "environment": self.environment,
             "features": self.features,
             "tags": self.tags,
-            "booked": [d.isoformat() for d in self.booked]
+            "booked": [date.fromordinal(day).isoformat() for day in self._days]
         }
 
     @classmethod
     def from_dict(cls, data):
         """Create Property instance from dict (JSON load)."""
-        booked_dates = [datetime.fromisoformat(d).date() for d in data.get("booked", [])]
+        booked_days = array("i", sorted(set(map(_iso_ordinal, data.get("booked", [])))))
         return cls(
             id=data["id"],
             location=data["location"],
@@ -59,55 +136,207 @@ class Property:
             environment=data["environment"],
             features=data.get("features", []),
             tags=data.get("tags", []),
-            booked=booked_dates
+            booked=booked_days
         )
 
-    def add_dates(self, start_date: date, end_date: date):
+    def add_dates(self, start_date: date, end_date: date, verbose: bool = False):
         """Add all dates from start_date to end_date to self.booked."""
-        for i in range((end_date - start_date).days):
-            day = start_date + timedelta(days=i)
-            if day not in self.booked:
-                self.booked.append(day)
-        print(f"Booked dates added: {[start_date + timedelta(days=i) for i in range((end_date - start_date).days)]}")
+        start, end = start_date.toordinal(), end_date.toordinal()
+        if end > start:
+            # the range replaces whatever part of it was booked already, keeping the array sorted
+            days = self._days
+            days[bisect_left(days, start):bisect_left(days, end)] = array("i", range(start, end))
+        if self._availability is not None:
+            self._availability.mark(self.id, start_date, end_date)
+        if verbose:
+            print(booked_message(start_date, end_date))
+
+    def delete_dates(self, start_date: date, end_date: date, verbose: bool = False) -> List[date]:
+        """Remove all dates in the given range from self.booked; returns the dates that were booked."""
+        days = self._days
+        lo, hi = bisect_left(days, start_date.toordinal()), bisect_right(days, end_date.toordinal())
+        removed_dates = [date.fromordinal(day) for day in days[lo:hi]]
+        del days[lo:hi]
+        if self._availability is not None:
+            self._availability.mark(self.id, start_date, end_date + timedelta(days=1), booked=False)
 
-    def delete_dates(self, start_date: date, end_date: date):
-        """Remove all dates in the given range from self.booked."""
-        dates_to_remove = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
-        removed_dates = [d for d in dates_to_remove if d in self.booked]
-        self.booked = [d for d in self.booked if d not in dates_to_remove]
+        if verbose:
+            print(freed_message(removed_dates))
+        return removed_dates
 
-        if removed_dates:
-            print(f"Booked dates removed: {removed_dates}")
-        else:
-            print("No matching booked dates to remove.")
+    def is_available(self, start_date: date, end_date: date) -> bool:
+        """True if no day in [start_date, end_date) is booked."""
+        if self._availability is not None:
+            return self._availability.is_free(self.id, start_date, end_date)
+        at = bisect_left(self._days, start_date.toordinal())
+        return at == len(self._days) or self._days[at] >= end_date.toordinal()
 
 
 class PropertiesController:
-    def __init__(self):
-        self.json_file = "properties.json"
-        self.properties = self.load_properties()
+    _ids = itertools.count(1)
 
-    # load all properties from json_file which store record of all properties
+    def __init__(self, store=None):
+        # where the catalog lives: properties.json by default, SQLite with ARIK_STORAGE=sqlite (see storage.py)
+        self.store = store if store is not None else open_property_store()
+        self.id = next(PropertiesController._ids)  # tells controllers apart in catalog versions
+        self._properties = None  # loaded on first use, so pushdown stores can answer searches without it
+        self._synced = None  # store data version the loaded catalog is up to date with
+        self._catalog = None  # columnar view of the loaded properties, see catalog()
+        self.edits = 0  # properties added, deleted, booked or freed, plus one per reload
+        self.listings = 0  # properties added or deleted, plus one per load (bookings do not count)
+
+    def _ensure_loaded(self):
+        if self._properties is None:
+            # taken before loading, so changes recorded while loading are caught up with later
+            self._synced = self.store.data_version()
+            self._properties, self._availability = self.store.load()
+            self._loaded_version = self._availability.version
+            self._by_id = index_by_id(self._properties)
+            self._catalog = None
+            self.listings += 1
+
+    @property
+    def properties(self) -> List[Property]:
+        self._ensure_loaded()
+        return self._properties
+
+    @property
+    def availability(self):
+        self._ensure_loaded()
+        return self._availability
+
+    @property
+    def by_id(self) -> dict:
+        self._ensure_loaded()
+        return self._by_id
+
+    # load all properties from the store, with every recorded booking applied
     def load_properties(self) -> List[Property]:
-        try:
-            with open(self.json_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                return [Property.from_dict(p) for p in data]
-        except (FileNotFoundError, json.JSONDecodeError):
-            return []
+        return self.store.load()[0]
+
+    # bring a loaded catalog up to date with what other processes recorded for a property
+    def _refresh(self, property_id: int):
+        if self._properties is not None and not self.store.refresh(self._by_id, property_id):
+            self._drop()  # the store was compacted under us, reload it
+
+    # forget the loaded catalog so it is reloaded on next use, moving the version past every value it had
+    def _drop(self):
+        self.edits = self.version + 1
+        self._properties = None
+
+    # book dates on a property if they are still free, checked and recorded atomically against other processes
+    # (None if the property does not exist or any of the dates is taken); only the change is written
+    def book(self, property_id: int, start_date: date, end_date: date) -> Optional[Property]:
+        with self.store.lock(property_id):
+            self._refresh(property_id)
+            prop = self.find_by_id(property_id)
+            if prop is None or not prop.is_available(start_date, end_date):
+                return None
+            if not self.store.record_booking(property_id, start_date, end_date):
+                return None
+            prop.add_dates(start_date, end_date)
+            self._wrote()
+        self._maybe_compact()
+        return prop
+
+    # free dates on a property (end date included, like Property.delete_dates); the dates that were
+    # booked, None if the property does not exist
+    def cancel(self, property_id: int, start_date: date, end_date: date) -> Optional[List[date]]:
+        with self.store.lock(property_id):
+            self._refresh(property_id)
+            prop = self.find_by_id(property_id)
+            if prop is None:
+                return None
+            self.store.record_cancellation(property_id, start_date, end_date)
+            removed = prop.delete_dates(start_date, end_date)
+            self._wrote()
+        self._maybe_compact()
+        return removed
+
+    # a change this controller recorded and applied itself: the loaded catalog stays in sync with the store
+    def _wrote(self):
+        self.edits += 1
+        if self._properties is not None:
+            self._synced = self.store.after_own_write(self._synced)
+
+    def _maybe_compact(self):
+        if self.store.needs_compaction():
+            self.compact()
+
+    # fold recorded changes back into the store's main copy (the JSON store's journal into properties.json)
+    def compact(self):
+        if not self.store.compact(self.properties, self.availability):
+            self._drop()  # another process compacted first, reload its result
+
+    # changes whenever a property is added, deleted, booked or freed, so derived data can tell it is stale
+    @property
+    def version(self) -> int:
+        if self._properties is None:
+            return self.edits
+        # loading does not move it: what the catalog looked like on load is counted by the store's data version
+        return self.edits + self._availability.version - self._loaded_version
+
+    def catalog_version(self) -> tuple:
+        """
+        Identifies what searches through this controller see: equal versions give equal results.
+        A loaded catalog is first brought up to date with changes other processes recorded.
+        """
+        synced = self.store.data_version()
+        if self._properties is not None and synced != self._synced:
+            if self.store.refresh(self._by_id, None):
+                self._synced = synced
+            else:
+                self._drop()
+        return self.id, self.version, synced
 
     # get all properties in a list
     def get_all(self) -> List[Property]:
         return self.properties
 
-    # select properties based on id
+    def catalog(self):
+        """
+        Columnar Catalog of the loaded properties, built once and kept until properties are added,
+        deleted or reloaded. Bookings show through it, it shares the availability index.
+        """
+        self._ensure_loaded()
+        if self._catalog is None:
+            from catalog import Catalog  # it imports this module
+
+            self._catalog = Catalog.from_properties(self._properties)
+        return self._catalog
+
+    # select properties based on id; pushdown stores fetch it alone if the catalog is not loaded
     def find_by_id(self, property_id: int) -> Optional[Property]:
-        for prop in self.properties:
-            if prop.id == property_id:
-                return prop
-        return None
-        
-    # save properties into the json file
-    def save_properties(self):
-        with open(self.json_file, "w", encoding="utf-8") as f:
-            json.dump([prop.to_dict() for prop in self.properties], f, indent=4)
+        if self._properties is None and self.store.pushdown:
+            return self.store.get(property_id)
+        return self.by_id.get(property_id)
+
+    # add a new property to the catalog, keeping the id and availability indexes in sync
+    def add_property(self, prop: Property):
+        if prop.id in self.by_id:
+            raise ValueError(f"Property id {prop.id} already exists.")
+        self.properties.append(prop)
+        self.by_id[prop.id] = prop
+        self.availability.add_property(prop)
+        self.store.record_added(prop)
+        self._wrote()
+        self.listings += 1
+        self._catalog = None
+
+    # remove a property from the catalog
+    def delete_property(self, property_id: int) -> Optional[Property]:
+        prop = self.by_id.pop(property_id, None)
+        if prop is None:
+            return None
+        self.properties.remove(prop)
+        self.availability.remove_property(property_id)
+        self.store.record_deleted(property_id)
+        self._wrote()
+        self.listings += 1
+        self._catalog = None
+        return prop
+
+    # write the whole catalog to the store; False if another process changed it since it was loaded
+    def save_properties(self) -> bool:
+        return self.store.save(self.properties, self.availability)
+
@@ -1,11 +1,29 @@
+import atexit
+import os
+import numpy as np
 import pandas as pd
 import json
 from datetime import datetime, date, timedelta
-from typing import Union
-from properties import Property
+from typing import Iterator, List, Optional, Union
+from properties import PropertiesController, Property
+from catalog import Catalog
+from metrics import get_metrics
+from result_cache import ResultCache, request_key
+from storage import PropertyStore
+import streaming
 
 RECOMMEND_TOP_N = 10
 
+# requests scored together in one matrix by recommend_many
+BATCH_SIZE = 256
+
+# results of recent searches through a PropertiesController, see recommendation_logic
+RESULT_CACHE = ResultCache()
+
+# worker processes scoring shards of a controller's catalog in parallel (RECOMMENDER_WORKERS; 0 or 1: in this process)
+WORKERS = int(os.environ.get("RECOMMENDER_WORKERS", "0"))
+_sharded = None  # [catalog version, parallel.ShardedCatalog], kept warm between searches
+
 
 # create date range generator
 def daterange(start_date: date, end_date: date):
@@ -14,23 +32,36 @@ def daterange(start_date: date, end_date: date):
         yield start_date + timedelta(n)
 
 
-def recommendation_logic(properties: Union[str, list, pd.DataFrame], user_req: dict):
-    """
-    Recommendation logic
-    """
+# round the way the original row loop did (round(score, 3) * 100), once per distinct score
+def _round_scores(score: np.ndarray) -> np.ndarray:
+    if score.size == 0:
+        return score
+    distinct, inverse = np.unique(score.ravel(), return_inverse=True)
+    rounded = np.array([round(float(s), 3) * 100 for s in distinct])
+    return rounded[inverse.reshape(-1)].reshape(score.shape)
 
+
+def as_catalog(properties: Union[str, list, pd.DataFrame, Catalog, PropertyStore]) -> Catalog:
+    """Turn any accepted properties input into a Catalog."""
+    if isinstance(properties, Catalog):
+        return properties
+    if isinstance(properties, PropertyStore):
+        return Catalog.from_properties(properties.load()[0])
+    if isinstance(properties, str) and properties.endswith(".jsonl"):
+        return Catalog.from_properties(list(streaming.read_properties(properties)))
     if isinstance(properties, str): # filename
-        df = pd.read_json(properties)
-    elif isinstance(properties, list) and all(isinstance(p, Property) for p in properties):
-        df = pd.DataFrame([p.to_dict() for p in properties])
-    elif isinstance(properties, pd.DataFrame):
-        df = properties
-    else:
-        raise ValueError("Invalid properties input. Must be a list of Property objects, a DataFrame, or a JSON file path.")
+        return Catalog.from_frame(pd.read_json(properties))
+    if isinstance(properties, list) and all(isinstance(p, Property) for p in properties):
+        return Catalog.from_properties(properties)
+    if isinstance(properties, pd.DataFrame):
+        return Catalog.from_frame(properties)
+    raise ValueError("Invalid properties input. Must be a list of Property objects, a DataFrame, a Catalog, a PropertyStore, or a JSON file path.")
 
-    print(f"There are {df.shape[0]} properties in the database.")
 
-    # load user requirement
+def parse_request(user_req: dict) -> dict:
+    """
+    Validate a user requirement dict and normalize it for scoring
+    """
     required_keys = [
         "location", "group_size", "start_date", "end_date",
         "budget_wt", "enviro_wt", "feature_wt", "tags_wt"
@@ -44,108 +75,321 @@ def recommendation_logic(properties: Union[str, list, pd.DataFrame], user_req: d
     user_location = user_req["location"]
     if isinstance(user_location, str):
         user_location = [user_location]
-    group_size = user_req["group_size"]
-    start_date = datetime.strptime(user_req["start_date"], "%Y-%m-%d").date() 
-    end_date = datetime.strptime(user_req["end_date"], "%Y-%m-%d").date()
     budget = user_req.get("budget", user_req.get("price_max"))
     if not budget:
         raise KeyError("Missing required user requirement key: 'budget' or 'price_max'")
-    user_features = user_req.get("features")
-    user_environment = user_req.get("environment")
-    user_tags = user_req.get("tags")
 
     # load and normalize weights of each attribute
     total_wt = user_req["budget_wt"] + user_req["enviro_wt"] + user_req["feature_wt"] + user_req["tags_wt"]
-    norm_budget_wt = round(user_req["budget_wt"] / total_wt, 3)
-    norm_enviro_wt = round(user_req["enviro_wt"] / total_wt, 3)
-    norm_feature_wt = round(user_req["feature_wt"] / total_wt, 3)
-    norm_tag_wt = round(user_req["tags_wt"] / total_wt, 3)
-
-    # drop properties that don't match location
-    location_pattern = "|".join([str(loc) for loc in user_location])
-    df = df[df["location"].str.contains(location_pattern, na=False, case=False)]
-
-    # drop properties that don't match group size
-    df = df[df["capacity"] >= group_size]
-
-    # get days that need to be booked
-    travel_dates = []
-    for day in daterange(start_date, end_date):
-        travel_dates.append(day)
-
-    # drop rows that are unavailable during the travel_dates
-    df["booked"] = df["booked"].apply(lambda dates: [pd.to_datetime(d).date() for d in dates])
-    df = df[df["booked"].apply(
-        lambda u: set(u).isdisjoint(set(travel_dates))
-    )]
-
-    #prompt user if no property in database matches their requirements
-    if df.shape[0] == 0:
-        print("No properties available that match your requirements.")
-        return []
-
-    # If properties are found, print the number of matching properties and calculate the score of the properties
+    weights = (
+        round(user_req["budget_wt"] / total_wt, 3),
+        round(user_req["enviro_wt"] / total_wt, 3),
+        round(user_req["feature_wt"] / total_wt, 3),
+        round(user_req["tags_wt"] / total_wt, 3),
+    )
+
+    return {
+        "location": [str(loc) for loc in user_location],
+        "group_size": user_req["group_size"],
+        "start_date": datetime.strptime(user_req["start_date"], "%Y-%m-%d").date(),
+        "end_date": datetime.strptime(user_req["end_date"], "%Y-%m-%d").date(),
+        "budget": budget,
+        "features": user_req.get("features"),
+        "environment": user_req.get("environment"),
+        "tags": user_req.get("tags"),
+        "weights": weights,
+    }
+
+
+def candidate_rows(catalog: Catalog, request: dict) -> np.ndarray:
+    """Catalog rows matching the hard requirements: location, group size and availability."""
+    metrics = get_metrics()
+    with metrics.span("filter_location"):
+        rows = catalog.location_rows(request["location"])
+    metrics.count("after_location", rows.shape[0])
+    with metrics.span("filter_capacity"):
+        rows = rows[catalog.capacity[rows] >= request["group_size"]]
+    metrics.count("after_capacity", rows.shape[0])
+    with metrics.span("filter_availability"):
+        rows = rows[catalog.free_mask(request["start_date"], request["end_date"], rows)]
+    metrics.count("after_availability", rows.shape[0])
+    return rows
+
+
+# partial score of a list field: full score if nothing was requested, otherwise matched / requested
+def _overlap_scores(index, rows, requests, field) -> np.ndarray:
+    scores = np.ones((len(rows), len(requests)))
+    wanted = [i for i, req in enumerate(requests) if req[field] is not None and len(req[field]) > 0]
+    if wanted:
+        counts = index.match_counts_many([requests[i][field] for i in wanted], rows)
+        scores[:, wanted] = counts / np.array([len(requests[i][field]) for i in wanted])
+    return scores
+
+
+def score_requests(catalog: Catalog, rows: np.ndarray, requests: List[dict]) -> np.ndarray:
+    """
+    Score candidate rows against several parsed requests at once (0-100),
+    one column per request
+    """
+    budget_wt, enviro_wt, feature_wt, tag_wt = (np.array(wt) for wt in zip(*(req["weights"] for req in requests)))
+    score = np.zeros((len(rows), len(requests)))
+
+    # full score if within budget, otherwise 0
+    budgets = np.array([req["budget"] for req in requests], dtype=float)
+    score += np.where(catalog.price[rows][:, None] <= budgets, 1 * budget_wt, 0.0)
+
+    # full score if no specific environment is requested or environment matches
+    environments = np.empty(len(requests), dtype=object)
+    environments[:] = [req["environment"] for req in requests]
+    any_environment = np.array([env is None for env in environments])
+    env_match = (catalog.environment[rows][:, None] == environments) | any_environment
+    score += np.where(env_match, 1 * enviro_wt, 0.0)
+
+    # full score if no specific features/tags are requested, otherwise partial score based on matches
+    score += _overlap_scores(catalog.features, rows, requests, "features") * feature_wt
+    score += _overlap_scores(catalog.tags, rows, requests, "tags") * tag_wt
+
+    return _round_scores(score)
+
+
+def score_candidates(catalog: Catalog, rows: np.ndarray, request: dict) -> np.ndarray:
+    """
+    Score all candidate rows of one parsed request at once (0-100)
+    """
+    return score_requests(catalog, rows, [request])[:, 0]
+
+
+def select_top(scores: np.ndarray, ids: np.ndarray, n: int) -> np.ndarray:
+    """
+    Positions of the n best scores, highest first and ties broken by lowest id.
+    Uses a partial selection, only the rows that can make the cut are sorted.
+    """
+    if n <= 0 or scores.shape[0] == 0:
+        return np.zeros(0, dtype=np.int64)
+    if n < scores.shape[0]:
+        # every row scoring at least the n-th best can make the cut, including ties at the boundary
+        cutoff = np.partition(scores, scores.shape[0] - n)[scores.shape[0] - n]
+        positions = np.flatnonzero(scores >= cutoff)
+    else:
+        positions = np.arange(scores.shape[0])
+    order = np.lexsort((ids[positions], -scores[positions]))
+    return positions[order[:n]]
+
+
+class Recommendations:
+    """
+    Scored candidates of one request, ranked lazily page by page.
+    Results are the catalog's own Property objects. Later pages extend the partial
+    selection instead of re-scoring or fully sorting the candidates.
+    """
+
+    def __init__(self, catalog: Catalog, rows: np.ndarray, scores: np.ndarray, page_size: int = RECOMMEND_TOP_N):
+        self.catalog = catalog
+        self.rows = rows
+        self.scores = scores
+        self.page_size = page_size
+        self._ranked = np.zeros(0, dtype=np.int64)  # positions into rows, best first
+
+    def __len__(self):
+        return self.rows.shape[0]
+
+    # positions of the first `count` ranked candidates, growing the selection geometrically
+    def _rank(self, count: int) -> np.ndarray:
+        if count > self._ranked.shape[0] and self._ranked.shape[0] < len(self):
+            wanted = min(len(self), max(count, 2 * self._ranked.shape[0]))
+            self._ranked = select_top(self.scores, self.catalog.ids[self.rows], wanted)
+        return self._ranked[:count]
+
+    def _page_positions(self, number: int) -> np.ndarray:
+        start = (number - 1) * self.page_size
+        return self._rank(start + self.page_size)[start:]
+
+    def page(self, number: int = 1) -> List[Property]:
+        """Properties on a page (1-based)."""
+        return [self.catalog.property_at(row) for row in self.rows[self._page_positions(number)]]
+
+    def page_scores(self, number: int = 1) -> np.ndarray:
+        """Scores of the properties on a page (1-based)."""
+        return self.scores[self._page_positions(number)]
+
+    def pages(self) -> Iterator[List[Property]]:
+        """Yield page after page until the candidates run out."""
+        number = 1
+        while (number - 1) * self.page_size < len(self):
+            yield self.page(number)
+            number += 1
+
+
+def recommend(properties: Union[str, list, pd.DataFrame, Catalog, PropertyStore], user_req: dict, page_size: int = RECOMMEND_TOP_N) -> Recommendations:
+    """
+    Filter and score one request, returning lazily ranked results.
+    Stores with pushdown (SQLite) do the location, group size and date filtering themselves,
+    and catalog files (.json or .jsonl path) are filtered while they are streamed;
+    either way only the candidates are turned into a catalog.
+    """
+    metrics = get_metrics()
+    with metrics.span("parse_request"):
+        request = parse_request(user_req)
+    candidates = None
+    if isinstance(properties, PropertyStore) and properties.pushdown:
+        with metrics.span("filter_sql"):
+            candidates = properties.candidates(request["location"], request["group_size"], request["start_date"], request["end_date"])
+    elif isinstance(properties, str):
+        with metrics.span("filter_stream"):
+            candidates = list(streaming.scan(properties, request))
+    if candidates is not None:
+        metrics.count("after_availability", len(candidates))
+        with metrics.span("catalog"):
+            catalog = Catalog.from_properties(candidates)
+        rows = np.arange(catalog.size)
     else:
-        print(f"There are {df.shape[0]} properties that match your travel location, group size, and travel dates.")
-
-        # initialize property score to 0
-        df["score"] = 0.0
-        for idx, row in df.iterrows():
-            score = 0
-
-            # full score if within budget, otherwise 0
-            if row["price"] <= budget: # full score if within budget, otherwise 0
-                score += 1 * norm_budget_wt
-
-            # full score if no specific environment is requested or environment matches
-            if user_environment is None or row["environment"] == user_environment: # full score if no specific environment is requested or environment matches
-                score += 1 * norm_enviro_wt
-
-            # full score if no specific features are requested, otherwise partial score based on matching features
-            if user_features is not None and len(user_features) > 0:
-                user_features_lower = {f.lower() for f in user_features}
-                property_features_lower = {f.lower() for f in row["features"]}
-                feature_score = len(user_features_lower.intersection(property_features_lower)) / len(user_features)
-                score += feature_score * norm_feature_wt
-            else: 
-                score += 1 * norm_feature_wt
-
-            # full score if no specific tags are requested, otherwise partial score based on matching tags
-            if user_tags is not None and len(user_tags) > 0:
-                user_tags_lower = {f.lower() for f in user_tags}
-                property_tags_lower = {f.lower() for f in row["tags"]}
-                tag_score = len(user_tags_lower.intersection(property_tags_lower)) / len(user_tags)
-                score += tag_score * norm_tag_wt
-            else: 
-                score += 1 * norm_tag_wt
-        
-            # update the score in the dataframe
-            df.at[idx, "score"] = round(score,3)*100
-
-        # rank property by property score
-        df = df.sort_values(by="score", ascending=False)
-
-        df = df[["id", "score", "price", "features", "environment", "tags"]]
-        df = df.reset_index(drop=True)
-
-        # display top N
-        print(df.head(RECOMMEND_TOP_N))
-        recommended_df = df.head(RECOMMEND_TOP_N)
-        recommended_properties = []
-
-        for _, row in recommended_df.iterrows():
-            recommended_properties.append(
-                Property(
-                    id=int(row["id"]),
-                    location=row.get("location", ""),
-                    type=row.get("type", ""),
-                    price=float(row["price"]),
-                    capacity=int(row.get("capacity", 0)),
-                    environment=row.get("environment", ""),
-                    features=list(row.get("features", [])),
-                    tags=list(row.get("tags", [])),
-                    booked=[d if isinstance(d, date) else pd.to_datetime(d).date() for d in row.get("booked", [])]
-                )
-            )
-
-        return recommended_properties
+        with metrics.span("catalog"):
+            catalog = as_catalog(properties)
+        rows = candidate_rows(catalog, request)
+    with metrics.span("score"):
+        scores = score_candidates(catalog, rows, request)
+    return Recommendations(catalog, rows, scores, page_size)
+
+
+def recommendation_logic(properties: Union[str, list, pd.DataFrame, Catalog, PropertyStore, PropertiesController], user_req: dict,
+                         cache: Optional[ResultCache] = RESULT_CACHE):
+    """
+    Recommendation logic. Stage timings and candidate counts go to the installed metrics (see metrics.py).
+    Searches through a PropertiesController are answered from `cache` when the same request was
+    made against the same catalog version; it can tell when its catalog changed, plain inputs cannot.
+    A controller's loaded catalog is scored through the columnar view it keeps (see PropertiesController.catalog),
+    and with RECOMMENDER_WORKERS above 1 in shards by that many worker processes (see parallel.py),
+    which are kept warm between searches.
+    """
+    metrics = get_metrics()
+    with metrics.record("recommendation_logic"):
+        key = version = found = None
+        sharded = False
+        if isinstance(properties, PropertiesController):
+            version = properties.catalog_version()
+            # stores that filter in the database are searched directly instead of loading every property
+            properties = properties.store if properties.store.pushdown else properties.catalog()
+            sharded = WORKERS > 1 and isinstance(properties, Catalog)
+            if cache is not None:
+                with metrics.span("cache_lookup"):
+                    key = request_key(parse_request(user_req))
+                    found = cache.get(key, version)
+                metrics.count("cache_hit", int(found is not None))
+
+        if found is None and sharded:
+            with metrics.span("catalog"):
+                shards = _sharded_catalog(version, properties)
+            total = shards.catalog.size
+            # every shard filters and scores its part of the catalog, the best of their local top N are kept
+            with metrics.span("score"):
+                matches, rows, scores = shards.top(parse_request(user_req), RECOMMEND_TOP_N)
+            metrics.count("after_availability", matches)
+            with metrics.span("rank"):
+                recommended_properties = [shards.catalog.property_at(row) for row in rows]
+        elif found is None:
+            if isinstance(properties, PropertyStore) and properties.pushdown:
+                total = properties.count()
+            elif isinstance(properties, str):
+                total = streaming.count_records(properties)
+            else:
+                with metrics.span("catalog"):
+                    properties = as_catalog(properties)
+                total = properties.size
+
+            # load user requirement, drop properties that don't match location, group size or travel dates, then score the rest
+            results = recommend(properties, user_req)
+            matches = len(results)
+            with metrics.span("rank"):
+                recommended_properties = results.page(1)
+                scores = results.page_scores(1)
+        if found is None:
+            # the table is kept with the result, so a cache hit only prints it
+            with metrics.span("render"):
+                table = render_table(recommended_properties, scores) if recommended_properties else ""
+            found = (total, matches, recommended_properties, table)
+            if key is not None:
+                cache.put(key, version, found)
+        total, matches, recommended_properties, table = found
+        metrics.count("properties", total)
+
+        print(f"There are {total} properties in the database.")
+
+        #prompt user if no property in database matches their requirements
+        if matches == 0:
+            print("No properties available that match your requirements.")
+            return []
+
+        # If properties are found, print the number of matching properties and the top N by score
+        else:
+            print(f"There are {matches} properties that match your travel location, group size, and travel dates.")
+            metrics.count("returned", len(recommended_properties))
+
+            # display top N
+            print(table)
+
+            return list(recommended_properties)
+
+
+# a controller's catalog sharded over WORKERS processes; the same processes are reloaded when the catalog version moved
+# (the controller keeps its Catalog until properties are added, deleted or reloaded, so the same one only saw bookings)
+def _sharded_catalog(version, catalog: Catalog):
+    global _sharded
+    import parallel  # it imports this module
+
+    if _sharded is None:
+        _sharded = [version, parallel.ShardedCatalog(catalog, WORKERS)]
+        atexit.register(_sharded[1].close)
+    elif _sharded[0] != version:
+        if catalog is _sharded[1].catalog:
+            _sharded[1].update_availability()
+        else:
+            _sharded[1].load(catalog)
+        _sharded[0] = version
+    return _sharded[1]
+
+
+# the top N as the table recommendation_logic prints
+def render_table(recommended_properties: List[Property], scores: np.ndarray) -> str:
+    df = pd.DataFrame({
+        "id": [p.id for p in recommended_properties],
+        "score": scores,
+        "price": [p.price for p in recommended_properties],
+        "features": [p.features for p in recommended_properties],
+        "environment": [p.environment for p in recommended_properties],
+        "tags": [p.tags for p in recommended_properties],
+    })
+    return str(df)
+
+
+def recommend_many(properties: Union[str, list, pd.DataFrame, Catalog], requests: List[dict], top_n: int = RECOMMEND_TOP_N) -> List[List[Property]]:
+    """
+    Recommend for many requests in one call (e.g. replaying saved searches).
+    The catalog is preprocessed once, requests sharing a location and date window share
+    their filtering and are scored together. Returns the top-N properties of each request, in order.
+    """
+    catalog = as_catalog(properties)
+    parsed = [parse_request(req) for req in requests]
+
+    # group requests by location and date window
+    groups = {}
+    for i, request in enumerate(parsed):
+        key = (tuple(request["location"]), request["start_date"], request["end_date"])
+        groups.setdefault(key, []).append(i)
+
+    results = [[] for _ in parsed]
+    for (locations, start_date, end_date), members in groups.items():
+        rows = catalog.location_rows(list(locations))
+        rows = rows[catalog.free_mask(start_date, end_date, rows)]
+        if rows.shape[0] == 0:
+            continue
+        capacity = catalog.capacity[rows]
+
+        for chunk_start in range(0, len(members), BATCH_SIZE):
+            chunk = members[chunk_start:chunk_start + BATCH_SIZE]
+            scores = score_requests(catalog, rows, [parsed[i] for i in chunk])
+            for column, i in enumerate(chunk):
+                fits = np.flatnonzero(capacity >= parsed[i]["group_size"])
+                best = fits[select_top(scores[fits, column], catalog.ids[rows[fits]], top_n)]
+                results[i] = [catalog.property_at(row) for row in rows[best]]
+
+    return results
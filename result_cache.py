@@ -0,0 +1,87 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Hashable
+
+from locations import normalize_location
+
+# searches kept by the recommendation result cache (RECOMMENDER_CACHE_ENTRIES=0 turns it off)
+RESULT_ENTRIES = int(os.environ.get("RECOMMENDER_CACHE_ENTRIES", "256"))
+
+
+def _terms(values) -> tuple:
+    # order does not change a score, and an empty list scores like no list at all
+    return tuple(sorted(values)) if values else ()
+
+
+def request_key(request: dict) -> tuple:
+    """
+    Canonical form of a parsed request (recommender.parse_request): requests that differ only in
+    location case or spacing, the order of locations, features or tags, or in weights that
+    normalize to the same ratios share a key.
+    """
+    return (
+        tuple(sorted({normalize_location(loc) for loc in request["location"]})),
+        request["group_size"],
+        request["start_date"].isoformat(),
+        request["end_date"].isoformat(),
+        float(request["budget"]),
+        request["weights"],
+        _terms(request["features"]),
+        request["environment"],
+        _terms(request["tags"]),
+    )
+
+
+class ResultCache:
+    """
+    Bounded LRU of search results, keyed on the canonical request and the catalog version the
+    results were computed against. A changed catalog has a new version, so entries of the old
+    one are never returned again and age out. Counts hits, misses and evictions.
+    """
+
+    def __init__(self, entries: int = RESULT_ENTRIES):
+        self.entries = entries
+        self.results = OrderedDict()  # (request key, catalog version) -> result
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, request: tuple, version: Hashable):
+        """Cached result of a request key against a catalog version, or None."""
+        with self._lock:
+            result = self.results.get((request, version))
+            if result is None:
+                self.misses += 1
+                return None
+            self.results.move_to_end((request, version))
+            self.hits += 1
+            return result
+
+    def put(self, request: tuple, version: Hashable, result):
+        if self.entries <= 0:
+            return
+        with self._lock:
+            self.results[(request, version)] = result
+            self.results.move_to_end((request, version))
+            while len(self.results) > self.entries:
+                self.results.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self.results.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self.results),
+            "max_entries": self.entries,
+        }
@@ -0,0 +1,610 @@
+import argparse
+import asyncio
+import inspect
+import io
+import json
+import os
+import queue
+import secrets
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date
+from http import HTTPStatus
+from typing import Optional
+
+import llm
+import prompts
+from properties import booked_message, freed_message
+from recommender import RESULT_CACHE, recommendation_logic
+from users import User, UserManager
+
+# where the service listens by default; clients find it through ARIK_SERVICE (see client.py)
+HOST = "127.0.0.1"
+PORT = int(os.environ.get("ARIK_PORT", "8642"))
+
+MAX_BODY = 1 << 20  # largest request body accepted, in bytes
+DIALOGUE_TIMEOUT = 900  # seconds a search dialogue waits for the next answer, or a request for its next step, before it is dropped
+
+
+class HTTPError(Exception):
+    """Answered to the client as {"error": message, ...} with the given status."""
+
+    def __init__(self, status: int, message: str, **extra):
+        super().__init__(message)
+        self.status = status
+        self.payload = {"error": message, **extra}
+
+
+class _ThreadOutput(io.TextIOBase):
+    """
+    Stands in for sys.stdout: what a thread prints while it is capturing goes to its own buffer
+    (and from there to the client it works for), everything else to the real stdout.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        buffer = getattr(self.local, "buffer", None)
+        return (buffer if buffer is not None else self.stream).write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    @contextmanager
+    def capture(self):
+        self.local.buffer = io.StringIO()
+        try:
+            yield
+        finally:
+            self.local.buffer = None
+
+    def take(self) -> str:
+        """What this thread printed since the last take()."""
+        buffer = self.local.buffer
+        text = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return text
+
+
+OUTPUT = _ThreadOutput(sys.stdout)
+
+
+class _Abandoned(BaseException):
+    """The client stopped answering a search dialogue (BaseException, llm_parse has bare excepts)."""
+
+
+class _Dialogue:
+    """
+    One search conversation. llm_parse runs in its own thread and asks its questions through ask(),
+    which hands each one to the waiting request and blocks until the next request brings the answer.
+    Steps go to the event loop through an asyncio queue, so waiting requests hold no thread.
+    """
+
+    def __init__(self, token: str):
+        self.id = secrets.token_hex(8)
+        self.token = token
+        self.loop = asyncio.get_running_loop()
+        self.steps = asyncio.Queue()  # ("ask", prompt, output) or ("done", (status, payload), output)
+        self.answers = queue.Queue()
+        self.closed = False
+
+    # from the dialogue's thread
+    def step(self, kind: str, value, output: str):
+        try:
+            self.loop.call_soon_threadsafe(self.steps.put_nowait, (kind, value, output))
+        except RuntimeError:
+            pass  # the service has stopped
+
+    def ask(self, prompt=""):
+        if self.closed:
+            raise _Abandoned()
+        self.step("ask", prompt, OUTPUT.take())
+        try:
+            answer = self.answers.get(timeout=DIALOGUE_TIMEOUT)
+        except queue.Empty:
+            answer = None
+        if answer is None:
+            self.closed = True
+            raise _Abandoned()
+        return answer
+
+    def close(self):
+        self.closed = True
+        self.answers.put(None)
+
+
+class _Request:
+    def __init__(self, method: str, path: str, headers: dict, body: bytes):
+        self.method = method
+        self.path = path
+        self.headers = headers
+        try:
+            self.json = json.loads(body) if body else {}
+        except ValueError:
+            raise HTTPError(400, "Request body is not valid JSON.")
+        if not isinstance(self.json, dict):
+            raise HTTPError(400, "Request body must be a JSON object.")
+        scheme, _, token = headers.get("authorization", "").partition(" ")
+        self.token = token.strip() if scheme.lower() == "bearer" else None
+
+
+class Service:
+    """
+    Long-running ARIK backend over HTTP/JSON. One UserManager and its PropertiesController stay
+    loaded between requests, so the catalog, its columnar view and indexes, the LLM vocabulary and
+    the result cache (and worker shards, with RECOMMENDER_WORKERS) are warm for every search.
+
+    Everything that touches users or the catalog runs on one worker thread, in arrival order,
+    while the event loop keeps serving connections. Search dialogues (llm_parse, which waits on
+    the LLM and on the user) get a thread each and hand their search to that worker. The worker
+    holds `lock` while it runs, and the dialogues read the vocabulary (and so the catalog) under it.
+    """
+
+    def __init__(self, manager: Optional[UserManager] = None):
+        self.manager = manager if manager is not None else UserManager()
+        self.controller = self.manager.properties
+        self.worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="arik-worker")
+        self.lock = threading.RLock()  # held by the worker, and by dialogue threads reading the catalog
+        self.sessions = {}  # token -> logged in User
+        self.searches = {}  # token -> (property ids offered, start date, end date) of the last search
+        self.dialogues = {}  # id -> _Dialogue still running
+        self.started = time.time()
+        self.routes = {
+            ("GET", "/health"): self.health,
+            ("POST", "/login"): self.login,
+            ("POST", "/logout"): self.logout,
+            ("POST", "/reset"): self.reset_password,
+            ("POST", "/check"): self.check,
+            ("POST", "/users"): self.create_user,
+            ("GET", "/account"): self.account,
+            ("POST", "/account"): self.update_account,
+            ("DELETE", "/account"): self.delete_account,
+            ("POST", "/search"): self.search,
+            ("POST", "/answer"): self.answer,
+            ("POST", "/reserve"): self.reserve,
+            ("POST", "/cancel"): self.cancel,
+        }
+
+    def warm(self):
+        """Load the catalog and build what searches use, so the first request does not pay for it."""
+        with self.lock:
+            llm.VOCAB.use(self.controller, self.lock)
+            if not self.controller.store.pushdown:
+                self.controller.catalog()
+            llm.VOCAB.get()
+
+    # ---------- HTTP ----------
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # HTTP/1.1 with keep-alive: requests on one connection are answered in order
+        try:
+            while True:
+                line = await reader.readline()
+                if not line.strip():
+                    break
+                try:
+                    method, target, version = line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "Malformed request line."}, close=True)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._respond(writer, 400, {"error": "Invalid Content-Length."}, close=True)
+                    break
+                if length > MAX_BODY:
+                    await self._respond(writer, 413, {"error": "Request body too large."}, close=True)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                close = headers.get("connection", "").lower() == "close" or version == "HTTP/1.0"
+                status, payload = await self.dispatch(method, target.split("?", 1)[0], headers, body)
+                await self._respond(writer, status, payload, close)
+                if close:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status: int, payload: dict, close: bool = False):
+        data = json.dumps(payload).encode("utf-8")
+        head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + data)
+        await writer.drain()
+
+    async def dispatch(self, method: str, path: str, headers: dict, body: bytes):
+        handler = self.routes.get((method, path))
+        if handler is None:
+            if any(route_path == path for _, route_path in self.routes):
+                return 405, {"error": f"{method} is not supported on {path}."}
+            return 404, {"error": f"No endpoint {path}."}
+        try:
+            request = _Request(method, path, headers, body)
+            if inspect.iscoroutinefunction(handler):
+                return 200, await handler(request)
+            return 200, await self.run(handler, request)
+        except HTTPError as e:
+            return e.status, e.payload
+        except Exception:
+            traceback.print_exc()
+            return 500, {"error": "Internal error, see the service log."}
+
+    # run on the worker thread; what the call prints is returned to the client as "output"
+    async def run(self, function, *args) -> dict:
+        loop = asyncio.get_running_loop()
+        payload, output = await loop.run_in_executor(self.worker, self._captured, function, args)
+        if output:
+            payload = {"output": output, **payload}
+        return payload
+
+    def _captured(self, function, args):
+        with self.lock, OUTPUT.capture():
+            try:
+                payload = function(*args)
+            except HTTPError as e:
+                output = OUTPUT.take()
+                if output:
+                    e.payload = {"output": output, **e.payload}
+                raise
+            return payload, OUTPUT.take()
+
+    def _user(self, request: _Request) -> User:
+        user = self.sessions.get(request.token)
+        if user is None:
+            raise HTTPError(401, "Not logged in.")
+        return user
+
+    # ---------- Status ----------
+    def health(self, request):
+        store = self.controller.store
+        return {
+            "status": "ok",
+            "uptime_s": round(time.time() - self.started, 3),
+            "properties": store.count() if store.pushdown else self.controller.catalog().size,
+            "catalog_version": repr(self.controller.catalog_version()),
+            "result_cache": RESULT_CACHE.stats(),
+            "sessions": len(self.sessions),
+            "dialogues": len(self.dialogues),
+        }
+
+    # ---------- Accounts ----------
+    @staticmethod
+    def _details(user: User) -> dict:
+        return {
+            "name": user.name,
+            "username": user.username,
+            "email": user.email,
+            "reservations": user.reservations,
+            "preferences": user.preferences,
+        }
+
+    @staticmethod
+    def _preferences(values) -> dict:
+        if not isinstance(values, dict):
+            raise HTTPError(400, "Preferences must be an object of " + ", ".join(prompts.PREFERENCE_KEYS) + ".")
+        weights = {}
+        for key in prompts.PREFERENCE_KEYS:
+            try:
+                weights[key] = float(values.get(key, 0))
+            except (TypeError, ValueError):
+                raise HTTPError(400, f"Invalid input for {key}. Please enter a number between 0 and 10.")
+            if not 0 <= weights[key] <= 10:
+                raise HTTPError(400, f"Please enter a number between 0 and 10 for {key}.")
+        return prompts.equal_if_all_zero(weights)
+
+    @staticmethod
+    def _field(request: _Request, name: str) -> str:
+        value = request.json.get(name)
+        if not isinstance(value, str):
+            raise HTTPError(400, f"Missing field '{name}'.")
+        return value
+
+    def login(self, request):
+        user = self.manager.find_user(self._field(request, "username").strip())
+        if user is None:
+            raise HTTPError(404, "Username not found.")
+        if user.attempts >= 5:  # if incorrect pwd input more than 5, preventing further trying
+            raise HTTPError(403, "Exceeded password attempts.", locked=True)
+        if not user.check_password(self._field(request, "password")):
+            user.attempts += 1
+            raise HTTPError(401, f"Incorrect password. Attempts: {user.attempts}",
+                            locked=user.attempts >= 5)
+        user.attempts = 0
+        self.manager.save_user(user)
+        token = secrets.token_hex(16)
+        self.sessions[token] = user
+        return {"token": token, "message": f"Login successful! Welcome, {user.name}.", "account": self._details(user)}
+
+    def logout(self, request):
+        self._end_session(request.token)
+        return {"message": "Logging out..."}
+
+    def _end_session(self, token):
+        self.sessions.pop(token, None)
+        self.searches.pop(token, None)
+        for dialogue in list(self.dialogues.values()):
+            if dialogue.token == token:
+                dialogue.close()
+
+    def reset_password(self, request):
+        user = self.manager.find_user(self._field(request, "username").strip())
+        if user is None:
+            raise HTTPError(404, "Username not found.")
+        # only locked accounts can be reset by email, as at the login prompt
+        if user.attempts < 5:
+            raise HTTPError(403, "Password reset is only possible after too many failed attempts.")
+        if self._field(request, "email").strip() != user.email:
+            raise HTTPError(403, "Incorrect email.")
+        if "password" not in request.json:
+            return {}  # the email is right, the client can ask for the new password
+        password = self._field(request, "password")
+        if not User.is_strong_password(password):
+            raise HTTPError(400, "Password does not meet requirements.")
+        user.password = User.hash_password(password)
+        user.attempts = 0
+        self.manager.save_user(user)
+        return {"message": "Password reset successful. Log in again."}
+
+    # whether a username or email can be used (by the logged in user, if any), so clients can ask again;
+    # whether an email is taken is only told to logged in users, account creation finds out when it is sent.
+    # A logged in user's password can be checked too, before a confirmation is asked (account deletion)
+    def check(self, request):
+        user = self.sessions.get(request.token)
+        result = {}
+        if "password" in request.json and user is not None:
+            result["password_correct"] = user.check_password(self._field(request, "password"))
+        if "username" in request.json:
+            result["username_taken"] = self.manager.username_taken(self._field(request, "username").strip(), exclude=user)
+        if "email" in request.json:
+            email = self._field(request, "email")
+            result["email_valid"] = User.is_valid_email(email)
+            if user is not None:
+                result["email_taken"] = self.manager.email_taken(email, exclude=user)
+        return result
+
+    def _check_username(self, username: str, user: Optional[User] = None):
+        if not username:
+            raise HTTPError(400, "Username cannot be empty.")
+        if self.manager.username_taken(username, exclude=user):
+            raise HTTPError(409, "Username already in use by another user.", field="username")
+
+    def _check_email(self, email: str, user: Optional[User] = None):
+        if not User.is_valid_email(email):
+            raise HTTPError(400, "Invalid email format.")
+        if self.manager.email_taken(email, exclude=user):
+            raise HTTPError(409, "Email already in use by another user.", field="email")
+
+    def create_user(self, request):
+        username = self._field(request, "username").strip()
+        email = self._field(request, "email")
+        password = self._field(request, "password")
+        self._check_username(username)
+        self._check_email(email)
+        if not User.is_strong_password(password):
+            raise HTTPError(400, "Password does not meet requirements.")
+        preferences = self._preferences(request.json.get("preferences"))
+        user = User(username=username, password=User.hash_password(password), name=self._field(request, "name"),
+                    email=email, preferences=preferences)
+        self.manager.add_user(user)
+        self.manager.save_user(user)
+        return {"message": f"Account successfully created for '{username}'"}
+
+    def account(self, request):
+        return self._details(self._user(request))
+
+    # change any of username, email, password and preferences; all are checked before any is applied
+    def update_account(self, request):
+        user = self._user(request)
+        changes = request.json
+        username = changes.get("username")
+        if username is not None:
+            username = str(username).strip()
+            self._check_username(username, user)
+        if changes.get("email") is not None:
+            self._check_email(str(changes["email"]), user)
+        if changes.get("password") is not None and not User.is_strong_password(str(changes["password"])):
+            raise HTTPError(400, "Password does not meet requirements.")
+        preferences = self._preferences(changes["preferences"]) if changes.get("preferences") is not None else None
+
+        messages = []
+        old_username = user.username
+        if username is not None:
+            self.manager.rename_user(user, username)
+            messages.append("Username successfully updated.")
+        if changes.get("email") is not None:
+            self.manager.change_email(user, str(changes["email"]))
+            messages.append("Email successfully updated.")
+        if changes.get("password") is not None:
+            user.password = User.hash_password(str(changes["password"]))
+            messages.append("Password successfully set.")
+        if preferences is not None:
+            user.preferences = preferences
+            messages.append("Preferences set.")
+        if messages:
+            self.manager.save_user(user, old_username)
+        return {"message": "\n".join(messages), "account": self._details(user)}
+
+    def delete_account(self, request):
+        user = self._user(request)
+        if not user.check_password(self._field(request, "password")):
+            raise HTTPError(401, "Incorrect password. Account deletion aborted.")
+        # free the dates of every reservation first
+        for reservation in user.reservations:
+            freed = self.controller.cancel(reservation["id"], date.fromisoformat(reservation["start"]),
+                                           date.fromisoformat(reservation["end"]))
+            if freed is not None:
+                print(freed_message(freed))
+        user.reservations = []
+        self.manager.remove_user(user)
+        self.manager.save_removal(user)
+        for token, session_user in list(self.sessions.items()):
+            if session_user is user:
+                self._end_session(token)
+        return {"message": f"Account '{user.username}' has been deleted."}
+
+    # ---------- Reservations ----------
+    async def search(self, request):
+        """
+        A structured request ({"request": {...}}, fields as llm_parse returns them) is searched at once.
+        Otherwise a search dialogue starts: the answer is its first question ({"dialogue", "ask"}),
+        each /answer brings the next one, and the last carries the results.
+        """
+        user = self._user(request)
+        if "request" in request.json:
+            return await self.run(self._search, request.token, user, request.json["request"])
+        for dialogue in list(self.dialogues.values()):
+            if dialogue.token == request.token:
+                dialogue.close()  # one search at a time per session
+        dialogue = _Dialogue(request.token)
+        self.dialogues[dialogue.id] = dialogue
+        threading.Thread(target=self._converse, args=(dialogue, user), daemon=True).start()
+        return await self._next_step(dialogue)
+
+    async def answer(self, request):
+        self._user(request)
+        dialogue = self.dialogues.get(request.json.get("dialogue"))
+        if dialogue is None or dialogue.token != request.token:
+            raise HTTPError(404, "No such search in progress.")
+        dialogue.answers.put(str(request.json.get("answer", "")))
+        return await self._next_step(dialogue)
+
+    async def _next_step(self, dialogue: _Dialogue) -> dict:
+        try:
+            kind, value, output = await asyncio.wait_for(dialogue.steps.get(), DIALOGUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            dialogue.close()
+            self.dialogues.pop(dialogue.id, None)
+            raise HTTPError(504, "Bot: Sorry, the search took too long.")
+        extra = {"output": output} if output else {}
+        if kind == "ask":
+            return {**extra, "dialogue": dialogue.id, "ask": value}
+        status, payload = value
+        if status != 200:
+            raise HTTPError(status, payload["error"], **extra)
+        return {**extra, **payload}
+
+    # the dialogue's thread: llm_parse with the client answering its questions, then the search on the worker
+    def _converse(self, dialogue: _Dialogue, user: User):
+        with OUTPUT.capture():
+            try:
+                llm_output = llm.llm_parse(ask=dialogue.ask)
+                if "error" in llm_output:
+                    raise HTTPError(502, f"Bot: Sorry, the search could not be understood ({llm_output['error']}).")
+                payload, output = self.worker.submit(self._captured, self._search, (dialogue.token, user, llm_output)).result()
+                print(output, end="")
+                step = (200, payload)
+            except _Abandoned:
+                return
+            except HTTPError as e:
+                step = (e.status, e.payload)
+            except Exception:
+                traceback.print_exc(file=OUTPUT.stream)
+                step = (500, {"error": "Bot: Sorry, that search failed."})
+            finally:
+                self.dialogues.pop(dialogue.id, None)
+            dialogue.step("done", step, OUTPUT.take())
+
+    # merge with the user's preferences and search; the results are remembered for /reserve
+    def _search(self, token: str, user: User, user_req):
+        if not isinstance(user_req, dict):
+            raise HTTPError(400, "The search request must be an object.")
+        combined_input = {**user_req, **user.preferences}
+        print("Bot: Combined input for recommendations:", combined_input)
+        try:
+            recommendations = recommendation_logic(self.controller, combined_input)
+        except (KeyError, TypeError, ValueError) as e:
+            raise HTTPError(400, f"Invalid search request: {e!r}")
+        self.searches[token] = ({p.id for p in recommendations}, user_req["start_date"], user_req["end_date"])
+        return {
+            "results": [{"id": p.id, "location": p.location, "type": p.type, "price": p.price, "capacity": p.capacity,
+                         "environment": p.environment, "features": p.features, "tags": p.tags}
+                        for p in recommendations],
+            "start_date": user_req["start_date"],
+            "end_date": user_req["end_date"],
+        }
+
+    # book a property of the session's last search for its dates
+    def reserve(self, request):
+        user = self._user(request)
+        offered = self.searches.get(request.token)
+        try:
+            property_id = int(request.json.get("property_id"))
+        except (TypeError, ValueError):
+            raise HTTPError(400, "Bot: Invalid ID. Reservation cancelled.")
+        if offered is None or property_id not in offered[0]:
+            raise HTTPError(404, "Bot: No property found with that ID. Reservation cancelled.")
+        _, start_date, end_date = offered
+
+        # this checks again that the dates are free, since another user may have just taken them
+        prop = self.controller.book(property_id, date.fromisoformat(start_date), date.fromisoformat(end_date))
+        if not prop:
+            raise HTTPError(409, "Bot: Sorry, that property is no longer available for these dates. Reservation cancelled.")
+        print(booked_message(date.fromisoformat(start_date), date.fromisoformat(end_date)))
+        reservation = {"id": prop.id, "start": start_date, "end": end_date}
+        user.reservations.append(reservation)
+        self.manager.save_user(user)
+        return {"reservation": reservation,
+                "message": f"Bot: Property {prop.id} successfully reserved from {start_date} to {end_date}."}
+
+    def cancel(self, request):
+        user = self._user(request)
+        try:
+            property_id = int(request.json.get("property_id"))
+        except (TypeError, ValueError):
+            raise HTTPError(400, "Invalid ID (must be an integer).")
+        to_remove = next((r for r in user.reservations if r.get("id") == property_id), None)
+        if not to_remove:
+            raise HTTPError(404, "No reservation with that ID.")
+        user.reservations.remove(to_remove)
+        # free the property's booked dates (only the change is written)
+        freed = self.controller.cancel(property_id, date.fromisoformat(to_remove["start"]),
+                                       date.fromisoformat(to_remove["end"]))
+        if freed is not None:
+            print(freed_message(freed))
+        self.manager.save_user(user)
+        return {"message": "Reservation cancelled and property dates freed."}
+
+
+async def serve(host: str = HOST, port: int = PORT, service: Optional[Service] = None):
+    """Warm up a Service (a new one by default) and answer requests until cancelled."""
+    sys.stdout = OUTPUT  # so what each request prints goes back to its client
+    service = service if service is not None else Service()
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    await loop.run_in_executor(service.worker, service.warm)
+    server = await asyncio.start_server(service.handle, host, port)
+    print(f"ARIK service listening on http://{host}:{port} (warmed up in {time.perf_counter() - start:.2f}s)", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run ARIK as a local HTTP/JSON service with a warm catalog")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
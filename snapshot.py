@@ -0,0 +1,346 @@
+import json
+import mmap
+import os
+import tempfile
+import threading
+import numpy as np
+from array import array
+from collections.abc import MutableMapping, MutableSequence
+from typing import Callable, Iterator, List, Optional
+
+SNAPSHOT_MAGIC = b"ARIKSNP1"
+SNAPSHOT_VERSION = 2  # 2: prices keep their int or float type
+ALIGNMENT = 64  # every column starts on a 64-byte boundary so it can be viewed in place
+
+# string columns stored as codes into a table of distinct values
+STRING_COLUMNS = ["location", "type", "environment"]
+LIST_COLUMNS = ["features", "tags"]
+
+
+def snapshot_path(json_file: str) -> str:
+    """Snapshot file written next to a JSON catalog (properties.json -> properties.snapshot)."""
+    return os.path.splitext(json_file)[0] + ".snapshot"
+
+
+def is_fresh(json_file: str, snapshot_file: str) -> bool:
+    """True if the snapshot exists and is not older than the JSON file."""
+    try:
+        return os.stat(snapshot_file).st_mtime_ns >= os.stat(json_file).st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+# intern strings: codes into a table of distinct values, in first-seen order
+def _intern(values):
+    table = {}
+    codes = np.fromiter((table.setdefault(v, len(table)) for v in values), dtype=np.int32, count=len(values))
+    return codes, list(table)
+
+
+# CSR layout of a list-of-lists column: offsets per row and the flattened values
+def _offsets(lists) -> np.ndarray:
+    return np.concatenate([[0], np.cumsum([len(values) for values in lists])]).astype(np.int64)
+
+
+# prices as stored: int64 if they are all ints, else float64 with, if some are ints, a mask of those
+def _price_columns(prices) -> dict:
+    is_int = np.fromiter((isinstance(p, int) for p in prices), dtype=bool, count=len(prices))
+    if is_int.all():
+        return {"price": np.array(prices, dtype=np.int64)}
+    columns = {"price": np.array(prices, dtype=np.float64)}
+    if is_int.any():
+        columns["price_int"] = is_int.astype(np.uint8)
+    return columns
+
+
+def write_snapshot(properties, path: str, availability=None):
+    """
+    Write properties as a binary columnar snapshot: numeric columns, interned string codes,
+    booked days (ordinals and, if given, the availability bitmap). Written atomically.
+    """
+    arrays = {
+        "id": np.array([p.id for p in properties], dtype=np.int64),
+        **_price_columns([p.price for p in properties]),
+        "capacity": np.array([p.capacity for p in properties], dtype=np.int64),
+    }
+    tables = {}
+    for column in STRING_COLUMNS:
+        arrays[column], tables[column] = _intern([getattr(p, column) for p in properties])
+    for column in LIST_COLUMNS:
+        lists = [getattr(p, column) for p in properties]
+        arrays[column + "_offsets"] = _offsets(lists)
+        arrays[column], tables[column] = _intern([v for values in lists for v in values])
+
+    booked = [p.booked_ordinals for p in properties]
+    arrays["booked_offsets"] = _offsets(booked)
+    joined = array("i")
+    for days in booked:
+        joined.extend(days)
+    arrays["booked"] = np.array(joined, dtype=np.int32)
+
+    header = {"version": SNAPSHOT_VERSION, "count": len(properties), "tables": tables, "columns": {}}
+    if availability is not None:
+        # bitmap rows reordered to follow the properties
+        header["booked_base"] = availability.base
+        arrays["booked_bits"] = availability.bits[availability.rows_for(arrays["id"].tolist())]
+
+    # lay out the columns after the header, each aligned
+    offset = 0
+    for name, column in arrays.items():
+        offset += -offset % ALIGNMENT
+        header["columns"][name] = {"dtype": column.dtype.str, "shape": list(column.shape), "offset": offset}
+        offset += column.nbytes
+    header_bytes = json.dumps(header).encode("utf-8")
+    data_start = len(SNAPSHOT_MAGIC) + 8 + len(header_bytes)
+    data_start += -data_start % ALIGNMENT
+
+    # a private temp file, so concurrent writers never write into each other's copy;
+    # on disk before it replaces the old snapshot, so a crash cannot leave an empty one behind
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(len(header_bytes).to_bytes(8, "little"))
+            f.write(header_bytes)
+            for name, column in arrays.items():
+                f.seek(data_start + header["columns"][name]["offset"])
+                f.write(np.ascontiguousarray(column).tobytes())
+            f.truncate(data_start + offset)  # the whole layout, also when the last columns are empty
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class Snapshot:
+    """
+    Read-only, memory-mapped view of a snapshot file.
+    Columns are NumPy arrays backed directly by the mapped file, nothing is parsed up front.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a property snapshot.")
+        header_len = int.from_bytes(self._mmap[len(SNAPSHOT_MAGIC):len(SNAPSHOT_MAGIC) + 8], "little")
+        header_start = len(SNAPSHOT_MAGIC) + 8
+        header = json.loads(self._mmap[header_start:header_start + header_len].decode("utf-8"))
+        if header.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"{path} has unsupported snapshot version {header.get('version')}.")
+
+        data_start = header_start + header_len
+        data_start += -data_start % ALIGNMENT
+        self.count = header["count"]
+        self.tables = header["tables"]
+        self.booked_base = header.get("booked_base")
+        self.columns = {}
+        for name, spec in header["columns"].items():
+            dtype = np.dtype(spec["dtype"])
+            count = int(np.prod(spec["shape"]))
+            self.columns[name] = np.frombuffer(
+                self._mmap, dtype=dtype, count=count, offset=data_start + spec["offset"]
+            ).reshape(spec["shape"])
+
+    def __len__(self):
+        return self.count
+
+    def strings(self, column: str) -> List[str]:
+        """Decode an interned string column."""
+        table = self.tables[column]
+        return [table[code] for code in self.columns[column].tolist()]
+
+    def lists(self, column: str) -> List[list]:
+        """Decode an interned list column (features, tags)."""
+        table = self.tables[column]
+        values = [table[code] for code in self.columns[column].tolist()]
+        offsets = self.columns[column + "_offsets"].tolist()
+        return [values[offsets[i]:offsets[i + 1]] for i in range(self.count)]
+
+    def booked(self) -> List[array]:
+        """Booked days of every property as arrays of day ordinals (what Property keeps)."""
+        ordinals = array("i")
+        ordinals.frombytes(self.columns["booked"].astype(np.int32).tobytes())
+        offsets = self.columns["booked_offsets"].tolist()
+        return [ordinals[offsets[i]:offsets[i + 1]] for i in range(self.count)]
+
+    def prices(self) -> list:
+        """Prices with the type they were written with (int or float)."""
+        prices = self.columns["price"].tolist()
+        if "price_int" in self.columns:
+            prices = [int(p) if is_int else p for p, is_int in zip(prices, self.columns["price_int"].tolist())]
+        return prices
+
+    def _row_list(self, column: str, row: int) -> list:
+        table = self.tables[column]
+        offsets = self.columns[column + "_offsets"]
+        return [table[code] for code in self.columns[column][offsets[row]:offsets[row + 1]].tolist()]
+
+    def record(self, row: int) -> dict:
+        """Property constructor arguments of one row, decoded alone."""
+        columns = self.columns
+        price = columns["price"][row].item()
+        if "price_int" in columns and columns["price_int"][row]:
+            price = int(price)
+        offsets = columns["booked_offsets"]
+        booked = array("i")
+        booked.frombytes(columns["booked"][offsets[row]:offsets[row + 1]].astype(np.int32).tobytes())
+        return {
+            "id": columns["id"][row].item(), "location": self.tables["location"][columns["location"][row]],
+            "type": self.tables["type"][columns["type"][row]], "price": price,
+            "capacity": columns["capacity"][row].item(),
+            "environment": self.tables["environment"][columns["environment"][row]],
+            "features": self._row_list("features", row), "tags": self._row_list("tags", row), "booked": booked,
+        }
+
+    def records(self) -> Iterator[dict]:
+        """One dict of Property constructor arguments per property."""
+        columns = zip(
+            self.columns["id"].tolist(), self.strings("location"), self.strings("type"),
+            self.prices(), self.columns["capacity"].tolist(), self.strings("environment"),
+            self.lists("features"), self.lists("tags"), self.booked(),
+        )
+        for id, location, type, price, capacity, environment, features, tags, booked in columns:
+            yield {
+                "id": id, "location": location, "type": type, "price": price, "capacity": capacity,
+                "environment": environment, "features": features, "tags": tags, "booked": booked,
+            }
+
+
+def open_snapshot(path: str) -> Optional[Snapshot]:
+    """Open a snapshot, or None if it is missing or unreadable."""
+    try:
+        return Snapshot(path)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+class SnapshotProperties(MutableSequence):
+    """
+    The properties of a snapshot, in its row order. Each Property is only created (and attached
+    to `availability`) when it is first looked up, so loading a large catalog decodes none of them.
+    Iterating creates them all; adding or removing one does too, after which the rows no longer
+    follow the snapshot (see source_snapshot).
+    """
+
+    def __init__(self, snapshot: Snapshot, make: Callable[..., object], availability=None):
+        self.snapshot = snapshot
+        self.availability = availability
+        self._make = make  # the Property class (this module does not import it)
+        self._items = [None] * len(snapshot)
+        self._complete = len(snapshot) == 0  # every row has its Property
+        self.pristine = True  # nothing added or removed since the snapshot was read
+        self._as_read = None  # the rows' properties, kept once that is no longer true
+        self._lock = threading.Lock()
+
+    def _create(self, record: dict):
+        prop = self._make(**record)
+        if self.availability is not None:
+            self.availability.attach((prop,))
+        return prop
+
+    def _create_all(self):
+        if self._complete:
+            return
+        with self._lock:
+            for row, record in enumerate(self.snapshot.records()):
+                if self._items[row] is None:
+                    self._items[row] = self._create(record)
+            self._complete = True
+
+    # before the first property is added or removed, keep which Property each snapshot row became
+    def _change(self):
+        self._create_all()
+        if self.pristine:
+            self._as_read = list(self._items)
+            self.pristine = False
+
+    def snapshot_row(self, row: int):
+        """The Property of a snapshot row, wherever it has moved to since."""
+        return self[row] if self.pristine else self._as_read[row]
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        prop = self._items[index]
+        if prop is None:
+            with self._lock:
+                prop = self._items[index]
+                if prop is None:
+                    prop = self._items[index] = self._create(self.snapshot.record(index % len(self)))
+        return prop
+
+    def __iter__(self):
+        self._create_all()
+        return iter(self._items)
+
+    def __setitem__(self, index, prop):
+        self._change()
+        self._items[index] = prop
+
+    def __delitem__(self, index):
+        self._change()
+        del self._items[index]
+
+    def insert(self, index, prop):
+        self._change()
+        self._items.insert(index, prop)
+
+    def by_id(self) -> "SnapshotById":
+        return SnapshotById(self)
+
+
+class SnapshotById(MutableMapping):
+    """Property id -> Property of SnapshotProperties, creating only the properties looked up."""
+
+    def __init__(self, properties: SnapshotProperties):
+        self.properties = properties
+        self._rows = {pid: row for row, pid in enumerate(properties.snapshot.columns["id"].tolist())}
+        self._found = {}  # looked up or set since; never also in _rows
+
+    def __getitem__(self, property_id):
+        prop = self._found.get(property_id)
+        if prop is None:
+            row = self._rows.pop(property_id)
+            prop = self._found[property_id] = self.properties.snapshot_row(row)
+        return prop
+
+    def __contains__(self, property_id):
+        return property_id in self._found or property_id in self._rows
+
+    def __setitem__(self, property_id, prop):
+        self._rows.pop(property_id, None)
+        self._found[property_id] = prop
+
+    def __delitem__(self, property_id):
+        if self._found.pop(property_id, None) is None:
+            del self._rows[property_id]
+
+    def __iter__(self):
+        yield from self._found
+        yield from self._rows
+
+    def __len__(self):
+        return len(self._found) + len(self._rows)
+
+
+def index_by_id(properties) -> dict:
+    """Property id -> Property; a snapshot's properties are only created as they are looked up."""
+    if isinstance(properties, SnapshotProperties):
+        return properties.by_id()
+    return {prop.id: prop for prop in properties}
+
+
+def source_snapshot(properties) -> Optional[Snapshot]:
+    """The snapshot the properties were read from, if they are still exactly its rows (else None)."""
+    if isinstance(properties, SnapshotProperties) and properties.pristine:
+        return properties.snapshot
+    return None
@@ -0,0 +1,724 @@
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager, nullcontext
+from datetime import date, timedelta
+from typing import Iterator, List, Optional, Tuple
+
+from availability import AvailabilityIndex
+from journal import BookingJournal, journal_path
+from locations import LocationIndex
+from locks import LockStripes, file_lock
+from snapshot import SnapshotProperties, index_by_id, is_fresh, open_snapshot, snapshot_path, write_snapshot
+
+# journal entries after which the journal is folded back into properties.json and the snapshot
+COMPACT_EVERY = 1000
+
+# ARIK_STORAGE selects the backend: "json" (default), "sqlite" (DEFAULT_DB) or "sqlite:<path>"
+STORAGE_ENV = "ARIK_STORAGE"
+DEFAULT_DB = "arik.sqlite3"
+
+
+def _days(start_date: date, end_date: date) -> List[str]:
+    return [(start_date + timedelta(days=i)).isoformat() for i in range((end_date - start_date).days)]
+
+
+@contextmanager
+def atomic_writer(path: str):
+    """
+    Text file to write that replaces `path` in one step (temp file + rename) when the block
+    ends without an error: readers see the old or the new contents, never a mix.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# identity, size and modification time of a file, or None if it is missing
+def _file_version(path: str) -> Optional[tuple]:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+def write_atomic(path: str, text: str):
+    """Replace a file's contents in one step."""
+    with atomic_writer(path) as f:
+        f.write(text)
+
+
+class PropertyStore:
+    """
+    Where PropertiesController keeps the catalog. `pushdown` stores can also filter
+    search candidates themselves (see candidates) and fetch single properties without
+    loading the catalog.
+    """
+
+    pushdown = False
+
+    def load(self) -> Tuple[list, AvailabilityIndex]:
+        """All properties, with an availability index attached to them."""
+        raise NotImplementedError
+
+    def save(self, properties: list, availability: AvailabilityIndex) -> bool:
+        """Write the whole catalog. False if it was not written."""
+        raise NotImplementedError
+
+    def lock(self, property_id: int):
+        """Context manager held around check-and-book of one property, against other writers of it."""
+        return nullcontext()
+
+    def refresh(self, by_id: dict, property_id: Optional[int]) -> bool:
+        """
+        Bring loaded properties (at least `property_id`, all of them for None) up to date with changes
+        other processes recorded. False if that is not possible and the catalog has to be reloaded.
+        """
+        return True
+
+    def data_version(self):
+        """
+        A token that changes whenever a change to the stored catalog is recorded, by this process or
+        another. Tokens are only compared for equality. Stores nothing else writes to return None.
+        """
+        return None
+
+    def after_own_write(self, token):
+        """
+        The data version just after one change recorded through this store, given `token` was current
+        just before it (the writer has applied the change already, so it is still in sync); `token`
+        itself if that cannot be told, and the next refresh catches up.
+        """
+        return token
+
+    def record_booking(self, property_id: int, start_date: date, end_date: date) -> bool:
+        """Persist [start_date, end_date) as booked. False if some of those days turned out to be taken."""
+        raise NotImplementedError
+
+    def record_cancellation(self, property_id: int, start_date: date, end_date: date):
+        """Persist [start_date, end_date] (end included, like Property.delete_dates) as free."""
+        raise NotImplementedError
+
+    def record_added(self, prop):
+        pass
+
+    def record_deleted(self, property_id: int):
+        pass
+
+    def needs_compaction(self) -> bool:
+        return False
+
+    def compact(self, properties: list, availability: AvailabilityIndex) -> bool:
+        """Fold recorded changes into the main copy. False if the catalog has to be reloaded first."""
+        return True
+
+    # pushdown stores only
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def get(self, property_id: int):
+        raise NotImplementedError
+
+    def candidates(self, locations: List[str], group_size: int, start_date: date, end_date: date) -> list:
+        raise NotImplementedError
+
+
+class JsonPropertyStore(PropertyStore):
+    """
+    properties.json, read through its columnar snapshot when that is up to date, with
+    bookings appended to a journal and folded back into the JSON every COMPACT_EVERY entries.
+    Added and deleted properties are written by the next save.
+
+    Several processes can share the files. Bookings hold the catalog lock shared and the
+    property's stripe lock exclusively, so different properties are booked in parallel;
+    compaction and full saves hold the catalog lock exclusively.
+    """
+
+    def __init__(self, json_file: str = "properties.json", stripes: int = 16):
+        self.json_file = json_file
+        base = os.path.splitext(json_file)[0]
+        self.snapshot_file = snapshot_path(json_file)
+        self.journal = BookingJournal(journal_path(json_file))
+        self.catalog_lock = base + ".lock"
+        self.stripes = LockStripes(base + ".locks", stripes)
+        self._mutex = threading.RLock()  # the journal position and loaded properties are shared by this process's threads
+        self._holding = threading.local()  # `shared`: how this thread holds the catalog lock, None if it does not
+
+    # the catalog lock, taken once per thread: a booking reloads the catalog under the lock it already holds
+    @contextmanager
+    def _catalog_locked(self, shared: bool = False):
+        held = getattr(self._holding, "shared", None)
+        if held is not None:
+            if held and not shared:
+                raise RuntimeError("The catalog lock is held shared, it cannot be made exclusive.")
+            yield
+            return
+        with file_lock(self.catalog_lock, shared=shared):
+            self._holding.shared = shared
+            try:
+                yield
+            finally:
+                self._holding.shared = None
+
+    def load(self):
+        with self._catalog_locked(shared=True):
+            # the journal must have its header before it is followed, so a later compaction is noticed
+            self.journal.create()
+            properties, availability = self._load()
+            self.journal.rewind()
+            self.replay_journal(properties)
+        return properties, availability
+
+    # load properties and their availability index, from the snapshot when it is up to date
+    def _load(self):
+        from properties import Property
+
+        if is_fresh(self.json_file, self.snapshot_file):
+            snapshot = open_snapshot(self.snapshot_file)
+            if snapshot is not None:
+                # the index comes straight from the columns, the properties are created as they are looked up
+                ids = snapshot.columns["id"].tolist()
+                if "booked_bits" in snapshot.columns:
+                    availability = AvailabilityIndex.from_bits(ids, snapshot.booked_base, snapshot.columns["booked_bits"])
+                else:
+                    availability = AvailabilityIndex.from_booked(ids, snapshot.booked())
+                return SnapshotProperties(snapshot, Property, availability), availability
+
+        # snapshot missing or older than the JSON: parse the JSON once and rebuild it
+        properties = self.load_json()
+        availability = AvailabilityIndex(properties)
+        if properties:
+            self.save_snapshot(properties, availability)
+        return properties, availability
+
+    def load_json(self) -> list:
+        from properties import Property
+
+        try:
+            with open(self.json_file, "r", encoding="utf-8") as f:
+                return [Property.from_dict(p) for p in json.load(f)]
+        except (FileNotFoundError, json.JSONDecodeError):
+            return []
+
+    # apply bookings and cancellations recorded since the last compaction
+    def replay_journal(self, properties: list) -> bool:
+        return self._apply_journal(index_by_id(properties))
+
+    # apply journal entries not seen yet, in order; replaying one of our own is harmless
+    def _apply_journal(self, by_id: dict) -> bool:
+        entries = self.journal.read_new()
+        if entries is None:
+            return False
+        for entry in entries:
+            prop = by_id.get(entry["id"])
+            if prop is None:
+                continue
+            if entry["op"] == "book":
+                prop.add_dates(entry["start"], entry["end"], verbose=False)
+            elif entry["op"] == "cancel":
+                prop.delete_dates(entry["start"], entry["end"], verbose=False)
+        return True
+
+    def lock(self, property_id):
+        return self._locked(property_id)
+
+    @contextmanager
+    def _locked(self, property_id):
+        with self._catalog_locked(shared=True), self.stripes.lock(property_id), self._mutex:
+            yield
+
+    def refresh(self, by_id, property_id):
+        with self._mutex:
+            return self._apply_journal(by_id)
+
+    # bookings append to the journal, compactions and saves replace both files
+    # (the journal is created by loading or the first booking; before that it is None)
+    def data_version(self):
+        return tuple(_file_version(path) for path in (self.json_file, self.journal.path))
+
+    # save properties into the json file (with every journaled change folded in), then refresh the snapshot
+    def save(self, properties, availability):
+        with self._catalog_locked(), self._mutex:
+            # another process compacted since we loaded: our copy lacks what it folded in
+            if not self._apply_journal({prop.id: prop for prop in properties}):
+                print("The catalog was changed by another process. Reload it before saving.")
+                return False
+            write_atomic(self.json_file, json.dumps([prop.to_dict() for prop in properties], indent=4))
+            self.save_snapshot(properties, availability)
+            self.journal.truncate()
+        return True
+
+    # the snapshot is only a cache of the JSON, so failing to write it is not fatal
+    def save_snapshot(self, properties, availability):
+        try:
+            write_snapshot(properties, self.snapshot_file, availability)
+        except OSError as e:
+            print(f"Could not write property snapshot: {e}")
+
+    def record_booking(self, property_id, start_date, end_date):
+        self.journal.append("book", property_id, start_date, end_date)
+        return True
+
+    def record_cancellation(self, property_id, start_date, end_date):
+        self.journal.append("cancel", property_id, start_date, end_date)
+
+    def needs_compaction(self) -> bool:
+        return self.journal.count >= COMPACT_EVERY
+
+    # fold the journal into properties.json and the snapshot, then start a fresh journal
+    def compact(self, properties, availability):
+        return self.save(properties, availability)
+
+
+# properties inserted per executemany call when saving a whole catalog
+INSERT_BATCH = 10000
+
+# rows of the changes table kept for catalogs loaded in other processes; one further behind reloads instead
+CHANGES_KEPT = 10000
+
+PROPERTY_COLUMNS = "id, location, type, price, capacity, environment, features, tags"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS properties (
+    id INTEGER PRIMARY KEY,
+    location TEXT NOT NULL,
+    type TEXT NOT NULL,
+    price REAL NOT NULL,
+    capacity INTEGER NOT NULL,
+    environment TEXT NOT NULL,
+    features TEXT NOT NULL,  -- JSON list
+    tags TEXT NOT NULL       -- JSON list
+);
+CREATE INDEX IF NOT EXISTS properties_location ON properties (location, capacity);
+CREATE INDEX IF NOT EXISTS properties_capacity ON properties (capacity);
+CREATE INDEX IF NOT EXISTS properties_price ON properties (price);
+CREATE TABLE IF NOT EXISTS bookings (
+    property_id INTEGER NOT NULL REFERENCES properties (id) ON DELETE CASCADE,
+    day TEXT NOT NULL,  -- YYYY-MM-DD
+    PRIMARY KEY (property_id, day)
+) WITHOUT ROWID;
+-- one row per committed change, followed by the catalogs other connections loaded;
+-- property_id is NULL when properties were added, deleted or replaced, which needs a reload
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    property_id INTEGER
+);
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    email TEXT NOT NULL,
+    data TEXT NOT NULL  -- JSON of User.to_dict()
+);
+CREATE INDEX IF NOT EXISTS users_email ON users (email COLLATE NOCASE);
+"""
+
+
+def connect(path: str = DEFAULT_DB) -> sqlite3.Connection:
+    """Open (and if needed create) the database in WAL mode, so readers never block the writer."""
+    db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.execute("PRAGMA foreign_keys=ON")
+    db.executescript(SCHEMA)
+    return db
+
+
+class SQLitePropertyStore(PropertyStore):
+    """
+    Properties in a SQLite table indexed on location, capacity and price, and bookings in a
+    table keyed by (property, day). Every change is its own transaction, and searches push
+    the location, capacity and date filters into SQL instead of loading the catalog.
+    A booking inserts its days in one transaction, so the (property, day) key rejects it
+    if another process took any of them first.
+    """
+
+    pushdown = True
+
+    def __init__(self, path: str = DEFAULT_DB):
+        self.path = path
+        self.db = connect(path)
+        self._locations = None  # (data_version, distinct locations, LocationIndex over them)
+        self._writes = 0  # commits on this connection, which PRAGMA data_version does not count
+        self._seen = None  # last changes row the loaded catalog has, set by load()
+        self._mutex = threading.RLock()  # one connection, shared by this process's threads
+
+    def _row_to_property(self, row, booked=None):
+        from properties import Property
+
+        return Property(id=row[0], location=row[1], type=row[2], price=row[3], capacity=row[4], environment=row[5],
+                        features=json.loads(row[6]), tags=json.loads(row[7]), booked=booked or [])
+
+    def _booked_by_id(self, ids=None) -> dict:
+        booked = {}
+        if ids is None:
+            rows = self.db.execute("SELECT property_id, day FROM bookings ORDER BY property_id, day")
+        else:
+            # ids travel as one JSON parameter, which keeps them clear of SQLite's variable limit
+            rows = self.db.execute(
+                "SELECT property_id, day FROM bookings WHERE property_id IN (SELECT value FROM json_each(?)) "
+                "ORDER BY property_id, day",
+                (json.dumps(ids),),
+            )
+        for property_id, day in rows:
+            booked.setdefault(property_id, []).append(date.fromisoformat(day))
+        return booked
+
+    def load(self):
+        # taken first: a change committed while loading is applied again by refresh, which is harmless
+        with self._mutex:
+            self._seen = self._last_change()
+        properties = list(self.iterate())
+        return properties, AvailabilityIndex(properties)
+
+    def _last_change(self) -> int:
+        return self.db.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+
+    # note a change in the transaction that makes it, dropping rows no catalog should still need
+    def _log_change(self, property_id: Optional[int]) -> int:
+        seq = self.db.execute("INSERT INTO changes (property_id) VALUES (?)", (property_id,)).lastrowid
+        if seq % CHANGES_KEPT == 0:
+            self.db.execute("DELETE FROM changes WHERE seq <= ?", (seq - CHANGES_KEPT,))
+        return seq
+
+    # once committed: our own change is in the loaded catalog already (the controller applied it),
+    # so if nothing else came before it, it need not be read back
+    def _committed(self, seq: int):
+        if self._seen is not None and seq == self._seen + 1:
+            self._seen = seq
+
+    def iterate(self) -> Iterator:
+        """Every property in id order, one at a time (bookings merged in from a second cursor)."""
+        bookings = self.db.cursor().execute("SELECT property_id, day FROM bookings ORDER BY property_id, day")
+        booking = next(bookings, None)
+        for row in self.db.cursor().execute(f"SELECT {PROPERTY_COLUMNS} FROM properties ORDER BY id"):
+            while booking is not None and booking[0] < row[0]:
+                booking = next(bookings, None)
+            days = []
+            while booking is not None and booking[0] == row[0]:
+                days.append(date.fromisoformat(booking[1]))
+                booking = next(bookings, None)
+            yield self._row_to_property(row, days)
+
+    def count(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM properties").fetchone()[0]
+
+    def get(self, property_id: int):
+        """One property with its bookings, or None."""
+        row = self.db.execute(f"SELECT {PROPERTY_COLUMNS} FROM properties WHERE id = ?", (property_id,)).fetchone()
+        if row is None:
+            return None
+        days = self.db.execute("SELECT day FROM bookings WHERE property_id = ? ORDER BY day", (property_id,))
+        return self._row_to_property(row, [date.fromisoformat(day) for (day,) in days])
+
+    def _insert(self, properties):
+        self.db.executemany(
+            f"INSERT INTO properties ({PROPERTY_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            ((p.id, p.location, p.type, p.price, p.capacity, p.environment, json.dumps(p.features), json.dumps(p.tags))
+             for p in properties),
+        )
+        self.db.executemany(
+            "INSERT OR IGNORE INTO bookings (property_id, day) VALUES (?, ?)",
+            ((p.id, day.isoformat()) for p in properties for day in p.booked),
+        )
+
+    # replace every property; `properties` can be any iterable, it is inserted in batches
+    def save(self, properties, availability=None):
+        with self._mutex, self.db:
+            self.db.execute("DELETE FROM bookings")
+            self.db.execute("DELETE FROM properties")
+            batch = []
+            for prop in properties:
+                batch.append(prop)
+                if len(batch) == INSERT_BATCH:
+                    self._insert(batch)
+                    batch = []
+            self._insert(batch)
+            seq = self._log_change(None)
+        self._writes += 1
+        self._committed(seq)
+        return True
+
+    def lock(self, property_id):
+        return self._mutex
+
+    # apply what other connections committed since the catalog was loaded: the booked days of each
+    # property in the changes table since then are read again. Properties added, deleted or replaced,
+    # or changes pruned before they were seen, ask for a reload instead
+    def refresh(self, by_id, property_id):
+        with self._mutex:
+            if self._seen is None:
+                return False
+            oldest = self.db.execute("SELECT MIN(seq) FROM changes").fetchone()[0]
+            if oldest is not None and oldest > self._seen + 1:
+                return False
+            changes = self.db.execute("SELECT seq, property_id FROM changes WHERE seq > ? ORDER BY seq",
+                                      (self._seen,)).fetchall()
+            if any(changed is None for _, changed in changes):
+                return False
+            for changed in dict.fromkeys(changed for _, changed in changes):
+                prop = by_id.get(changed)
+                if prop is not None:
+                    self._reread(prop)
+            if changes:
+                self._seen = changes[-1][0]
+        return True
+
+    # bring one property's booked days in line with the bookings table
+    def _reread(self, prop):
+        property_id = prop.id
+        days = {date.fromisoformat(day) for (day,) in
+                self.db.execute("SELECT day FROM bookings WHERE property_id = ?", (property_id,))}
+        booked = set(prop.booked)
+        for day in booked - days:
+            prop.delete_dates(day, day, verbose=False)
+        for day in days - booked:
+            prop.add_dates(day, day + timedelta(days=1), verbose=False)
+
+    def record_booking(self, property_id, start_date, end_date):
+        try:
+            with self._mutex, self.db:
+                self.db.executemany("INSERT INTO bookings (property_id, day) VALUES (?, ?)",
+                                    ((property_id, day) for day in _days(start_date, end_date)))
+                seq = self._log_change(property_id)
+        except sqlite3.IntegrityError:
+            return False
+        self._writes += 1
+        self._committed(seq)
+        return True
+
+    def record_cancellation(self, property_id, start_date, end_date):
+        with self._mutex, self.db:
+            self.db.execute("DELETE FROM bookings WHERE property_id = ? AND day BETWEEN ? AND ?",
+                            (property_id, start_date.isoformat(), end_date.isoformat()))
+            seq = self._log_change(property_id)
+        self._writes += 1
+        self._committed(seq)
+
+    def record_added(self, prop):
+        with self._mutex, self.db:
+            self._insert([prop])
+            seq = self._log_change(None)
+        self._writes += 1
+        self._committed(seq)
+
+    def record_deleted(self, property_id):
+        with self._mutex, self.db:
+            self.db.execute("DELETE FROM properties WHERE id = ?", (property_id,))
+            seq = self._log_change(None)
+        self._writes += 1
+        self._committed(seq)
+
+    # PRAGMA data_version moves when other connections commit, _writes when this one does
+    def data_version(self):
+        return self.db.execute("PRAGMA data_version").fetchone()[0], self._writes
+
+    # exactly one commit of this connection and none of others since `token`
+    def after_own_write(self, token):
+        version = self.data_version()
+        if token is not None and version == (token[0], token[1] + 1):
+            return version
+        return token
+
+    # requested locations -> stored location names, with the same matching rules as the in-memory catalog
+    def match_locations(self, locations: List[str]) -> List[str]:
+        version = self.data_version()
+        if self._locations is None or self._locations[0] != version:
+            names = [name for (name,) in self.db.execute("SELECT DISTINCT location FROM properties")]
+            self._locations = (version, names, LocationIndex(names))
+        _, names, index = self._locations
+        return [names[i] for i in index.rows(locations)]
+
+    def candidates(self, locations: List[str], group_size: int, start_date: date, end_date: date) -> list:
+        """Properties at the locations that fit the group and are free for [start_date, end_date), by id."""
+        names = self.match_locations(locations)
+        if not names:
+            return []
+        marks = ", ".join("?" * len(names))
+        rows = self.db.execute(
+            f"SELECT {PROPERTY_COLUMNS} FROM properties p "
+            f"WHERE p.location IN ({marks}) AND p.capacity >= ? "
+            "AND NOT EXISTS (SELECT 1 FROM bookings b WHERE b.property_id = p.id AND b.day >= ? AND b.day < ?) "
+            "ORDER BY p.id",
+            (*names, group_size, start_date.isoformat(), end_date.isoformat()),
+        ).fetchall()
+        booked = self._booked_by_id([row[0] for row in rows])
+        return [self._row_to_property(row, booked.get(row[0])) for row in rows]
+
+
+class UserStore:
+    """Where UserManager keeps the accounts, as User.to_dict() dicts."""
+
+    def load(self) -> List[dict]:
+        raise NotImplementedError
+
+    def save_all(self, users: List[dict]):
+        """Replace every stored user (imports); other processes' changes are lost."""
+        raise NotImplementedError
+
+    def save(self, user: dict, users: List[dict]):
+        """Persist one changed user; `users` (an iterable of everyone) is for stores that can only rewrite the whole file."""
+        self.save_all(users)
+
+    def rename(self, old_username: str, user: dict, users: List[dict]):
+        """Persist a user stored as `old_username` under its new username (and its other changes)."""
+        self.save_all(users)
+
+    def delete(self, username: str, users: List[dict]):
+        """Remove one user."""
+        self.save_all(users)
+
+
+class JsonUserStore(UserStore):
+    """users.json, rewritten atomically under a lock file so concurrent processes do not lose each other's changes."""
+
+    def __init__(self, filename: str = "users.json"):
+        self.filename = filename
+        self.lock_file = os.path.splitext(filename)[0] + ".lock"
+
+    def load(self):
+        try:
+            with open(self.filename, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return []
+
+    def save_all(self, users):
+        with file_lock(self.lock_file):
+            write_atomic(self.filename, json.dumps(list(users), indent=4))
+
+    # re-read the file under the lock and change only one user, keeping other processes' changes
+    @contextmanager
+    def _merged(self):
+        with file_lock(self.lock_file):
+            stored = self.load()
+            yield stored
+            write_atomic(self.filename, json.dumps(stored, indent=4))
+
+    @staticmethod
+    def _replace(stored: List[dict], username: str, user: Optional[dict]):
+        at = next((i for i, u in enumerate(stored) if u["username"] == username), len(stored))
+        stored[at:at + 1] = [user] if user is not None else []
+
+    def save(self, user, users):
+        with self._merged() as stored:
+            self._replace(stored, user["username"], user)
+
+    def rename(self, old_username, user, users):
+        with self._merged() as stored:
+            self._replace(stored, old_username, user)
+
+    def delete(self, username, users):
+        with self._merged() as stored:
+            self._replace(stored, username, None)
+
+
+class SQLiteUserStore(UserStore):
+    def __init__(self, path: str = DEFAULT_DB):
+        self.path = path
+        self.db = connect(path)
+
+    def load(self):
+        return [json.loads(data) for (data,) in self.db.execute("SELECT data FROM users ORDER BY rowid")]
+
+    def _upsert(self, users):
+        self.db.executemany(
+            "INSERT INTO users (username, email, data) VALUES (?, ?, ?) "
+            "ON CONFLICT (username) DO UPDATE SET email = excluded.email, data = excluded.data",
+            ((u["username"], u["email"], json.dumps(u)) for u in users),
+        )
+
+    def save_all(self, users):
+        with self.db:
+            stored = {name for (name,) in self.db.execute("SELECT username FROM users")}
+            gone = stored - {u["username"] for u in users}
+            self.db.executemany("DELETE FROM users WHERE username = ?", ((name,) for name in gone))
+            self._upsert(users)
+
+    def save(self, user, users):
+        with self.db:
+            self._upsert([user])
+
+    def rename(self, old_username, user, users):
+        with self.db:
+            renamed = self.db.execute(
+                "UPDATE users SET username = ?, email = ?, data = ? WHERE username = ?",
+                (user["username"], user["email"], json.dumps(user), old_username),
+            ).rowcount
+            if not renamed:  # deleted by another process meanwhile
+                self._upsert([user])
+
+    def delete(self, username, users):
+        with self.db:
+            self.db.execute("DELETE FROM users WHERE username = ?", (username,))
+
+
+# (kind, database path) of a backend spec; a misspelt kind is an error, not a silent switch to JSON
+def _backend(spec: Optional[str]) -> Tuple[str, str]:
+    spec = spec if spec is not None else os.environ.get(STORAGE_ENV) or "json"
+    kind, _, path = spec.partition(":")
+    if kind not in ("json", "sqlite"):
+        raise ValueError(f"Unknown storage backend {kind!r} in {STORAGE_ENV}: use \"json\", \"sqlite\" or \"sqlite:<path>\".")
+    return kind, path or DEFAULT_DB
+
+
+def open_property_store(spec: Optional[str] = None) -> PropertyStore:
+    """The property store selected by spec or $ARIK_STORAGE ("json", "sqlite", "sqlite:<path>")."""
+    kind, path = _backend(spec)
+    return SQLitePropertyStore(path) if kind == "sqlite" else JsonPropertyStore()
+
+
+def open_user_store(spec: Optional[str] = None) -> UserStore:
+    """The user store selected by spec or $ARIK_STORAGE."""
+    kind, path = _backend(spec)
+    return SQLiteUserStore(path) if kind == "sqlite" else JsonUserStore()
+
+
+# JSON stays the exchange format: copy properties.json/users.json into a database and back.
+# A .jsonl properties file is streamed in or out one property at a time (see streaming.py).
+def import_json(db_path: str, properties_json: str = "properties.json", users_json: str = "users.json"):
+    import streaming
+
+    if properties_json.endswith(".jsonl"):
+        properties = streaming.read_properties(properties_json)
+    else:
+        properties = JsonPropertyStore(properties_json).load()[0]
+    store = SQLitePropertyStore(db_path)
+    store.save(properties)
+    SQLiteUserStore(db_path).save_all(JsonUserStore(users_json).load())
+    return store.count()
+
+
+def export_json(db_path: str, properties_json: str = "properties.json", users_json: str = "users.json"):
+    import streaming
+
+    count = streaming.write_properties(SQLitePropertyStore(db_path).iterate(), properties_json)
+    JsonUserStore(users_json).save_all(SQLiteUserStore(db_path).load())
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move the catalog and users between JSON files and SQLite")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--properties", default="properties.json")
+    parser.add_argument("--users", default="users.json")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        count = import_json(args.db, args.properties, args.users)
+        print(f"Imported {count} properties into {args.db}")
+    else:
+        count = export_json(args.db, args.properties, args.users)
+        print(f"Exported {count} properties to {args.properties}")
@@ -0,0 +1,183 @@
+import argparse
+import json
+import sys
+import textwrap
+from datetime import date
+from typing import Iterable, Iterator, List, Optional
+
+from locations import LocationIndex
+from properties import Property
+from storage import atomic_writer
+
+# characters read at a time when streaming a JSON array
+READ_CHUNK = 1 << 16
+
+
+def read_jsonl(path: str) -> Iterator[dict]:
+    """Property records of a JSONL catalog (one JSON object per line), one at a time."""
+    with open(path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}, line {number}: {e.msg}") from None
+
+
+def read_json_array(path: str) -> Iterator[dict]:
+    """Items of a JSON array file such as properties.json, decoded one at a time from a small buffer."""
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buffer = f.read(READ_CHUNK).lstrip()
+        if not buffer.startswith("["):
+            raise ValueError(f"{path} is not a JSON array.")
+        buffer, position = buffer[1:], 0
+        while True:
+            # skip the separator (or the closing bracket) before the next item
+            while True:
+                while position < len(buffer) and buffer[position] in " \t\r\n,":
+                    position += 1
+                if position < len(buffer):
+                    break
+                buffer, position = f.read(READ_CHUNK), 0
+                if not buffer:
+                    raise ValueError(f"{path} ends before its closing bracket.")
+            if buffer[position] == "]":
+                return
+            # decode the next item, reading more when it runs past the end of the buffer
+            while True:
+                try:
+                    item, end = decoder.raw_decode(buffer, position)
+                    break
+                except json.JSONDecodeError:
+                    more = f.read(READ_CHUNK)
+                    if not more:
+                        raise ValueError(f"{path} has an invalid or truncated item.") from None
+                    buffer, position = buffer[position:] + more, 0
+            yield item
+            position = end
+
+
+def read_records(path: str) -> Iterator[dict]:
+    """Property records of a .jsonl or .json catalog, one at a time."""
+    return read_jsonl(path) if path.endswith(".jsonl") else read_json_array(path)
+
+
+def read_properties(path: str) -> Iterator[Property]:
+    """Properties of a .jsonl or .json catalog, one at a time, so memory does not grow with the catalog."""
+    return map(Property.from_dict, read_records(path))
+
+
+def _records(properties: Iterable) -> Iterator[dict]:
+    for prop in properties:
+        yield prop.to_dict() if isinstance(prop, Property) else prop
+
+
+def write_jsonl(properties: Iterable, path: str) -> int:
+    """Write properties (or their dicts) as JSONL, replacing the file atomically. Returns how many."""
+    count = 0
+    with atomic_writer(path) as f:
+        for record in _records(properties):
+            f.write(json.dumps(record) + "\n")
+            count += 1
+    return count
+
+
+def write_json(properties: Iterable, path: str) -> int:
+    """Write properties (or their dicts) in the properties.json layout, one at a time. Returns how many."""
+    count = 0
+    with atomic_writer(path) as f:
+        # the same text json.dump(records, f, indent=4) writes, without holding the list
+        for record in _records(properties):
+            f.write(("[\n" if count == 0 else ",\n") + textwrap.indent(json.dumps(record, indent=4), "    "))
+            count += 1
+        f.write("\n]" if count else "[]")
+    return count
+
+
+def write_properties(properties: Iterable, path: str) -> int:
+    """Write a .jsonl or .json catalog, depending on the file name."""
+    return write_jsonl(properties, path) if path.endswith(".jsonl") else write_json(properties, path)
+
+
+def json_to_jsonl(json_path: str, jsonl_path: str) -> int:
+    """Convert a properties.json file to JSONL."""
+    return write_jsonl(read_json_array(json_path), jsonl_path)
+
+
+def jsonl_to_json(jsonl_path: str, json_path: str) -> int:
+    """Convert a JSONL catalog back to the properties.json layout."""
+    return write_json(read_jsonl(jsonl_path), json_path)
+
+
+# filtering stages, each a generator, chained into a pipeline by scan(). Location and group size
+# are checked on the raw records, so only their survivors are turned into Property objects.
+
+def distinct_locations(path: str) -> List[str]:
+    """Every location named in a catalog, in order of first appearance."""
+    return list(dict.fromkeys(record["location"] for record in read_records(path)))
+
+
+def matching_locations(locations: List[str], catalog_locations: List[str]) -> set:
+    """The catalog locations a request's locations match, by the rules of locations.LocationIndex."""
+    return {catalog_locations[row] for row in LocationIndex(catalog_locations).rows(locations)}
+
+
+def at_locations(records: Iterable[dict], matched: set) -> Iterator[dict]:
+    return (record for record in records if record["location"] in matched)
+
+
+def with_capacity(records: Iterable[dict], group_size: int) -> Iterator[dict]:
+    return (record for record in records if record["capacity"] >= group_size)
+
+
+def free_between(properties: Iterable[Property], start_date: date, end_date: date) -> Iterator[Property]:
+    return (prop for prop in properties if prop.is_available(start_date, end_date))
+
+
+def scan(path: str, request: dict, catalog_locations: Optional[List[str]] = None) -> Iterator[Property]:
+    """
+    Properties of a catalog file meeting a parsed request's location, group size and dates,
+    in constant memory. Location terms only match by prefix when no location has them as a
+    key or token, which depends on the whole catalog: without `catalog_locations` they are
+    collected in a first pass over the file.
+    """
+    if catalog_locations is None:
+        catalog_locations = distinct_locations(path)
+    records = read_records(path)
+    records = at_locations(records, matching_locations(request["location"], catalog_locations))
+    records = with_capacity(records, request["group_size"])
+    return free_between(map(Property.from_dict, records), request["start_date"], request["end_date"])
+
+
+def count_records(path: str) -> int:
+    """Number of properties in a catalog file (JSONL lines are counted without decoding them)."""
+    if path.endswith(".jsonl"):
+        with open(path, "r", encoding="utf-8") as f:
+            return sum(1 for line in f if line.strip())
+    return sum(1 for _ in read_json_array(path))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert and scan catalog files without loading them whole")
+    commands = parser.add_subparsers(dest="command", required=True)
+    convert = commands.add_parser("convert", help="convert between .json and .jsonl (by file name)")
+    convert.add_argument("source")
+    convert.add_argument("target")
+    search = commands.add_parser("scan", help="print the properties matching location, group size and dates as JSONL")
+    search.add_argument("catalog")
+    search.add_argument("--location", action="append", required=True)
+    search.add_argument("--group-size", type=int, default=1)
+    search.add_argument("--start", required=True, help="YYYY-MM-DD")
+    search.add_argument("--end", required=True, help="YYYY-MM-DD, exclusive")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        count = write_properties(read_records(args.source), args.target)
+        print(f"Wrote {count} properties to {args.target}")
+    else:
+        request = {"location": args.location, "group_size": args.group_size,
+                   "start_date": date.fromisoformat(args.start), "end_date": date.fromisoformat(args.end)}
+        for prop in scan(args.catalog, request):
+            sys.stdout.write(json.dumps(prop.to_dict()) + "\n")
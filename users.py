@@ -1,12 +1,11 @@
 import pwinput
-import json
 import hashlib
-import re
 from llm import llm_parse
 from recommender import recommendation_logic
-from properties import PropertiesController
+from properties import PropertiesController, booked_message, freed_message
+from storage import open_user_store
 from datetime import date
-import json
+import prompts
 
 class User:
     def __init__(self, username, password, name, email, reservations=None, preferences=None, attempts=0):
@@ -24,98 +23,45 @@ class User:
         return hashlib.sha256(password.encode()).hexdigest()
 
     # verify if user set a strong pwd
-    @staticmethod
-    def is_strong_password(password):
-        if len(password) < 8:
-            return False
-        has_upper = re.search(r"[A-Z]", password)
-        has_number = re.search(r"\d", password)
-        has_special = re.search(r"[!@#$%^&*(),.?\":{}|<>]", password)
-        return all([has_upper, has_number, has_special])
-
-    @staticmethod
-    def is_valid_email(email):
-        pattern = r'^[\w\.-]+@[\w\.-]+\.\w+$'
-        return re.match(pattern, email) is not None
+    is_strong_password = staticmethod(prompts.is_strong_password)
+    is_valid_email = staticmethod(prompts.is_valid_email)
 
     # set user pwd
     def set_password(self):
-        while True:
-            password = pwinput.pwinput(
-                "Create a password (8 chars, 1 capital, 1 number, 1 special): ", mask="*"
-            )
-            if not User.is_strong_password(password):  # check if is strong pwd
-                print("Password does not meet requirements.")
-                continue
-            confirm = pwinput.pwinput("Confirm your password: ", mask="*")
-            if password != confirm:  # check if two times input are the same
-                print("Passwords do not match.")
-                continue
-            break
-        self.password = User.hash_password(password)
+        self.password = User.hash_password(prompts.ask_password())
         print("Password successfully set.")
 
-    def set_username(self, userdb):
+    def set_username(self, user_manager):
         while True:
             username = input("Enter your new username: ").strip()
             if not username:
                 print("Username cannot be empty.")
                 continue
-            if any(u.username == username and u.email != self.email for u in userdb):
+            if user_manager.username_taken(username, exclude=self):
                 print("Username already in use by another user.")
                 continue
             break
-        self.username = username
+        old_username = self.username
+        user_manager.rename_user(self, username)
+        user_manager.save_user(self, old_username)
         print("Username successfully updated.")
 
-    def set_email(self, userdb):
+    def set_email(self, user_manager):
         while True:
             email = input("Enter your new email: ")
             if not User.is_valid_email(email):
                 print("Invalid email format.")
                 continue
-            if any(u.email == email and u.username != self.username for u in userdb):
+            if user_manager.email_taken(email, exclude=self):
                 print("Email already in use by another user.")
                 continue
             break
-        self.email = email
+        user_manager.change_email(self, email)
+        user_manager.save_user(self)
         print("Email successfully updated.")
 
     def set_preferences(self):
-        def get_weight(prompt):
-            while True:
-                try:
-                    value = float(input(prompt))
-                    if 0 <= value <= 10:
-                        return value
-                    else:
-                        print("Please enter a number between 0 and 10.")
-                except ValueError:
-                    print("Invalid input. Please enter a number between 0 and 10.")
-
-        print("We're just going to ask a few questions to get to know you better.")
-        print("Please enter a number, 0-10, for how important each feature is.")
-        print("0 means not important at all and 10 means this preference is a very good-to-have.")
-
-        budget = get_weight("How important is budget to you? ")
-        enviro = get_weight("How important is environment to you? ")
-        feature = get_weight("How important is it that you get your desired features? ")
-        tag = get_weight("How important is it that the property has the tags you've requested? ")
-
-        total = budget + enviro + feature + tag
-        if total == 0:
-            print("All preferences were zero, setting equal importance to each category.")
-            total = 4
-            budget = enviro = feature = tag = 1
-
-        # setting preference as ratio percentage
-        self.preferences = {
-            "budget_wt": budget,
-            "enviro_wt": enviro,
-            "feature_wt": feature,
-            "tags_wt": tag
-        }
-
+        self.preferences = prompts.ask_preferences()
         print("Preferences set.")
 
     def check_password(self, password):
@@ -145,10 +91,9 @@ class User:
         combined_input = {**llm_output, **self.preferences}
         print("Bot: Combined input for recommendations:", combined_input)
         
-        # Get recommended properties
-        pc = PropertiesController()
-        properties = pc.load_properties()
-        recommendations = recommendation_logic(properties, combined_input)
+        # Get recommended properties; a repeated search on an unchanged catalog is answered from the result cache
+        pc = user_manager.properties
+        recommendations = recommendation_logic(pc, combined_input)
         
         while True:
             reserve = input("Bot: Would you like to make a reservation for any of these? (Y/N): ").strip().lower()
@@ -172,22 +117,18 @@ class User:
             print("Bot: No property found with that ID. Reservation cancelled.")
             return
 
-        # Add reservation to user
-        self.reservations.append({"id": recommended_property.id, "start": start_date, "end": end_date})
-
-        # Update property booked dates
-        prop = controller.find_by_id(decision)
-        if not prop:
-            print("Bot: Could not find property in master list. Reservation cancelled.")
-            return
-
+        # Book the dates; this checks again that they are free, since another user may have just taken them
         start_date_obj = date.fromisoformat(start_date)
         end_date_obj = date.fromisoformat(end_date)
-        prop.add_dates(start_date_obj, end_date_obj)
+        prop = controller.book(decision, start_date_obj, end_date_obj)
+        if not prop:
+            print("Bot: Sorry, that property is no longer available for these dates. Reservation cancelled.")
+            return
+        print(booked_message(start_date_obj, end_date_obj))
 
-        # Save updated properties and users
-        controller.save_properties()
-        user_manager.save_users()
+        # Add reservation to user and save them
+        self.reservations.append({"id": recommended_property.id, "start": start_date, "end": end_date})
+        user_manager.save_user(self)
 
         print(f"Bot: Property {prop.id} successfully reserved from {start_date} to {end_date}.")
 
@@ -222,36 +163,14 @@ class User:
         # Remove reservation from user's list
         self.reservations.remove(to_remove)
 
-        # Load properties.json
-        with open("properties.json", "r") as f:
-            properties = json.load(f)
-
-        # Find the property and remove booked dates
-        property_to_update = next((p for p in properties if p["id"] == id_to_cancel), None)
-        if property_to_update:
-            # Assuming reservation has 'start_date' and 'end_date' in "YYYY-MM-DD" format
-            from datetime import datetime, timedelta
-
-            start_date = datetime.strptime(to_remove["start"], "%Y-%m-%d")
-            end_date = datetime.strptime(to_remove["end"], "%Y-%m-%d")
-
-            # Generate all dates in the range
-            dates_to_remove = [
-                (start_date + timedelta(days=i)).strftime("%Y-%m-%d")
-                for i in range((end_date - start_date).days + 1)
-            ]
-
-            # Remove booked dates
-            property_to_update["booked"] = [
-                d for d in property_to_update.get("booked", []) if d not in dates_to_remove
-            ]
-
-            # Save updated properties back to JSON
-            with open("properties.json", "w") as f:
-                json.dump(properties, f, indent=4)
+        # Free the property's booked dates (only the change is written)
+        controller = user_manager.properties
+        freed = controller.cancel(id_to_cancel, date.fromisoformat(to_remove["start"]), date.fromisoformat(to_remove["end"]))
+        if freed is not None:
+            print(freed_message(freed))
 
         # Save updated user data
-        user_manager.save_users()
+        user_manager.save_user(self)
         print("Reservation cancelled and property dates freed.")
 
 
@@ -283,31 +202,86 @@ class User:
             self.delete_reservation(reservation)
 
         # Remove user from database
-        user_manager.userdb.remove(self)
-        user_manager.save_users()
+        user_manager.remove_user(self)
+        user_manager.save_removal(self)
         print(f"Account '{self.username}' has been deleted.")
         return True
 
 
 class UserManager:
-    def __init__(self):
-        self.filename = "users.json"
+    def __init__(self, store=None):
+        # users.json by default, SQLite with ARIK_STORAGE=sqlite (see storage.py)
+        self.store = store if store is not None else open_user_store()
         self.userdb = self.load_users()
-    
+
+        # indexes for O(1) lookups and uniqueness checks, kept in sync by add/remove/rename/change_email
+        self.by_username = {u.username: u for u in self.userdb}
+        self.by_email = {u.email.lower(): u for u in self.userdb}
+
+        self._properties = None  # the catalog, opened on first use and kept for the session
+
+    # one controller for the whole session, so searches, bookings and the result cache share its catalog version
+    @property
+    def properties(self) -> PropertiesController:
+        if self._properties is None:
+            self._properties = PropertiesController()
+        return self._properties
+
     def load_users(self):
-        try:
-            with open(self.filename, "r") as f:
-                data = json.load(f)
-                return [User(**u) for u in data]
-        except (FileNotFoundError, json.JSONDecodeError):
-            return []
+        return [User(**u) for u in self.store.load()]
+
+    # persist one user's changes (stored as `old_username` if it was renamed), merged under the store's lock
+    # with what other processes stored; the SQLite store writes just that row
+    def save_user(self, user, old_username=None):
+        everyone = (u.to_dict() for u in self.userdb)
+        if old_username is not None and old_username != user.username:
+            self.store.rename(old_username, user.to_dict(), everyone)
+        else:
+            self.store.save(user.to_dict(), everyone)
 
-    def save_users(self):
-        with open(self.filename, "w") as f:
-            json.dump([u.to_dict() for u in self.userdb], f, indent=4)
+    # persist a user's removal (after remove_user), keeping everyone else as other processes stored them
+    def save_removal(self, user):
+        self.store.delete(user.username, (u.to_dict() for u in self.userdb))
 
     def find_user(self, username):
-        return next((user for user in self.userdb if user.username == username), None)
+        return self.by_username.get(username)
+
+    def find_by_email(self, email):
+        return self.by_email.get(email.lower())
+
+    # True if another user than `exclude` already has the username
+    def username_taken(self, username, exclude=None):
+        user = self.by_username.get(username)
+        return user is not None and user is not exclude
+
+    # True if another user than `exclude` already has the email (case-insensitive)
+    def email_taken(self, email, exclude=None):
+        user = self.by_email.get(email.lower())
+        return user is not None and user is not exclude
+
+    def add_user(self, user):
+        self.userdb.append(user)
+        self.by_username[user.username] = user
+        self.by_email[user.email.lower()] = user
+
+    def remove_user(self, user):
+        self.userdb.remove(user)
+        if self.by_username.get(user.username) is user:
+            del self.by_username[user.username]
+        if self.by_email.get(user.email.lower()) is user:
+            del self.by_email[user.email.lower()]
+
+    def rename_user(self, user, username):
+        if self.by_username.get(user.username) is user:
+            del self.by_username[user.username]
+        user.username = username
+        self.by_username[username] = user
+
+    def change_email(self, user, email):
+        if self.by_email.get(user.email.lower()) is user:
+            del self.by_email[user.email.lower()]
+        user.email = email
+        self.by_email[email.lower()] = user
 
     def create_user(self):
         name = input("Enter your name: ")
@@ -327,15 +301,15 @@ class UserManager:
             if not User.is_valid_email(email): 
                 print("Invalid email format.") 
                 continue 
-            if any(u.email == email for u in self.userdb): 
+            if self.email_taken(email): 
                 print("Email already in use. Try another.") 
                 continue 
             break 
         user = User(username=username, password="", name=name, email=email, preferences=[]) #add a dictionary of weights 
         user.set_password() 
         user.set_preferences() 
-        self.userdb.append(user) 
-        self.save_users() 
+        self.add_user(user) 
+        self.save_user(user) 
         print(f"Account successfully created for '{username}'")
 
     
@@ -367,7 +341,7 @@ class UserManager:
                     if email == user.email:
                         user.set_password()
                         user.attempts = 0
-                        self.save_users()
+                        self.save_user(user)
                         print("Password reset successful. Log in again.")
                         break
                     else:
@@ -381,7 +355,7 @@ class UserManager:
                 if user.check_password(password):
                     print(f"Login successful! Welcome, {user.name}.")
                     user.attempts = 0
-                    self.save_users()
+                    self.save_user(user)
                     return user
                 
                 user.attempts += 1
@@ -0,0 +1,118 @@
+import numpy as np
+from contextlib import nullcontext
+from typing import Callable, List
+from fuzzy import TrigramIndex
+from locations import location_tokens
+from properties import PropertiesController, Property
+from snapshot import Snapshot, source_snapshot
+
+
+class Vocabulary:
+    """
+    Search vocabulary (locations, environments, types, features, tags) and statistics
+    (max capacity, price range) of the catalog at one version.
+    """
+
+    def __init__(self, properties: List[Property], version: int = 0):
+        self.version = version
+        self.locations = sorted(set(p.location for p in properties))
+        self.environments = sorted(set(p.environment for p in properties))
+        self.types = sorted(set(p.type for p in properties))
+        self.features = sorted(set(f for p in properties for f in p.features))
+        self.tags = sorted(set(t for p in properties for t in p.tags))
+
+        self.max_capacity = max((p.capacity for p in properties), default=0)
+        self.min_price = min((p.price for p in properties), default=0)
+        self.max_price = max((p.price for p in properties), default=0)
+
+        # environment (lowercase) -> locations having it, location -> its environments
+        env_locations = {}
+        self._location_environments = {}
+        for p in properties:
+            env_locations.setdefault(p.environment.lower(), set()).add(p.location)
+            self._location_environments.setdefault(p.location, set()).add(p.environment)
+        self._environment_locations = {env: sorted(locs) for env, locs in env_locations.items()}
+        self._matchers = {}
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Snapshot, version: int = 0):
+        """The same vocabulary from a snapshot's string tables and columns, without creating its properties."""
+        vocabulary = cls([], version)
+        tables, columns = snapshot.tables, snapshot.columns
+        # the tables hold each distinct value once
+        vocabulary.locations = sorted(tables["location"])
+        vocabulary.environments = sorted(tables["environment"])
+        vocabulary.types = sorted(tables["type"])
+        vocabulary.features = sorted(tables["features"])
+        vocabulary.tags = sorted(tables["tags"])
+        if len(snapshot):
+            prices = snapshot.prices()
+            vocabulary.max_capacity = int(columns["capacity"].max())
+            vocabulary.min_price, vocabulary.max_price = min(prices), max(prices)
+
+        # distinct (environment, location) pairs
+        width = len(tables["location"])
+        env_locations = {}
+        pairs = np.unique(columns["environment"].astype(np.int64) * width + columns["location"])
+        for pair in pairs.tolist():
+            environment, location = tables["environment"][pair // width], tables["location"][pair % width]
+            env_locations.setdefault(environment.lower(), set()).add(location)
+            vocabulary._location_environments.setdefault(location, set()).add(environment)
+        vocabulary._environment_locations = {env: sorted(locs) for env, locs in env_locations.items()}
+        return vocabulary
+
+    def locations_with_environment(self, environment: str) -> List[str]:
+        """Sorted locations that have at least one property in the environment (case-insensitive)."""
+        return self._environment_locations.get(environment.lower(), [])
+
+    def environments_at(self, location: str) -> set:
+        """Environments of the properties at a location."""
+        return self._location_environments.get(location, set())
+
+    def matcher(self, field: str) -> TrigramIndex:
+        """Fuzzy index over one field ("locations", "environments", "types", "features", "tags"), built on first use."""
+        if field not in self._matchers:
+            # locations are also found by their parts and words ("Torronto" -> "Toronto, Canada")
+            aliases = location_tokens if field == "locations" else None
+            self._matchers[field] = TrigramIndex(getattr(self, field), aliases=aliases)
+        return self._matchers[field]
+
+
+class LazyVocabulary:
+    """
+    Builds the Vocabulary on first use, and rebuilds it whenever properties are added, deleted
+    or reloaded, so it never goes stale. Bookings do not change it, so they keep it.
+    """
+
+    def __init__(self, controller_factory: Callable[[], PropertiesController] = PropertiesController):
+        self._controller_factory = controller_factory
+        self._controller = None
+        self._vocabulary = None
+        self._lock = nullcontext()
+
+    @property
+    def controller(self) -> PropertiesController:
+        if self._controller is None:
+            self._controller = self._controller_factory()
+        return self._controller
+
+    def use(self, controller: PropertiesController, lock=None):
+        """
+        Follow an already loaded controller (e.g. the one a long-running service keeps warm).
+        With a `lock`, the controller is only read while holding it, for controllers other threads change.
+        """
+        self._controller = controller
+        self._vocabulary = None
+        self._lock = lock if lock is not None else nullcontext()
+
+    def get(self) -> Vocabulary:
+        with self._lock:
+            properties = self.controller.get_all()
+            version = self.controller.listings
+            if self._vocabulary is None or self._vocabulary.version != version:
+                snapshot = source_snapshot(properties)
+                if snapshot is not None:
+                    self._vocabulary = Vocabulary.from_snapshot(snapshot, version)
+                else:
+                    self._vocabulary = Vocabulary(properties, version)
+        return self._vocabulary